@@ -1,8 +1,22 @@
-from fastapi import APIRouter, Query, HTTPException
-from typing import Optional
+import asyncio
+import itertools
+import json
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from typing import List, Optional, Union
 from pydantic import BaseModel
-from app.services.simbad import visible_objects_bundoora, search_objects
-from app.services.weather_data import get_weather_status
+from app.services.simbad import (visible_objects_async, visible_objects_page_async, visible_hemisphere_stream, visible_changes_async,
+                                 search_objects_async, autocomplete_objects, resolve_objects_batch_async,
+                                 altitude_curves_async)
+from app.services.object_table import ObjectTable, SEARCH_FIELDS
+from app.services.sites import get_site, list_sites
+from app.services.coord_convert import check_dtype, convert, decode_binary, encode_binary, parse_time
+from app.services.observing_window import get_observing_window, is_daytime, current_conditions
+from app.services.weather_poller import weather_poller
+from app.services.weather_history import weather_history
+from app.services.weather_alerts import weather_alerts
+from app.services.weather_providers import weather_source
+from app.services.safety_watchdog import safety_watchdog
 from app.services.ascom_alpaca import ascom_client, ascom_camera_client
 from app.services.usb_camera import usb_camera_service
 
@@ -25,52 +39,359 @@ class SlewRequest(BaseModel):
 class TrackingRequest(BaseModel):
     enabled: bool
 
+
+class BatchSearchRequest(BaseModel):
+    names: List[str]
+    site: Optional[str] = None
+
+
+class AltitudeCurvesRequest(BaseModel):
+    names: List[str]
+    stepMinutes: float = 10.0
+    site: Optional[str] = None
+
+
+class CoordsConvertRequest(BaseModel):
+    frame: str = "radec"
+    ra: Optional[List[float]] = None
+    dec: Optional[List[float]] = None
+    alt: Optional[List[float]] = None
+    az: Optional[List[float]] = None
+    time: Optional[Union[float, str]] = None
+    site: Optional[str] = None
+    mode: Optional[str] = None
+    format: str = "json"
+    dtype: str = "float64"
+
+
+# Largest observing list accepted by /search/batch
+MAX_BATCH_NAMES = 500
+
+# Response layouts for object lists: row records, newline-delimited rows, or one array per column
+OBJECT_FORMATS = ("json", "ndjson", "columnar")
+
+
+def _ndjson_response(table: ObjectTable, rename=None, headers=None, page=None):
+    # A paged response starts with one {"page": {...}} line so clients can request the next page
+    chunks = table.ndjson_chunks(rename)
+    if page:
+        chunks = itertools.chain([json.dumps({"page": {**page, "count": len(table)}}) + "\n"], chunks)
+    return StreamingResponse(chunks, media_type="application/x-ndjson", headers=headers)
+
+
+def _columnar_response(table: ObjectTable, rename=None, **extra):
+    # Serialized directly rather than through FastAPI's per-element jsonable_encoder walk
+    return JSONResponse({**extra, "count": len(table), "data": table.to_columns(rename)})
+
+
+@router.get("/sites")
+def get_sites():
+    """
+    List the configured observer sites.
+    """
+    return {"success": True, "data": [site.to_dict() for site in list_sites()]}
+
+@router.get("/observing-window")
+async def get_observing_window_info(
+    site: Optional[str] = Query(None, description="Observer site id; default site if omitted")
+):
+    """
+    Get tonight's sunset/sunrise, twilight, moonrise/moonset and moon illumination
+    for a site, plus the current sun and moon altitude.
+    """
+    try:
+        observer = get_site(site)
+        loop = asyncio.get_running_loop()
+        # Cached per site and night; only the first request of a night computes it
+        window = await loop.run_in_executor(None, get_observing_window, observer)
+        now = await loop.run_in_executor(None, current_conditions, observer)
+        return {"success": True, "data": {**window.to_dict(), "now": now}}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
 @router.get("/visible")
-def get_visible_objects(
+async def get_visible_objects(
     min_alt_deg: float = Query(30.0, description="Minimum altitude in degrees"),
-    magnitude: float = Query(6.5, description="Maximum visual magnitude")
+    magnitude: float = Query(6.5, description="Maximum visual magnitude"),
+    mode: str = Query("zenith", description="zenith, or hemisphere for everything above min_alt_deg (streamed with format=ndjson)"),
+    output_format: str = Query("json", alias="format", description="json, ndjson or columnar"),
+    site: Optional[str] = Query(None, description="Observer site id (see /api/sites); default site if omitted"),
+    night_only: bool = Query(False, description="Return an empty list without querying while the sun is up"),
+    otype: Optional[List[str]] = Query(None, description="Object types to keep (repeatable), e.g. Star, Galaxy, Planet"),
+    az_min: Optional[float] = Query(None, ge=0.0, le=360.0, description="Azimuth range start in degrees"),
+    az_max: Optional[float] = Query(None, ge=0.0, le=360.0, description="Azimuth range end; below az_min wraps through north"),
+    sort: Optional[str] = Query(None, description="Sort key: magnitude, alt, az or name"),
+    order: str = Query("asc", description="asc or desc"),
+    offset: int = Query(0, ge=0, description="Matching objects to skip"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size; all matching objects if omitted")
 ):
     """
-    Get visible astronomical objects based on altitude and magnitude filters.
+    Get visible astronomical objects based on altitude and magnitude filters,
+    optionally filtered by type and azimuth range, sorted and paginated.
     """
+    if output_format not in OBJECT_FORMATS:
+        return {"error": f"Unknown format: {output_format}"}
+    if order not in ("asc", "desc"):
+        return {"error": f"Unknown order: {order}"}
+    if (az_min is None) != (az_max is None):
+        return {"error": "az_min and az_max must be given together"}
+    try:
+        observer = get_site(site)
+    except ValueError as e:
+        return {"error": str(e)}
+    az_range = None if az_min is None else (az_min, az_max)
+    paged = bool(otype) or az_range is not None or sort is not None or offset > 0 or limit is not None
+
+    if night_only and await asyncio.get_running_loop().run_in_executor(None, is_daytime, observer):
+        return {"message": f"Daytime at {observer.name}; see /api/observing-window for tonight's dark hours.",
+                "daytime": True, "data": []}
+
+    if mode == "hemisphere":
+        if paged:
+            return {"error": "Type/azimuth filters, sorting and paging are only available in zenith mode"}
+        if output_format != "ndjson":
+            batches = [batch async for batch in visible_hemisphere_stream(min_alt_deg, magnitude, site)]
+            objects = ObjectTable.concat(batches)
+            if output_format == "columnar":
+                return _columnar_response(objects)
+            return {"count": len(objects), "data": objects.to_records()}
+
+        async def generate_objects():
+            async for batch in visible_hemisphere_stream(min_alt_deg, magnitude, site):
+                for chunk in batch.ndjson_chunks():
+                    yield chunk
+
+        return StreamingResponse(generate_objects(), media_type="application/x-ndjson")
+    if mode != "zenith":
+        return {"error": f"Unknown mode: {mode}"}
+
     try:
-        objects = visible_objects_bundoora(min_alt_deg, magnitude)
-        if not objects:
+        if paged:
+            objects, total = await visible_objects_page_async(min_alt_deg, magnitude, site, otype, az_range,
+                                                              sort, order == "desc", offset, limit)
+            page = {"total": total, "offset": offset, "limit": limit}
+        else:
+            objects = await visible_objects_async(min_alt_deg, magnitude, site)
+            page = {}
+        if output_format == "ndjson":
+            return _ndjson_response(objects, page=page)
+        if output_format == "columnar":
+            return _columnar_response(objects, **page)
+        if page:
+            return {"count": len(objects), **page, "data": objects.to_records()}
+        if not len(objects):
             return {
                 "message": "No objects found. Check if it is night time or adjust filters.",
                 "data": []
             }
-        return {"count": len(objects), "data": objects}
+        return {"count": len(objects), "data": objects.to_records()}
+    except Exception as e:
+        return {"error": str(e)}
+
+@router.get("/visible/changes")
+async def get_visible_changes(
+    since: Optional[int] = Query(None, description="Version from a previous response; omit for a full snapshot"),
+    min_alt_deg: float = Query(30.0, description="Minimum altitude in degrees"),
+    magnitude: float = Query(6.5, description="Maximum visual magnitude"),
+    site: Optional[str] = Query(None, description="Observer site id; default site if omitted")
+):
+    """
+    Get the objects that rose above or set below min_alt_deg since a version.
+    When reset is true, the client should replace its list with "visible".
+    """
+    try:
+        changes = await visible_changes_async(min_alt_deg, magnitude, since, site)
+        response = {
+            "version": changes["version"],
+            "reset": changes["reset"],
+            "rose": changes["rose"].to_records(),
+            "set": changes["set"].to_records()
+        }
+        if changes["reset"]:
+            response["visible"] = changes["visible"].to_records()
+        return response
     except Exception as e:
         return {"error": str(e)}
 
 @router.get("/search")
-def search_astronomical_objects(
+async def search_astronomical_objects(
     query: str = Query(..., description="Search term for astronomical object"),
-    max_results: int = Query(5, description="Maximum number of results to return")
+    max_results: int = Query(5, description="Maximum number of results to return"),
+    output_format: str = Query("json", alias="format", description="json, ndjson or columnar"),
+    site: Optional[str] = Query(None, description="Observer site id for alt/az; default site if omitted")
 ):
     """
     Search for astronomical objects by name using SIMBAD.
+    approximate is true when nothing matched and the results are fuzzy matches from the local catalog.
+    """
+    if output_format not in OBJECT_FORMATS:
+        return {"success": False, "error": f"Unknown format: {output_format}", "data": []}
+    try:
+        objects, approximate = await search_objects_async(query, max_results, site)
+        if output_format == "ndjson":
+            return _ndjson_response(objects, SEARCH_FIELDS, headers={"X-Approximate": str(approximate).lower()})
+        if output_format == "columnar":
+            return _columnar_response(objects, SEARCH_FIELDS, success=True, approximate=approximate)
+        return {"success": True, "count": len(objects), "approximate": approximate,
+                "data": objects.to_records(SEARCH_FIELDS)}
+    except Exception as e:
+        return {"success": False, "error": str(e), "data": []}
+
+@router.post("/search/batch")
+async def search_astronomical_objects_batch(request: BatchSearchRequest):
     """
+    Resolve a list of object names at once (e.g. an observing list).
+    Local catalog and cache hits are answered directly; the rest are resolved with a single SIMBAD query.
+    """
+    if len(request.names) > MAX_BATCH_NAMES:
+        return {"success": False, "error": f"At most {MAX_BATCH_NAMES} names per batch", "data": []}
     try:
-        objects = search_objects(query, max_results)
-        return {"success": True, "count": len(objects), "data": objects}
+        results = await resolve_objects_batch_async(request.names, request.site)
+        found = sum(1 for result in results if result["found"])
+        return {"success": True, "count": len(results), "found": found, "data": results}
     except Exception as e:
         return {"success": False, "error": str(e), "data": []}
 
+@router.get("/search/autocomplete")
+def autocomplete_astronomical_objects(
+    q: str = Query(..., description="Partially typed object name"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of candidates to return")
+):
+    """
+    Suggest object names as the user types, from the offline identifier index.
+    """
+    try:
+        candidates = autocomplete_objects(q, limit)
+        return {"success": True, "count": len(candidates), "data": candidates}
+    except Exception as e:
+        return {"success": False, "error": str(e), "data": []}
+
+@router.post("/ephemeris/curves")
+async def get_altitude_curves(request: AltitudeCurvesRequest):
+    """
+    Tonight's altitude curves, rise/transit/set times and maximum altitude for a list of objects.
+    """
+    if len(request.names) > MAX_BATCH_NAMES:
+        return {"success": False, "error": f"At most {MAX_BATCH_NAMES} names per request", "data": []}
+    if not 1.0 <= request.stepMinutes <= 120.0:
+        return {"success": False, "error": "stepMinutes must be between 1 and 120", "data": []}
+    try:
+        curves = await altitude_curves_async(request.names, request.stepMinutes, request.site)
+        return {"success": True, **curves}
+    except Exception as e:
+        return {"success": False, "error": str(e), "data": []}
+
+@router.post("/coords/convert")
+async def convert_coordinates(
+    request: Request,
+    frame: str = Query("radec", description="Input frame of a binary body: radec or altaz"),
+    time: Optional[str] = Query(None, description="Binary body: unix seconds or ISO time; now if omitted"),
+    site: Optional[str] = Query(None, description="Binary body: observer site id; default site if omitted"),
+    mode: Optional[str] = Query(None, description="Binary body: fast or precise (default ALTAZ_MODE)"),
+    output_format: str = Query("json", alias="format", description="Binary body: json or binary response"),
+    dtype: str = Query("float64", description="Binary body: float64 or float32 for the binary payloads")
+):
+    """
+    Convert arrays of RA/Dec to Alt/Az (or Alt/Az to RA/Dec) for one time and site in a single batch.
+
+    Send either a JSON body ({"frame": "radec", "ra": [...], "dec": [...], "time": ..., "site": ...})
+    or an application/octet-stream body of two little-endian float column blocks with the
+    settings in the query string. format=binary returns the two output columns the same way.
+    """
+    try:
+        if request.headers.get("content-type", "").startswith("application/octet-stream"):
+            first, second = decode_binary(frame, await request.body(), dtype)
+        else:
+            body = CoordsConvertRequest(**await request.json())
+            frame, time, site, mode = body.frame, body.time, body.site, body.mode
+            output_format, dtype = body.format, body.dtype
+            columns = (body.ra, body.dec) if frame == "radec" else (body.alt, body.az)
+            first, second = (column or [] for column in columns)
+        if output_format not in ("json", "binary"):
+            raise ValueError(f"Unknown format: {output_format}")
+        check_dtype(dtype)
+        observer = get_site(site)
+        obstime = parse_time(time)
+        result = await asyncio.get_running_loop().run_in_executor(
+            None, convert, frame, first, second, obstime, observer, mode)
+
+        count = len(next(iter(result.values())))
+        if output_format == "binary":
+            return Response(encode_binary(result, dtype), media_type="application/octet-stream",
+                            headers={"X-Columns": ",".join(result), "X-Count": str(count), "X-Dtype": dtype,
+                                     "X-Time": obstime.isot, "X-Site": observer.site_id})
+        return JSONResponse({"success": True, "count": count, "time": obstime.isot, "site": observer.site_id,
+                             "data": {name: column.tolist() for name, column in result.items()}})
+    except Exception as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+
 @router.get("/weather")
 def get_weather():
     """
     Get current weather data from ThingSpeak including temperature, humidity, pressure, dew point,
     and telescope safety status.
+    Served from the background poller's latest snapshot, with its age and a stale flag.
     """
     try:
-        weather_data = get_weather_status()
+        weather_data = weather_poller.snapshot()
         return {"success": True, "data": weather_data}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+@router.get("/weather/providers")
+def get_weather_providers():
+    """
+    Per-provider latency (p50/p95), the hedge delay derived from it, and success/failure/win counts.
+    """
+    return {"success": True, "data": weather_source.stats()}
+
+@router.get("/weather/stream")
+async def stream_weather():
+    """
+    Server-sent events: a full weather snapshot on connect, then "delta" events with only the
+    changed fields, "transition" events for GREEN/YELLOW/RED level changes, and "stale" events
+    when the data goes stale or the station stops answering.
+    """
+    return StreamingResponse(weather_alerts.subscribe(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/weather/history")
+async def get_weather_history(
+    start: Optional[str] = Query(None, description="Window start (unix seconds or ISO); 24 hours before end if omitted"),
+    end: Optional[str] = Query(None, description="Window end (unix seconds or ISO); now if omitted"),
+    resolution: str = Query("auto", description="auto, raw, 1m, 10m or 1h"),
+    metrics: Optional[str] = Query(None, description="Comma-separated metrics, e.g. temperature,dew_point; all if omitted")
+):
+    """
+    Weather history for trend charts: min/max/mean per bucket from the rollups,
+    or raw samples with resolution=raw.
+    """
+    try:
+        end_time = parse_time(end).unix if end else None
+        start_time = parse_time(start).unix if start else None
+        names = [name.strip() for name in metrics.split(",") if name.strip()] if metrics else None
+        history = await asyncio.get_running_loop().run_in_executor(
+            None, weather_history.query, start_time, end_time, resolution, names)
+        return {"success": True, **history}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@router.get("/safety/decisions")
+def get_safety_decisions(limit: int = Query(50, ge=1, le=500, description="Maximum number of decisions, newest first")):
+    """
+    The safety watchdog's recent decisions (trips, parks, failed parks, clears) with their timings.
+    """
+    return {"success": True, "state": safety_watchdog.state, "data": safety_watchdog.recent_decisions(limit)}
+
+@router.get("/safety/metrics")
+def get_safety_metrics():
+    """
+    Safety watchdog state, trip count and reaction latency (sample received to mount parked) p50/p95/max.
+    """
+    return {"success": True, "data": safety_watchdog.metrics()}
+
+
 # ASCOM Alpaca telescope endpoints
 @router.get("/telescope/discover")
 async def discover_ascom_devices():
@@ -1,6 +1,20 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import routes
+from app.services.catalog import (CATALOG_BUILD_ON_START, CATALOG_PATH, CATALOG_REFRESH_HOURS, build_missing_catalog,
+                                  catalog_refresh_loop, get_catalog)
+from app.services.ephemeris import ephemeris_refresh_loop
+from app.services.simbad import visible_caches, min_alt_deg, magnitude
+from app.services.sites import get_site, list_sites
+from app.services.iers_bundle import configure_astropy, warm_up
+from app.services.visibility_cache import visible_cache_refresh_loop
+from app.services.weather_data import close_session as close_weather_session
+from app.services.weather_poller import weather_poller
+from app.services.weather_history import weather_history
+from app.services.weather_alerts import weather_alerts
+from app.services.safety_watchdog import safety_watchdog
+import asyncio
 import logging
 
 # Configure logging
@@ -9,10 +23,53 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background tasks alongside the application."""
+    # Offline IERS data and a warm-up transform before the first request is served
+    configure_astropy()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, warm_up, list_sites())
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Warm-up failed: {e}")
+
+    background_tasks = []
+    for site_id, cache in visible_caches.items():
+        site = get_site(site_id)
+        background_tasks.append(asyncio.create_task(
+            visible_cache_refresh_loop(cache, warm_filters=[(min_alt_deg, magnitude)])))
+        background_tasks.append(asyncio.create_task(ephemeris_refresh_loop(site.lat, site.lon)))
+    weather_poller.add_listener(weather_history.observe)
+    weather_poller.add_listener(weather_alerts.publish)
+    weather_poller.add_attempt_listener(weather_alerts.observe_health)
+    weather_poller.add_listener(safety_watchdog.observe)
+    background_tasks.append(asyncio.create_task(safety_watchdog.run()))
+    background_tasks.append(asyncio.create_task(weather_poller.run()))
+    if CATALOG_REFRESH_HOURS > 0:
+        # Also builds the catalog straight away if there is none
+        background_tasks.append(asyncio.create_task(catalog_refresh_loop(CATALOG_REFRESH_HOURS)))
+    elif get_catalog() is None:
+        if CATALOG_BUILD_ON_START:
+            background_tasks.append(asyncio.create_task(build_missing_catalog()))
+        else:
+            logging.getLogger(__name__).warning(
+                f"No offline catalog at {CATALOG_PATH}: running in SIMBAD fallback mode. "
+                f"Build it with `python -m app.services.catalog` or set CATALOG_BUILD_ON_START=true")
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await close_weather_session()
+    await asyncio.get_running_loop().run_in_executor(None, weather_history.close)
+
+
 app = FastAPI(
     title="Telescope Simulator API",
     description="API backend for astronomical object queries",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -0,0 +1,287 @@
+"""
+Vectorized RA/Dec <-> Alt/Az engine.
+This module replaces SkyCoord.transform_to(AltAz) on the hot path with a
+single 3x3 rotation applied to arrays of ICRS unit vectors.
+
+The slowly varying part of the transform (precession, nutation, Earth
+velocity for aberration, UT1-UTC) is computed once per time bucket and
+cached; only the Earth rotation angle is evaluated per call.
+
+Accuracy modes:
+    "fast"    - IAU 1976 precession and GMST only, pure NumPy.
+                Agrees with astropy's AltAz to within 1 arcminute.
+    "precise" - IAU 2006/2000A bias-precession-nutation, GAST, UT1 and
+                annual aberration. Agrees with astropy's AltAz (no
+                refraction) to within 2 arcseconds.
+"""
+
+import os
+import logging
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+import erfa
+from astropy.time import Time
+
+logger = logging.getLogger(__name__)
+
+ALTAZ_MODE = os.getenv("ALTAZ_MODE", "precise")
+ALTAZ_BUCKET_SECONDS = float(os.getenv("ALTAZ_BUCKET_SECONDS", "600"))
+MODES = ("fast", "precise")
+
+# Agreement with astropy's AltAz frame that each mode is tested against
+TOLERANCE_ARCSEC = {"fast": 60.0, "precise": 2.0}
+
+J2000 = 2451545.0
+ARCSEC = np.pi / (180.0 * 3600.0)
+SPEED_OF_LIGHT_AU_PER_DAY = 173.1446326846693
+
+
+def _rot_y(angle: float) -> np.ndarray:
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, 0.0, -s], [0.0, 1.0, 0.0], [s, 0.0, c]])
+
+
+def _rot_z(angle: float) -> np.ndarray:
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, s, 0.0], [-s, c, 0.0], [0.0, 0.0, 1.0]])
+
+
+def _precession_iau1976(jd_tt: float) -> np.ndarray:
+    """IAU 1976 precession matrix from J2000 to the mean equator of date."""
+    t = (jd_tt - J2000) / 36525.0
+    zeta = (2306.2181 * t + 0.30188 * t**2 + 0.017998 * t**3) * ARCSEC
+    z = (2306.2181 * t + 1.09468 * t**2 + 0.018203 * t**3) * ARCSEC
+    theta = (2004.3109 * t - 0.42665 * t**2 - 0.041833 * t**3) * ARCSEC
+    return _rot_z(-z) @ _rot_y(theta) @ _rot_z(-zeta)
+
+
+def _gmst_iau1982(jd_ut1: float) -> float:
+    """Greenwich mean sidereal time in radians."""
+    d = jd_ut1 - J2000
+    t = d / 36525.0
+    gmst_deg = 280.46061837 + 360.98564736629 * d + 0.000387933 * t**2 - t**3 / 38710000.0
+    return np.radians(gmst_deg % 360.0)
+
+
+@lru_cache(maxsize=32)
+def site_matrix(lat_deg: float) -> np.ndarray:
+    """Rotation from the local hour-angle frame (x = meridian, y = east) to (east, north, up); cached per site."""
+    phi = np.radians(lat_deg)
+    return np.array([
+        [0.0, 1.0, 0.0],
+        [-np.sin(phi), 0.0, np.cos(phi)],
+        [np.cos(phi), 0.0, np.sin(phi)],
+    ])
+
+
+class _BucketTerms:
+    """Per-bucket transform terms: everything except Earth rotation."""
+
+    def __init__(self, npb: np.ndarray, equation_of_equinoxes: float, dut1: float,
+                 velocity: Optional[np.ndarray], bm1: float):
+        self.npb = npb
+        self.equation_of_equinoxes = equation_of_equinoxes
+        self.dut1 = dut1
+        self.velocity = velocity
+        self.bm1 = bm1
+
+
+@lru_cache(maxsize=64)
+def _bucket_terms(bucket: int, mode: str) -> _BucketTerms:
+    mid = Time((bucket + 0.5) * ALTAZ_BUCKET_SECONDS, format="unix")
+    tt = mid.tt
+    if mode == "fast":
+        return _BucketTerms(_precession_iau1976(tt.jd1 + tt.jd2), 0.0, 0.0, None, 1.0)
+
+    try:
+        dut1 = float(mid.get_delta_ut1_utc().to_value("s"))
+    except Exception as e:
+        logger.warning(f"UT1-UTC unavailable, assuming 0: {e}")
+        dut1 = 0.0
+    ut1_jd2 = mid.utc.jd2 + dut1 / 86400.0
+    npb = erfa.pnm06a(tt.jd1, tt.jd2)
+    equation_of_equinoxes = (erfa.gst06a(mid.utc.jd1, ut1_jd2, tt.jd1, tt.jd2)
+                             - erfa.gmst06(mid.utc.jd1, ut1_jd2, tt.jd1, tt.jd2))
+    _, pvb = erfa.epv00(tt.jd1, tt.jd2)
+    velocity = np.asarray(pvb[1].tolist()) / SPEED_OF_LIGHT_AU_PER_DAY
+    bm1 = float(np.sqrt(1.0 - velocity @ velocity))
+    return _BucketTerms(npb, float(equation_of_equinoxes), dut1, velocity, bm1)
+
+
+def _resolve(obstime: Optional[Time], mode: Optional[str]) -> Tuple[Time, str, _BucketTerms]:
+    obstime = Time.now() if obstime is None else obstime
+    mode = mode or ALTAZ_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown alt/az accuracy mode: {mode} (expected one of {MODES})")
+    bucket = int(np.floor(obstime.unix / ALTAZ_BUCKET_SECONDS))
+    return obstime, mode, _bucket_terms(bucket, mode)
+
+
+def _sidereal_time(obstime: Time, mode: str, terms: _BucketTerms) -> float:
+    utc = obstime.utc
+    ut1_jd2 = utc.jd2 + terms.dut1 / 86400.0
+    if mode == "fast":
+        return _gmst_iau1982(utc.jd1 + ut1_jd2)
+    tt = obstime.tt
+    return erfa.gmst06(utc.jd1, ut1_jd2, tt.jd1, tt.jd2) + terms.equation_of_equinoxes
+
+
+def _matrix(obstime: Time, mode: str, terms: _BucketTerms, lat_deg: float, lon_deg: float) -> np.ndarray:
+    local_sidereal = _sidereal_time(obstime, mode, terms) + np.radians(lon_deg)
+    return site_matrix(lat_deg) @ _rot_z(local_sidereal) @ terms.npb
+
+
+def topocentric_matrix(obstime: Optional[Time], lat_deg: float, lon_deg: float,
+                       mode: Optional[str] = None) -> np.ndarray:
+    """
+    Build the 3x3 rotation from (aberrated) ICRS unit vectors to local (east, north, up).
+
+    Args:
+        obstime: Observation time (defaults to now)
+        lat_deg: Site latitude in degrees
+        lon_deg: Site longitude in degrees (east positive)
+        mode: "fast" or "precise" (defaults to ALTAZ_MODE)
+
+    Returns:
+        3x3 rotation matrix
+    """
+    obstime, mode, terms = _resolve(obstime, mode)
+    return _matrix(obstime, mode, terms, lat_deg, lon_deg)
+
+
+def _aberrate(xyz: np.ndarray, terms: _BucketTerms) -> np.ndarray:
+    """Apply annual aberration to (N, 3) unit vectors (light deflection neglected)."""
+    if terms.velocity is None:
+        return xyz
+    v = terms.velocity
+    pdv = xyz @ v
+    shifted = xyz * terms.bm1 + (1.0 + pdv / (1.0 + terms.bm1))[:, None] * v
+    return shifted / np.linalg.norm(shifted, axis=1)[:, None]
+
+
+def unit_vectors_to_altaz(xyz: np.ndarray, obstime: Optional[Time], lat_deg: float, lon_deg: float,
+                          mode: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Transform an (N, 3) array of ICRS unit vectors to altitude/azimuth in degrees.
+
+    Returns:
+        Tuple of (alt_deg, az_deg) arrays; azimuth is measured from north through east
+    """
+    obstime, mode, terms = _resolve(obstime, mode)
+    xyz = np.atleast_2d(np.asarray(xyz, dtype=float))
+    matrix = _matrix(obstime, mode, terms, lat_deg, lon_deg)
+    enu = _aberrate(xyz, terms) @ matrix.T
+    alt = np.degrees(np.arcsin(np.clip(enu[:, 2], -1.0, 1.0)))
+    az = np.degrees(np.arctan2(enu[:, 0], enu[:, 1])) % 360.0
+    return alt, az
+
+
+def radec_to_altaz(ra_deg, dec_deg, obstime: Optional[Time], lat_deg: float, lon_deg: float,
+                   mode: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Transform ICRS RA/Dec (degrees, scalars or arrays) to altitude/azimuth in degrees.
+
+    Args:
+        ra_deg: Right ascension in degrees
+        dec_deg: Declination in degrees
+        obstime: Observation time (defaults to now)
+        lat_deg: Site latitude in degrees
+        lon_deg: Site longitude in degrees (east positive)
+        mode: "fast" or "precise" (defaults to ALTAZ_MODE)
+
+    Returns:
+        Tuple of (alt_deg, az_deg) arrays
+    """
+    ra = np.radians(np.atleast_1d(np.asarray(ra_deg, dtype=float)))
+    dec = np.radians(np.atleast_1d(np.asarray(dec_deg, dtype=float)))
+    cos_dec = np.cos(dec)
+    xyz = np.column_stack((cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)))
+    return unit_vectors_to_altaz(xyz, obstime, lat_deg, lon_deg, mode)
+
+
+def altaz_to_unit_vectors(alt_deg, az_deg, obstime: Optional[Time], lat_deg: float, lon_deg: float,
+                          mode: Optional[str] = None) -> np.ndarray:
+    """Inverse of unit_vectors_to_altaz: Alt/Az in degrees to an (N, 3) array of ICRS unit vectors."""
+    obstime, mode, terms = _resolve(obstime, mode)
+    alt = np.radians(np.atleast_1d(np.asarray(alt_deg, dtype=float)))
+    az = np.radians(np.atleast_1d(np.asarray(az_deg, dtype=float)))
+    cos_alt = np.cos(alt)
+    enu = np.column_stack((cos_alt * np.sin(az), cos_alt * np.cos(az), np.sin(alt)))
+    matrix = _matrix(obstime, mode, terms, lat_deg, lon_deg)
+    xyz = enu @ matrix
+    if terms.velocity is not None:
+        # First-order inverse of the aberration shift; the residual is of order v^2 (~1 mas)
+        xyz = xyz - terms.velocity
+        xyz /= np.linalg.norm(xyz, axis=1)[:, None]
+    return xyz
+
+
+def altaz_to_radec(alt_deg, az_deg, obstime: Optional[Time], lat_deg: float, lon_deg: float,
+                   mode: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Transform altitude/azimuth in degrees back to ICRS RA/Dec in degrees."""
+    xyz = altaz_to_unit_vectors(alt_deg, az_deg, obstime, lat_deg, lon_deg, mode)
+    ra = np.degrees(np.arctan2(xyz[:, 1], xyz[:, 0])) % 360.0
+    dec = np.degrees(np.arcsin(np.clip(xyz[:, 2], -1.0, 1.0)))
+    return ra, dec
+
+
+def unit_vectors_to_altaz_series(xyz: np.ndarray, obstimes: Time, lat_deg: float, lon_deg: float,
+                                 mode: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Transform (T, N, 3) ICRS unit vectors, one set per time in obstimes, to altitude/azimuth in one batch.
+
+    Precession, nutation and aberration are taken from the middle time's
+    bucket; over a night they drift far less than the mode's tolerance, so
+    only the Earth rotation angle is evaluated per time.
+
+    Returns:
+        Tuple of (alt_deg, az_deg) arrays of shape (T, N)
+    """
+    xyz = np.asarray(xyz, dtype=float)
+    _, mode, terms = _resolve(obstimes[len(obstimes) // 2], mode)
+    angle = np.atleast_1d(_sidereal_time(obstimes, mode, terms)) + np.radians(lon_deg)
+    apparent = (_aberrate(xyz.reshape(-1, 3), terms) @ terms.npb.T).reshape(xyz.shape)
+    c, s = np.cos(angle)[:, None], np.sin(angle)[:, None]
+    hour_angle_frame = np.stack((c * apparent[..., 0] + s * apparent[..., 1],
+                                 -s * apparent[..., 0] + c * apparent[..., 1],
+                                 apparent[..., 2]), axis=-1)
+    enu = hour_angle_frame @ site_matrix(lat_deg).T
+    alt = np.degrees(np.arcsin(np.clip(enu[..., 2], -1.0, 1.0)))
+    az = np.degrees(np.arctan2(enu[..., 0], enu[..., 1])) % 360.0
+    return alt, az
+
+
+def zenith_unit_vectors(obstimes: Time, lat_deg: float, lon_deg: float, mode: Optional[str] = None) -> np.ndarray:
+    """(T, 3) ICRS unit vectors of the local zenith at each time (aberration neglected)."""
+    _, mode, terms = _resolve(obstimes[len(obstimes) // 2], mode)
+    angle = np.atleast_1d(_sidereal_time(obstimes, mode, terms)) + np.radians(lon_deg)
+    phi = np.radians(lat_deg)
+    of_date = np.column_stack((np.cos(phi) * np.cos(angle), np.cos(phi) * np.sin(angle),
+                               np.full(len(angle), np.sin(phi))))
+    return of_date @ terms.npb
+
+
+def zenith_unit_vector(obstime: Optional[Time], lat_deg: float, lon_deg: float,
+                       mode: Optional[str] = None) -> np.ndarray:
+    """ICRS unit vector of the local zenith."""
+    return altaz_to_unit_vectors(90.0, 0.0, obstime, lat_deg, lon_deg, mode)[0]
+
+
+def apparent_unit_vectors(xyz: np.ndarray, obstime: Optional[Time], mode: Optional[str] = None) -> np.ndarray:
+    """
+    ICRS unit vectors to (aberrated) true equator and equinox of date.
+
+    Rotating the result by the local apparent sidereal time gives the local
+    hour-angle frame, so over a night these vectors are effectively fixed.
+    """
+    obstime, mode, terms = _resolve(obstime, mode)
+    xyz = np.atleast_2d(np.asarray(xyz, dtype=float))
+    return _aberrate(xyz, terms) @ terms.npb.T
+
+
+def local_sidereal_angle(obstime: Optional[Time], lon_deg: float, mode: Optional[str] = None) -> float:
+    """Local apparent (precise) or mean (fast) sidereal time in radians, in [0, 2pi)."""
+    obstime, mode, terms = _resolve(obstime, mode)
+    return float((_sidereal_time(obstime, mode, terms) + np.radians(lon_deg)) % (2.0 * np.pi))
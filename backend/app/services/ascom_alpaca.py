@@ -3,13 +3,33 @@ ASCOM Alpaca telescope integration service.
 This module handles discovery and communication with ASCOM Alpaca telescopes.
 """
 
+import os
+import time
 import asyncio
 import aiohttp
-from typing import List, Dict, Optional
+from datetime import datetime, timezone
+from typing import Any, List, Dict, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bound on each status property read; a property that misses it is served from its last good value
+ASCOM_PROPERTY_TIMEOUT_SECONDS = float(os.getenv("ASCOM_PROPERTY_TIMEOUT_SECONDS", "2"))
+
+# Status field -> (Alpaca telescope property, default before the first good read)
+STATUS_PROPERTIES = {
+    "rightAscension": ("rightascension", 0),
+    "declination": ("declination", 0),
+    "altitude": ("altitude", 0),
+    "azimuth": ("azimuth", 0),
+    "tracking": ("tracking", False),
+    "slewing": ("slewing", False),
+}
+
+
+def _iso(t: float) -> str:
+    return datetime.fromtimestamp(t, timezone.utc).isoformat()
+
 
 class AscomDevice:
     """Represents an ASCOM Alpaca device."""
@@ -41,6 +61,8 @@ class AscomAlpacaClient:
         self.connected_device: Optional[AscomDevice] = None
         self.session: Optional[aiohttp.ClientSession] = None
         self.base_url: Optional[str] = None
+        # Status field -> (last good value, unix time it was read)
+        self._last_status: Dict[str, Tuple[Any, float]] = {}
 
     async def discover_devices(self, timeout: int = 5, device_type: str = 'telescope') -> List[AscomDevice]:
         """
@@ -178,6 +200,7 @@ class AscomAlpacaClient:
         try:
             self.connected_device = device
             self.base_url = f"http://{device.ip_address}:{device.port}/api/v1/telescope/{device.device_number}"
+            self._last_status = {}
 
             # Create persistent session
             if self.session:
@@ -233,54 +256,67 @@ class AscomAlpacaClient:
             logger.error(f"Disconnect error: {e}")
             return False
 
+    async def _read_property(self, name: str) -> Any:
+        """GET one telescope property's Value, raising on HTTP or ASCOM errors."""
+        async with self.session.get(f"{self.base_url}/{name}") as resp:
+            if resp.status != 200:
+                raise Exception(f"HTTP {resp.status}")
+            data = await resp.json()
+        if data.get('ErrorNumber', 0) != 0:
+            raise Exception(f"{data.get('ErrorMessage', 'Unknown error')} (Error #{data.get('ErrorNumber')})")
+        return data.get('Value')
+
     async def get_status(self) -> Dict:
-        """Get current telescope status."""
+        """
+        Get current telescope status.
+
+        All properties are read concurrently, each bounded by
+        ASCOM_PROPERTY_TIMEOUT_SECONDS, so a status costs about one round trip.
+        A property that fails or times out keeps its last good value;
+        "fields" gives each field's freshness (fresh, age_seconds, error).
+        Raises only if every property failed.
+        """
         if not self.session or not self.base_url:
             raise Exception("Not connected to telescope")
 
-        try:
-            # Get various status properties
-            async with self.session.get(f"{self.base_url}/rightascension") as resp:
-                ra_data = await resp.json()
-                ra = ra_data.get('Value', 0)
-
-            async with self.session.get(f"{self.base_url}/declination") as resp:
-                dec_data = await resp.json()
-                dec = dec_data.get('Value', 0)
-
-            async with self.session.get(f"{self.base_url}/altitude") as resp:
-                alt_data = await resp.json()
-                alt = alt_data.get('Value', 0)
-
-            async with self.session.get(f"{self.base_url}/azimuth") as resp:
-                az_data = await resp.json()
-                az = az_data.get('Value', 0)
-
-            async with self.session.get(f"{self.base_url}/tracking") as resp:
-                tracking_data = await resp.json()
-                tracking = tracking_data.get('Value', False)
-
-            async with self.session.get(f"{self.base_url}/slewing") as resp:
-                slewing_data = await resp.json()
-                slewing = slewing_data.get('Value', False)
-
-            # Convert RA from hours to degrees (ASCOM returns hours, we use degrees)
-            ra_degrees = ra * 15.0  # 1 hour = 15 degrees
-
-            return {
-                "connected": True,
-                "tracking": tracking,
-                "slewing": slewing,
-                "rightAscension": ra_degrees,
-                "declination": dec,
-                "altitude": alt,
-                "azimuth": az,
-                "timestamp": ""
+        names = list(STATUS_PROPERTIES)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self._read_property(STATUS_PROPERTIES[name][0]), ASCOM_PROPERTY_TIMEOUT_SECONDS)
+              for name in names),
+            return_exceptions=True)
+        now = time.time()
+
+        status = {"connected": True}
+        fields = {}
+        errors = []
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                error = "timeout" if isinstance(result, asyncio.TimeoutError) else str(result) or repr(result)
+                errors.append(f"{STATUS_PROPERTIES[name][0]}: {error}")
+                value, read_at = self._last_status.get(name, (STATUS_PROPERTIES[name][1], None))
+            else:
+                value = STATUS_PROPERTIES[name][1] if result is None else result
+                read_at = now
+                self._last_status[name] = (value, now)
+                error = None
+            status[name] = value
+            fields[name] = {
+                "fresh": error is None,
+                "age_seconds": None if read_at is None else now - read_at,
+                "error": error,
             }
 
-        except Exception as e:
-            logger.error(f"Error getting status: {e}")
-            raise
+        if len(errors) == len(names):
+            logger.error(f"Error getting status: {'; '.join(errors)}")
+            raise Exception(f"Telescope status unavailable: {'; '.join(errors)}")
+        if errors:
+            logger.warning(f"Partial telescope status: {'; '.join(errors)}")
+
+        # Convert RA from hours to degrees (ASCOM returns hours, we use degrees)
+        status["rightAscension"] = status["rightAscension"] * 15.0  # 1 hour = 15 degrees
+        status["timestamp"] = _iso(now)
+        status["fields"] = fields
+        return status
 
     async def slew_to_coordinates(self, ra: float, dec: float) -> bool:
         """
@@ -344,6 +380,35 @@ class AscomAlpacaClient:
             logger.error(f"Tracking error: {e}")
             return False
 
+    async def park(self) -> bool:
+        """Park the telescope; True if the driver accepted the command."""
+        if not self.session or not self.base_url:
+            raise Exception("Not connected to telescope")
+
+        try:
+            form_data = aiohttp.FormData()
+            form_data.add_field('ClientID', '1')
+            form_data.add_field('ClientTransactionID', '1')
+
+            async with self.session.put(
+                f"{self.base_url}/park",
+                data=form_data
+            ) as resp:
+                if resp.status != 200:
+                    logger.error(f"HTTP error during park: {resp.status} - {await resp.text()}")
+                    return False
+                result = await resp.json()
+                if result.get('ErrorNumber', 0) != 0:
+                    logger.error(f"ASCOM error during park: {result.get('ErrorMessage', 'Unknown error')} "
+                                 f"(Error #{result.get('ErrorNumber')})")
+                    return False
+                logger.info("Parking telescope")
+                return True
+
+        except Exception as e:
+            logger.error(f"Park error: {e!r}")
+            return False
+
     async def abort_slew(self) -> bool:
         """Abort current slew operation."""
         if not self.session or not self.base_url:
@@ -0,0 +1,200 @@
+"""
+Offline sky catalog service.
+This module stores a bulk-ingested star/DSO table on disk and answers
+cone queries locally, so visible-object lookups don't need SIMBAD.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(BACKEND_DIR, "data", "catalog.npz"))
+CATALOG_MAX_MAGNITUDE = float(os.getenv("CATALOG_MAX_MAGNITUDE", "8.0"))
+CATALOG_REFRESH_HOURS = float(os.getenv("CATALOG_REFRESH_HOURS", "0"))  # 0 disables the background refresh
+# Build the catalog in the background at startup when there is none on disk
+CATALOG_BUILD_ON_START = os.getenv("CATALOG_BUILD_ON_START", "true").lower() == "true"
+
+# Objects without a V magnitude (many galaxies, nebulae and clusters) are only kept when they
+# have a Messier, NGC or IC designation; SIMBAD holds millions of faint unmeasured objects otherwise
+NO_MAGNITUDE_FILTER = ("(ids.ids LIKE 'M %' OR ids.ids LIKE '%|M %' OR ids.ids LIKE 'NGC %' "
+                       "OR ids.ids LIKE '%|NGC %' OR ids.ids LIKE 'IC %' OR ids.ids LIKE '%|IC %')")
+
+# ADQL used for the bulk ingest: one row per object with its V magnitude (NULL if unknown) and aliases
+INGEST_QUERY = """
+SELECT basic.main_id, basic.ra, basic.dec, basic.otype, allfluxes.V, ids.ids
+FROM basic
+LEFT JOIN allfluxes ON allfluxes.oidref = basic.oid
+JOIN ids ON ids.oidref = basic.oid
+WHERE (allfluxes.V <= {max_magnitude} OR (allfluxes.V IS NULL AND {no_magnitude_filter}))
+AND basic.ra IS NOT NULL AND basic.dec IS NOT NULL
+"""
+
+
+def radec_to_unit_vectors(ra_deg: np.ndarray, dec_deg: np.ndarray) -> np.ndarray:
+    """Convert ICRS RA/Dec in degrees to an (N, 3) array of unit vectors."""
+    ra = np.radians(np.asarray(ra_deg, dtype=float))
+    dec = np.radians(np.asarray(dec_deg, dtype=float))
+    cos_dec = np.cos(dec)
+    return np.column_stack((cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)))
+
+
+class SkyCatalog:
+    """
+    Columnar star/DSO table with precomputed ICRS unit vectors.
+
+    Rows are kept sorted by declination, which doubles as a zone index:
+    a cone query only scans the declination band that can intersect the
+    cone and then filters that band with a single dot product.
+    """
+
+    COLUMNS = ("name", "ids", "otype", "ra", "dec", "magnitude", "xyz")
+
+    def __init__(self, name: np.ndarray, ids: np.ndarray, otype: np.ndarray,
+                 ra: np.ndarray, dec: np.ndarray, magnitude: np.ndarray,
+                 xyz: Optional[np.ndarray] = None):
+        order = np.argsort(dec, kind="stable")
+        self.name = np.asarray(name, dtype=str)[order]
+        self.ids = np.asarray(ids, dtype=str)[order]
+        self.otype = np.asarray(otype, dtype=str)[order]
+        self.ra = np.asarray(ra, dtype=float)[order]
+        self.dec = np.asarray(dec, dtype=float)[order]
+        self.magnitude = np.asarray(magnitude, dtype=float)[order]
+        if xyz is None:
+            self.xyz = radec_to_unit_vectors(self.ra, self.dec)
+        else:
+            self.xyz = np.asarray(xyz, dtype=float)[order]
+
+    def __len__(self) -> int:
+        return len(self.ra)
+
+    @classmethod
+    def load(cls, path: str = CATALOG_PATH) -> "SkyCatalog":
+        """Load a catalog previously written with save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{column: data[column] for column in cls.COLUMNS})
+
+    def save(self, path: str = CATALOG_PATH) -> None:
+        """Write the catalog as a compressed columnar .npz file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, **{column: getattr(self, column) for column in self.COLUMNS})
+        os.replace(tmp_path, path)
+
+    def cone(self, center_xyz: np.ndarray, radius_deg: float) -> np.ndarray:
+        """
+        Find all rows within radius_deg of a direction.
+
+        Args:
+            center_xyz: ICRS unit vector of the cone centre
+            radius_deg: Cone radius in degrees
+
+        Returns:
+            Array of row indices inside the cone
+        """
+        center = np.asarray(center_xyz, dtype=float)
+        center_dec = np.degrees(np.arcsin(np.clip(center[2], -1.0, 1.0)))
+        lo = np.searchsorted(self.dec, center_dec - radius_deg, side="left")
+        hi = np.searchsorted(self.dec, center_dec + radius_deg, side="right")
+        band = self.xyz[lo:hi] @ center
+        return lo + np.nonzero(band >= np.cos(np.radians(radius_deg)))[0]
+
+
+def ingest_from_simbad(max_magnitude: float = CATALOG_MAX_MAGNITUDE) -> SkyCatalog:
+    """
+    Bulk-download every object brighter than max_magnitude from SIMBAD TAP,
+    plus the Messier/NGC/IC objects that have no V magnitude.
+    """
+    from astroquery.simbad import Simbad
+
+    logger.info(f"Ingesting SIMBAD catalog down to V={max_magnitude}...")
+    query = INGEST_QUERY.format(max_magnitude=max_magnitude, no_magnitude_filter=NO_MAGNITUDE_FILTER)
+    result = Simbad.query_tap(query, maxrec=2_000_000)
+    catalog = SkyCatalog(
+        name=[str(x).strip() for x in result["main_id"]],
+        ids=[str(x).strip() for x in result["ids"]],
+        otype=[str(x).strip() for x in result["otype"]],
+        ra=np.asarray(result["ra"], dtype=float),
+        dec=np.asarray(result["dec"], dtype=float),
+        magnitude=np.ma.filled(np.ma.asarray(result["V"], dtype=float), np.nan),
+    )
+    logger.info(f"Ingested {len(catalog)} objects")
+    return catalog
+
+
+_catalog: Optional[SkyCatalog] = None
+_catalog_lock = threading.Lock()
+_load_attempted = False
+
+
+def get_catalog() -> Optional[SkyCatalog]:
+    """Return the shared catalog, loading it from disk on first use (None if unavailable)."""
+    global _catalog, _load_attempted
+    if _load_attempted:
+        return _catalog
+    with _catalog_lock:
+        if not _load_attempted:
+            if os.path.exists(CATALOG_PATH):
+                try:
+                    _catalog = SkyCatalog.load(CATALOG_PATH)
+                    logger.info(f"Loaded offline catalog with {len(_catalog)} objects from {CATALOG_PATH}")
+                except Exception as e:
+                    logger.error(f"Failed to load offline catalog {CATALOG_PATH}: {e}")
+            else:
+                logger.info(f"No offline catalog at {CATALOG_PATH}; falling back to SIMBAD queries")
+            _load_attempted = True
+    return _catalog
+
+
+def set_catalog(catalog: SkyCatalog, persist: bool = True) -> None:
+    """Swap in a new catalog, optionally writing it to disk first."""
+    global _catalog, _load_attempted
+    if persist:
+        catalog.save(CATALOG_PATH)
+    with _catalog_lock:
+        _catalog = catalog
+        _load_attempted = True
+
+
+def refresh_catalog() -> Dict:
+    """Re-ingest the catalog from SIMBAD and swap it in. Safe to call from a background thread."""
+    catalog = ingest_from_simbad(CATALOG_MAX_MAGNITUDE)
+    set_catalog(catalog)
+    return {"count": len(catalog), "path": CATALOG_PATH}
+
+
+async def build_missing_catalog() -> None:
+    """One-off background ingest when the app starts without a catalog; SIMBAD serves requests until it is done."""
+    logger.warning(f"No offline catalog at {CATALOG_PATH}: /api/visible and /api/search are answered from live "
+                   f"SIMBAD queries until it is built (building it now in the background)")
+    try:
+        info = await asyncio.get_running_loop().run_in_executor(None, refresh_catalog)
+        logger.info(f"Built offline catalog: {info['count']} objects")
+    except Exception as e:
+        logger.error(f"Building the offline catalog failed, staying in SIMBAD fallback mode: {e}")
+
+
+async def catalog_refresh_loop(interval_hours: float = CATALOG_REFRESH_HOURS) -> None:
+    """Periodically re-ingest the catalog in the background; refreshes immediately if none is on disk."""
+    loop = asyncio.get_running_loop()
+    delay = 0 if get_catalog() is None else interval_hours * 3600
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            info = await loop.run_in_executor(None, refresh_catalog)
+            logger.info(f"Background catalog refresh complete: {info['count']} objects")
+        except Exception as e:
+            logger.error(f"Background catalog refresh failed: {e}")
+        delay = interval_hours * 3600
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    info = refresh_catalog()
+    print(f"Wrote {info['count']} objects to {info['path']}")
@@ -0,0 +1,97 @@
+"""
+Batch coordinate conversion for clients.
+Converts whole arrays of RA/Dec to Alt/Az (or back) for one time and site
+with the vectorized alt/az engine, so kiosks send one request instead of
+doing per-object math in the browser.
+
+Binary payloads are column blocks of little-endian floats: every value of
+the first coordinate, then every value of the second (ra then dec, or alt
+then az), with no header.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from astropy.time import Time
+
+from app.services.altaz import altaz_to_radec, radec_to_altaz
+
+# Input frame -> (input columns, output columns)
+FRAMES = {
+    "radec": (("ra", "dec"), ("alt", "az")),
+    "altaz": (("alt", "az"), ("ra", "dec")),
+}
+BINARY_DTYPES = {"float64": "<f8", "float32": "<f4"}
+MAX_CONVERT_ROWS = 1_000_000
+
+
+def parse_time(value=None) -> Time:
+    """Observation time from unix seconds, an ISO string, or now for None."""
+    if value is None or value == "":
+        return Time.now()
+    if isinstance(value, (int, float)):
+        return Time(float(value), format="unix")
+    try:
+        return Time(float(value), format="unix")
+    except ValueError:
+        return Time(value)
+
+
+def _check_frame(frame: str) -> Tuple[Tuple[str, str], Tuple[str, str]]:
+    if frame not in FRAMES:
+        raise ValueError(f"Unknown frame: {frame} (expected one of {tuple(FRAMES)})")
+    return FRAMES[frame]
+
+
+def check_dtype(dtype: str) -> str:
+    """NumPy little-endian type code for a binary dtype name; ValueError if unsupported."""
+    if dtype not in BINARY_DTYPES:
+        raise ValueError(f"Unknown dtype: {dtype} (expected one of {tuple(BINARY_DTYPES)})")
+    return BINARY_DTYPES[dtype]
+
+
+def convert(frame: str, first, second, obstime: Time, site, mode: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Convert two coordinate columns (degrees) in one batch.
+
+    Args:
+        frame: "radec" (first/second are ra/dec) or "altaz" (alt/az)
+        obstime: Observation time
+        site: Site to observe from
+        mode: Alt/az engine accuracy mode (defaults to ALTAZ_MODE)
+
+    Returns:
+        dict of the two output columns, e.g. {"alt": ..., "az": ...}
+    """
+    _, outputs = _check_frame(frame)
+    first = np.asarray(first, dtype=float).ravel()
+    second = np.asarray(second, dtype=float).ravel()
+    if len(first) != len(second):
+        raise ValueError(f"Column lengths differ ({len(first)} and {len(second)})")
+    if len(first) > MAX_CONVERT_ROWS:
+        raise ValueError(f"Too many coordinates ({len(first)}, max {MAX_CONVERT_ROWS})")
+    if not (np.isfinite(first).all() and np.isfinite(second).all()):
+        raise ValueError("Coordinates must be finite numbers")
+    if not len(first):
+        return {outputs[0]: first, outputs[1]: second}
+    engine = radec_to_altaz if frame == "radec" else altaz_to_radec
+    a, b = engine(first, second, obstime, site.lat, site.lon, mode)
+    if not (np.isfinite(a).all() and np.isfinite(b).all()):
+        raise ValueError("Conversion produced non-finite values; check the coordinate ranges")
+    return {outputs[0]: a, outputs[1]: b}
+
+
+def decode_binary(frame: str, payload: bytes, dtype: str = "float64") -> Tuple[np.ndarray, np.ndarray]:
+    """Split a binary request body into its two input columns."""
+    _check_frame(frame)
+    values = np.frombuffer(payload, dtype=check_dtype(dtype))
+    if len(values) % 2:
+        raise ValueError("Binary payload must hold two columns of equal length")
+    half = len(values) // 2
+    return values[:half], values[half:]
+
+
+def encode_binary(columns: Dict[str, np.ndarray], dtype: str = "float64") -> bytes:
+    """Concatenate the output columns into one binary response body."""
+    little_endian = check_dtype(dtype)
+    return b"".join(np.ascontiguousarray(column, dtype=little_endian).tobytes() for column in columns.values())
@@ -0,0 +1,141 @@
+"""
+Dew-point spread trend and time-to-threshold forecast.
+A least-squares line is fitted to temperature minus dew point over the last
+DEW_TREND_WINDOW_SECONDS of readings. The window keeps running sums, so each
+new reading costs O(1) (samples leaving the window are subtracted), and the
+fit is projected forward to when the spread will fall below the YELLOW and
+RED dew thresholds of weather_data.
+"""
+
+import os
+import math
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.services.weather_data import DEW_POINT_SAFE_DIFF, DEW_POINT_WARNING_DIFF
+
+logger = logging.getLogger(__name__)
+
+DEW_TREND_WINDOW_SECONDS = float(os.getenv("DEW_TREND_WINDOW_SECONDS", "3600"))
+# Readings (and the time they span) needed before the slope is trusted
+DEW_TREND_MIN_SAMPLES = int(os.getenv("DEW_TREND_MIN_SAMPLES", "5"))
+DEW_TREND_MIN_SPAN_SECONDS = float(os.getenv("DEW_TREND_MIN_SPAN_SECONDS", "600"))
+# Alert when the spread is projected to reach RED within this long
+DEW_TREND_ALERT_SECONDS = float(os.getenv("DEW_TREND_ALERT_SECONDS", "3600"))
+# Times are stored relative to an origin that is moved forward once they get this large,
+# which keeps the sums of squares well conditioned
+REBASE_SECONDS = 86400.0
+
+
+class DewTrend:
+    """Rolling linear fit of the dew-point spread over time, updated in O(1) per reading."""
+
+    def __init__(self, window_seconds: float = DEW_TREND_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._samples = deque()  # (seconds since origin, spread)
+        self._origin: Optional[float] = None
+        self._reset_sums()
+
+    def _reset_sums(self) -> None:
+        self._n = 0
+        self._st = self._sy = self._stt = self._sty = 0.0
+
+    def _add(self, t: float, y: float, sign: int) -> None:
+        self._n += sign
+        self._st += sign * t
+        self._sy += sign * y
+        self._stt += sign * t * t
+        self._sty += sign * t * y
+
+    def _rebase(self, origin: float) -> None:
+        """Move the time origin; rebuilds the sums from the (window-sized) deque, so it is rare and cheap."""
+        shift = origin - self._origin
+        self._samples = deque((t - shift, y) for t, y in self._samples)
+        self._origin = origin
+        self._reset_sums()
+        for t, y in self._samples:
+            self._add(t, y, 1)
+
+    def add(self, t: float, spread: float) -> bool:
+        """Add a reading at unix time t; returns False for readings not newer than the last one."""
+        if spread is None or not math.isfinite(spread):
+            return False
+        if self._origin is None:
+            self._origin = t
+        elif self._samples and t - self._origin <= self._samples[-1][0]:
+            return False
+        if t - self._origin > REBASE_SECONDS:
+            self._rebase(t)
+        x = t - self._origin
+        self._samples.append((x, spread))
+        self._add(x, spread, 1)
+        while self._samples and self._samples[0][0] < x - self.window_seconds:
+            self._add(*self._samples.popleft(), -1)
+        return True
+
+    def slope(self) -> Optional[float]:
+        """Spread change in degrees C per second, or None with too few readings."""
+        if self._n < DEW_TREND_MIN_SAMPLES or self._samples[-1][0] - self._samples[0][0] < DEW_TREND_MIN_SPAN_SECONDS:
+            return None
+        denominator = self._n * self._stt - self._st * self._st
+        if denominator <= 0:
+            return None
+        return (self._n * self._sty - self._st * self._sy) / denominator
+
+    def forecast(self) -> Dict[str, Any]:
+        """
+        The fitted trend and projected threshold crossings.
+
+        Returns:
+            dict with samples, window_seconds, spread (the fit at the latest
+            reading), slope_per_hour, and time_to_yellow_seconds /
+            time_to_red_seconds with yellow_at / red_at (ISO): 0 when the
+            fitted spread is already past that threshold, None when it is not
+            closing or there isn't enough data yet. Times count from the
+            latest reading.
+        """
+        result = {"samples": self._n, "window_seconds": self.window_seconds, "spread": None,
+                  "slope_per_hour": None, "time_to_yellow_seconds": None, "time_to_red_seconds": None,
+                  "yellow_at": None, "red_at": None}
+        slope = self.slope()
+        if slope is None:
+            return result
+        latest = self._samples[-1][0]
+        spread = (self._sy + slope * (self._n * latest - self._st)) / self._n
+        result.update(spread=spread, slope_per_hour=slope * 3600.0)
+        for level, threshold in (("yellow", DEW_POINT_SAFE_DIFF), ("red", DEW_POINT_WARNING_DIFF)):
+            if spread < threshold:
+                seconds = 0.0
+            elif slope < 0:
+                seconds = (threshold - spread) / slope
+            else:
+                continue
+            result[f"time_to_{level}_seconds"] = seconds
+            result[f"{level}_at"] = datetime.fromtimestamp(self._origin + latest + seconds, timezone.utc).isoformat()
+        return result
+
+
+def forecast_alert(forecast: Dict[str, Any], dew_status: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    An alert when the spread is closing and projected to reach RED within DEW_TREND_ALERT_SECONDS.
+
+    No alert once the dew check is already RED, or while the spread holds or
+    widens (even if the fitted spread is still below the RED threshold).
+    """
+    seconds = forecast.get("time_to_red_seconds")
+    slope = forecast.get("slope_per_hour")
+    if seconds is None or slope is None or slope >= 0 or dew_status == "RED" or seconds > DEW_TREND_ALERT_SECONDS:
+        return None
+    eta = "now" if seconds <= 0 else f"in about {seconds / 60:.0f} min"
+    return {
+        "type": "dew_forecast",
+        "severity": "warning",
+        "message": f"Dew point spread is closing at {-slope:.1f} °C/h; condensation risk (RED) {eta}.",
+        "recommendation": "Finish the current exposure and prepare to park.",
+        "time_to_red_seconds": seconds,
+    }
+
+
+dew_trend = DewTrend()
@@ -0,0 +1,171 @@
+"""
+Per-night ephemeris tables.
+Over one night an object's apparent place of date is effectively fixed, so
+its local (east, north, up) direction is an exact first-order harmonic of
+the local sidereal angle L: enu = c0 + c1 cos L + c2 sin L. The nightly
+precompute stores those nine coefficients per catalog object along with
+rise, transit and set times, and positions during the night are then
+evaluated from the coefficients instead of full coordinate transforms.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from astropy.time import Time
+
+from app.services.altaz import apparent_unit_vectors, local_sidereal_angle, site_matrix
+from app.services.catalog import SkyCatalog, get_catalog
+
+logger = logging.getLogger(__name__)
+
+EPHEMERIS_STEP_MINUTES = float(os.getenv("EPHEMERIS_STEP_MINUTES", "10"))
+# Altitude (degrees) used for rise and set times; 0 is the geometric horizon
+EPHEMERIS_HORIZON_DEG = float(os.getenv("EPHEMERIS_HORIZON_DEG", "0"))
+
+TWO_PI = 2.0 * np.pi
+SIDEREAL_RATE = TWO_PI * 1.00273781191135448 / 86400.0
+NIGHT_SECONDS = 86400.0
+
+
+def night_start(now: float, lon_deg: float) -> float:
+    """Unix time of the local mean noon that starts the night containing now."""
+    noon_utc = 43200.0 - lon_deg / 360.0 * 86400.0
+    return np.floor((now - noon_utc) / 86400.0) * 86400.0 + noon_utc
+
+
+def harmonic_coefficients(apparent_xyz: np.ndarray, lat_deg: float) -> np.ndarray:
+    """
+    (N, 3, 3) coefficients with enu[n, k] = coeff[n, k] @ (1, cos L, sin L).
+
+    apparent_xyz are unit vectors to the true equator of date; rotating them
+    by L and the site latitude gives east, north and up.
+    """
+    x, y, z = apparent_xyz[:, 0], apparent_xyz[:, 1], apparent_xyz[:, 2]
+    site = site_matrix(lat_deg)
+    coeff = np.empty((len(apparent_xyz), 3, 3))
+    for k in range(3):
+        coeff[:, k, 0] = site[k, 2] * z
+        coeff[:, k, 1] = site[k, 0] * x + site[k, 1] * y
+        coeff[:, k, 2] = site[k, 0] * y - site[k, 1] * x
+    return coeff
+
+
+def _altaz_from_enu(enu: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    alt = np.degrees(np.arcsin(np.clip(enu[..., 2], -1.0, 1.0)))
+    az = np.degrees(np.arctan2(enu[..., 0], enu[..., 1])) % 360.0
+    return alt, az
+
+
+class NightEphemeris:
+    """
+    Harmonic coefficients and rise/transit/set times for a set of objects over one night.
+
+    Times are unix seconds; rise and set are NaN for objects that stay above
+    or below the horizon all night.
+    """
+
+    def __init__(self, xyz: np.ndarray, lat_deg: float, lon_deg: float, start: float,
+                 duration: float = NIGHT_SECONDS):
+        self.lat_deg = lat_deg
+        self.lon_deg = lon_deg
+        self.start = start
+        self.end = start + duration
+        middle = Time(start + duration / 2, format="unix")
+        self.coeff = harmonic_coefficients(apparent_unit_vectors(xyz, middle), lat_deg)
+        self._start_angle = local_sidereal_angle(Time(start, format="unix"), lon_deg)
+
+        up = self.coeff[:, 2, :]
+        amplitude = np.hypot(up[:, 1], up[:, 2])
+        transit_angle = np.arctan2(up[:, 2], up[:, 1])
+        self.max_alt = np.degrees(np.arcsin(np.clip(up[:, 0] + amplitude, -1.0, 1.0)))
+        self.transit = self._first_time(transit_angle)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cos_half = (np.sin(np.radians(EPHEMERIS_HORIZON_DEG)) - up[:, 0]) / amplitude
+        crosses = np.abs(cos_half) < 1.0
+        half_arc = np.where(crosses, np.arccos(np.clip(cos_half, -1.0, 1.0)), np.nan)
+        self.rise = self._first_time(transit_angle - half_arc)
+        self.set = self._first_time(transit_angle + half_arc)
+
+    def __len__(self) -> int:
+        return len(self.coeff)
+
+    def _first_time(self, angle: np.ndarray) -> np.ndarray:
+        """First time in the night at which the local sidereal angle equals angle (NaN stays NaN)."""
+        return self.start + ((angle - self._start_angle) % TWO_PI) / SIDEREAL_RATE
+
+    def covers(self, unix_time: float) -> bool:
+        return self.start <= unix_time < self.end
+
+    def _basis(self, times: np.ndarray) -> np.ndarray:
+        """(3, T) harmonic basis at unix times, from the sidereal angle at the start of the night."""
+        angle = self._start_angle + SIDEREAL_RATE * (np.atleast_1d(times) - self.start)
+        return np.vstack((np.ones_like(angle), np.cos(angle), np.sin(angle)))
+
+    def altaz(self, rows, obstime: Time) -> Tuple[np.ndarray, np.ndarray]:
+        """Altitude/azimuth in degrees for table rows at one time."""
+        basis = self._basis(np.array([obstime.unix]))[:, 0]
+        return _altaz_from_enu(self.coeff[rows] @ basis)
+
+    def altitude_curves(self, rows, times: np.ndarray) -> np.ndarray:
+        """(len(rows), T) altitudes in degrees on a time grid, in one matrix product."""
+        enu_up = self.coeff[rows, 2, :] @ self._basis(times)
+        return np.degrees(np.arcsin(np.clip(enu_up, -1.0, 1.0)))
+
+    def grid(self, step_minutes: float = EPHEMERIS_STEP_MINUTES) -> np.ndarray:
+        return np.arange(self.start, self.end + 1e-6, step_minutes * 60.0)
+
+
+class CatalogEphemeris(NightEphemeris):
+    """NightEphemeris for every row of a catalog, tied to that catalog instance."""
+
+    def __init__(self, catalog: SkyCatalog, lat_deg: float, lon_deg: float, start: float):
+        self.catalog = catalog
+        super().__init__(catalog.xyz, lat_deg, lon_deg, start)
+
+
+_ephemerides: Dict[Tuple[float, float], CatalogEphemeris] = {}
+_ephemeris_lock = threading.Lock()
+
+
+def get_ephemeris(lat_deg: float, lon_deg: float, now: Optional[float] = None) -> Optional[CatalogEphemeris]:
+    """
+    Catalog ephemeris for a site and the night containing now.
+
+    Built on first use and rebuilt when the night rolls over or the catalog
+    is replaced. Returns None without an offline catalog.
+    """
+    catalog = get_catalog()
+    if catalog is None:
+        return None
+    now = time.time() if now is None else now
+    key = (lat_deg, lon_deg)
+    ephemeris = _ephemerides.get(key)
+    if ephemeris is not None and ephemeris.catalog is catalog and ephemeris.covers(now):
+        return ephemeris
+    with _ephemeris_lock:
+        ephemeris = _ephemerides.get(key)
+        if ephemeris is None or ephemeris.catalog is not catalog or not ephemeris.covers(now):
+            started = time.perf_counter()
+            ephemeris = CatalogEphemeris(catalog, lat_deg, lon_deg, night_start(now, lon_deg))
+            _ephemerides[key] = ephemeris
+            logger.info(f"Built ephemeris for {len(ephemeris)} objects at ({lat_deg}, {lon_deg}) "
+                        f"in {time.perf_counter() - started:.2f}s")
+    return ephemeris
+
+
+async def ephemeris_refresh_loop(lat_deg: float, lon_deg: float) -> None:
+    """Build the ephemeris at startup and again as each night begins, off the request path."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            ephemeris = await loop.run_in_executor(None, get_ephemeris, lat_deg, lon_deg)
+        except Exception as e:
+            logger.error(f"Ephemeris precompute failed: {e}")
+            ephemeris = None
+        next_night = ephemeris.end if ephemeris is not None else time.time() + 3600
+        await asyncio.sleep(max(next_night - time.time(), 1.0))
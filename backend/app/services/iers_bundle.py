@@ -0,0 +1,132 @@
+"""
+Pinned IERS / leap-second data and transform warm-up.
+By default astropy may download IERS-A Earth orientation data or check
+for a newer leap-second file the first time a time or coordinate
+transform needs them, which stalls or fails on an air-gapped network.
+Here astropy is pointed at a pinned bundle in data/iers (fetched ahead of
+time with ``python -m app.services.iers_bundle``, or falling back to the
+tables shipped with astropy) and told never to download.
+"""
+
+import os
+import time
+import shutil
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+from astropy.time import Time, update_leap_seconds
+from astropy.utils import iers
+from astropy.utils.data import download_file
+
+from app.services.catalog import BACKEND_DIR
+
+logger = logging.getLogger(__name__)
+
+IERS_BUNDLE_DIR = os.getenv("IERS_BUNDLE_DIR", os.path.join(BACKEND_DIR, "data", "iers"))
+# Set to false to let astropy download fresh IERS-A data itself
+IERS_OFFLINE = os.getenv("IERS_OFFLINE", "true").lower() in ("1", "true", "yes")
+
+IERS_A_NAME = "finals2000A.all"
+LEAP_SECONDS_NAME = "Leap_Second.dat"
+
+
+def bundle_paths(bundle_dir: str = IERS_BUNDLE_DIR) -> Dict[str, str]:
+    return {"iers_a": os.path.join(bundle_dir, IERS_A_NAME),
+            "leap_seconds": os.path.join(bundle_dir, LEAP_SECONDS_NAME)}
+
+
+def configure_astropy(bundle_dir: str = IERS_BUNDLE_DIR) -> Optional[str]:
+    """
+    Make astropy use the pinned bundle and never reach the network.
+
+    Returns:
+        The last date covered by the Earth orientation table in use (ISO), or
+        None when IERS_OFFLINE is disabled
+    """
+    if not IERS_OFFLINE:
+        return None
+
+    iers.conf.auto_download = False
+    # Past the end of the table, fall back to UT1 = UTC with a warning instead of raising
+    iers.conf.iers_degraded_accuracy = "warn"
+
+    paths = bundle_paths(bundle_dir)
+    if os.path.exists(paths["iers_a"]):
+        table = iers.IERS_A.open(paths["iers_a"])
+        iers.earth_orientation_table.set(table)
+        source = paths["iers_a"]
+    else:
+        table = iers.earth_orientation_table.get()
+        source = "astropy bundled tables"
+    if os.path.exists(paths["leap_seconds"]):
+        update_leap_seconds([paths["leap_seconds"]])
+
+    last = Time(table["MJD"][-1], format="mjd").iso[:10]
+    logger.info(f"Using offline IERS data from {source} (valid through {last})")
+    return last
+
+
+def fetch_bundle(bundle_dir: str = IERS_BUNDLE_DIR) -> Dict[str, str]:
+    """
+    Download the current IERS-A and leap-second files into the bundle directory.
+
+    Run this on a connected machine and ship data/iers with the backend.
+    Files that can't be downloaded are copied from astropy's bundled data.
+    """
+    os.makedirs(bundle_dir, exist_ok=True)
+    paths = bundle_paths(bundle_dir)
+    sources = {"iers_a": (iers.conf.iers_auto_url, iers.IERS_A_FILE),
+               "leap_seconds": (iers.conf.iers_leap_second_auto_url, iers.IERS_LEAP_SECOND_FILE)}
+    for key, (url, fallback) in sources.items():
+        try:
+            downloaded = download_file(url, cache=False, timeout=iers.conf.remote_timeout)
+            shutil.move(downloaded, paths[key])
+            logger.info(f"Fetched {url} -> {paths[key]}")
+        except Exception as e:
+            logger.warning(f"Download of {url} failed ({e}); using astropy's bundled copy")
+            shutil.copyfile(fallback, paths[key])
+    return paths
+
+
+def warm_up(sites) -> float:
+    """
+    Run one full transform per site so lazy loads happen before the first request.
+
+    Touches UT1-UTC and leap seconds, the alt/az engine's per-bucket matrices
+    in both accuracy modes, astropy's AltAz frame machinery, the offline
+    catalog, name index, each site's nightly ephemeris, today's
+    solar-system table and each site's observing window. Returns the elapsed time in seconds.
+    """
+    from astropy.coordinates import AltAz, SkyCoord
+    import astropy.units as u
+    from app.services.altaz import MODES, radec_to_altaz
+    from app.services.catalog import get_catalog
+    from app.services.ephemeris import get_ephemeris
+    from app.services.name_index import get_name_index
+    from app.services.observing_window import get_observing_window
+    from app.services.solar_system import geocentric_positions
+
+    started = time.perf_counter()
+    now = Time.now()
+    now.ut1  # loads UT1-UTC and leap seconds
+    for site in sites:
+        for mode in MODES:
+            radec_to_altaz(np.array([0.0]), np.array([0.0]), now, site.lat, site.lon, mode)
+        SkyCoord(ra=0.0 * u.deg, dec=0.0 * u.deg, frame="icrs").transform_to(
+            AltAz(obstime=now, location=site.location))
+    get_catalog()
+    get_name_index()
+    for site in sites:
+        get_ephemeris(site.lat, site.lon)
+    geocentric_positions(now)
+    for site in sites:
+        get_observing_window(site)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Warm-up finished in {elapsed:.2f}s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(fetch_bundle())
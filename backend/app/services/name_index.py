@@ -0,0 +1,179 @@
+"""
+Offline identifier index for object search.
+Built from the catalog's main_id/ids columns, it answers exact, prefix
+and fuzzy (trigram) lookups without contacting SIMBAD.
+"""
+
+import re
+import bisect
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services.catalog import SkyCatalog, get_catalog
+
+logger = logging.getLogger(__name__)
+
+# SIMBAD identifier prefixes that users don't type ("NAME Vega", "* alf Lyr", "V* R Lyr")
+_IGNORED_PREFIXES = re.compile(r"^(name|\*\*|\*|v\*)\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+MIN_FUZZY_SCORE = 0.3
+
+
+def normalize_identifier(identifier: str) -> str:
+    """Case- and whitespace-insensitive key: "NAME Andromeda Galaxy" -> "andromedagalaxy", "M  31" -> "m31"."""
+    key = _WHITESPACE.sub(" ", identifier.strip().casefold())
+    key = _IGNORED_PREFIXES.sub("", key)
+    return key.replace(" ", "")
+
+
+def _trigrams(key: str) -> List[str]:
+    padded = f"  {key} "
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class NameIndex:
+    """
+    Sorted-key index over every alias in a catalog.
+
+    Exact lookups use a dict, prefix lookups binary-search the sorted key
+    list (the flat equivalent of a trie), and fuzzy lookups score trigram
+    overlap using postings arrays.
+    """
+
+    def __init__(self, catalog: SkyCatalog):
+        self.catalog = catalog
+        aliases: Dict[str, int] = {}
+        labels: Dict[str, str] = {}
+        for row, (main_id, ids) in enumerate(zip(catalog.name, catalog.ids)):
+            for alias in [main_id] + str(ids).split("|"):
+                key = normalize_identifier(alias)
+                if key and key not in aliases:
+                    aliases[key] = row
+                    labels[key] = _WHITESPACE.sub(" ", alias.strip())
+
+        self.keys = sorted(aliases)
+        self.rows = np.array([aliases[key] for key in self.keys], dtype=np.int32)
+        self.labels = [labels[key] for key in self.keys]
+        # Per-key ranking columns, so prefix ranges are ranked without a Python loop
+        self.key_lengths = np.array([len(key) for key in self.keys], dtype=np.int32)
+        self.key_magnitudes = np.nan_to_num(catalog.magnitude[self.rows], nan=99.0)
+        self._exact = {key: i for i, key in enumerate(self.keys)}
+
+        postings: Dict[str, List[int]] = {}
+        for i, key in enumerate(self.keys):
+            for gram in _trigrams(key):
+                postings.setdefault(gram, []).append(i)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._gram_counts = np.array([len(_trigrams(key)) for key in self.keys], dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _candidate(self, i: int, kind: str, score: float) -> Dict:
+        row = int(self.rows[i])
+        magnitude = self.catalog.magnitude[row]
+        return {
+            "row": row,
+            "name": str(self.catalog.name[row]),
+            "match": self.labels[i],
+            "otype": str(self.catalog.otype[row]),
+            "magnitude": float(magnitude) if np.isfinite(magnitude) else None,
+            "kind": kind,
+            "score": round(score, 3),
+        }
+
+    def exact(self, query: str) -> Optional[Dict]:
+        i = self._exact.get(normalize_identifier(query))
+        return None if i is None else self._candidate(i, "exact", 1.0)
+
+    def prefix(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Aliases starting with the query, shortest completion and brightest object first.
+
+        The whole prefix range is ranked (vectorized) before the best few are
+        taken, so a short prefix like "hd1" can't lose bright targets to
+        lexicographically earlier faint ones.
+        """
+        key = normalize_identifier(query)
+        if not key:
+            return []
+        start = bisect.bisect_left(self.keys, key)
+        stop = bisect.bisect_left(self.keys, key + "\uffff", lo=start)
+        if stop <= start:
+            return []
+        lengths = self.key_lengths[start:stop]
+        # Several aliases can belong to one object, so keep spare candidates for _distinct
+        order = np.lexsort((self.key_magnitudes[start:stop], lengths))[:limit * 4]
+        return self._distinct(
+            (self._candidate(start + int(j), "prefix", 0.9 * len(key) / float(lengths[j])) for j in order), limit)
+
+    def fuzzy(self, query: str, limit: int = 10) -> List[Dict]:
+        """Aliases ranked by trigram Jaccard similarity to the query."""
+        key = normalize_identifier(query)
+        grams = [g for g in _trigrams(key) if g in self._postings] if key else []
+        if not grams:
+            return []
+        hits = np.bincount(np.concatenate([self._postings[g] for g in grams]), minlength=len(self.keys))
+        candidates = np.nonzero(hits)[0]
+        shared = hits[candidates]
+        scores = shared / (len(_trigrams(key)) + self._gram_counts[candidates] - shared)
+        keep = scores >= MIN_FUZZY_SCORE
+        candidates, scores = candidates[keep], scores[keep]
+        order = np.argsort(-scores, kind="stable")[:limit * 4]
+        return self._distinct(
+            (self._candidate(int(candidates[j]), "fuzzy", 0.8 * float(scores[j])) for j in order), limit)
+
+    def lookup(self, query: str, limit: int = 10) -> List[Dict]:
+        """Exact match if there is one, otherwise prefix matches (fuzzy matches are left to autocomplete)."""
+        hit = self.exact(query)
+        if hit is not None:
+            return [hit]
+        return self.prefix(query, limit)
+
+    def autocomplete(self, query: str, limit: int = 10) -> List[Dict]:
+        """Ranked candidates for a partially typed name: exact, then prefix, then fuzzy."""
+        results = []
+        hit = self.exact(query)
+        if hit is not None:
+            results.append(hit)
+        results += self.prefix(query, limit)
+        if len(results) < limit:
+            results += self.fuzzy(query, limit)
+        return self._distinct(results, limit)
+
+    @staticmethod
+    def _distinct(candidates, limit: int) -> List[Dict]:
+        """Keep the first (best) candidate per catalog row."""
+        seen = set()
+        results = []
+        for candidate in candidates:
+            if candidate["row"] in seen:
+                continue
+            seen.add(candidate["row"])
+            results.append(candidate)
+            if len(results) >= limit:
+                break
+        return results
+
+
+_index: Optional[NameIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_name_index() -> Optional[NameIndex]:
+    """Return the index for the current catalog, (re)building it when the catalog changes."""
+    global _index
+    catalog = get_catalog()
+    if catalog is None:
+        return None
+    if _index is not None and _index.catalog is catalog:
+        return _index
+    with _index_lock:
+        if _index is None or _index.catalog is not catalog:
+            _index = NameIndex(catalog)
+            logger.info(f"Built name index with {len(_index)} identifiers")
+    return _index
@@ -0,0 +1,114 @@
+"""
+Sorted secondary indexes over an ObjectTable.
+Visible-object results are cached per time bucket, so each cached table
+gets its indexes built once: a permutation and rank array per sort key,
+rows grouped by object type, and rows sorted by azimuth. A filtered,
+sorted page is then found by taking the smallest candidate set from the
+indexes (binary searches on the sorted arrays), checking the remaining
+filters on those rows only and ordering them by rank, instead of
+filtering and sorting the whole table on every request.
+"""
+
+from typing import Dict, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+SORT_KEYS = ("magnitude", "alt", "az", "name")
+
+
+class ObjectIndex:
+    """Sort orders, ranks, type groups and azimuth order for one table; the table must not change."""
+
+    def __init__(self, table):
+        self.size = len(table)
+        self._orders: Dict[Tuple[str, bool], np.ndarray] = {}
+        self._ranks: Dict[Tuple[str, bool], np.ndarray] = {}
+        for key in SORT_KEYS:
+            values = getattr(table, key)
+            ascending = np.argsort(values, kind="stable")
+            # Numeric keys sort on the negated values so NaN magnitudes stay last either way
+            descending = ascending[::-1].copy() if key == "name" else np.argsort(-values, kind="stable")
+            for reverse, order in ((False, ascending), (True, descending)):
+                rank = np.empty(self.size, dtype=np.int64)
+                rank[order] = np.arange(self.size)
+                self._orders[(key, reverse)] = order
+                self._ranks[(key, reverse)] = rank
+
+        self._otype = np.char.lower(table.otype)
+        type_order = np.argsort(self._otype, kind="stable")
+        types, starts = np.unique(self._otype[type_order], return_index=True)
+        ends = np.append(starts[1:], self.size)
+        self._type_rows = {str(t): type_order[s:e] for t, s, e in zip(types, starts, ends)}
+
+        self._az = table.az
+        self._az_order = self._orders[("az", False)]
+        self._az_sorted = table.az[self._az_order]
+
+    def _type_candidates(self, otypes: Set[str]) -> np.ndarray:
+        groups = [self._type_rows[t] for t in otypes if t in self._type_rows]
+        return np.concatenate(groups) if groups else np.empty(0, dtype=np.int64)
+
+    def _type_mask(self, rows: np.ndarray, otypes: Set[str]) -> np.ndarray:
+        return np.isin(self._otype[rows], list(otypes))
+
+    def _az_candidates(self, az_min: float, az_max: float) -> np.ndarray:
+        lo = np.searchsorted(self._az_sorted, az_min, side="left")
+        hi = np.searchsorted(self._az_sorted, az_max, side="left")
+        if az_min <= az_max:
+            return self._az_order[lo:hi]
+        return np.concatenate((self._az_order[lo:], self._az_order[:hi]))
+
+    def _az_mask(self, rows: np.ndarray, az_min: float, az_max: float) -> np.ndarray:
+        az = self._az[rows]
+        if az_min <= az_max:
+            return (az >= az_min) & (az < az_max)
+        return (az >= az_min) | (az < az_max)
+
+    def query(self, otypes: Optional[Sequence[str]] = None, az_range: Optional[Tuple[float, float]] = None,
+              sort: Optional[str] = None, descending: bool = False,
+              offset: int = 0, limit: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """
+        Row numbers of one page of matching objects.
+
+        Args:
+            otypes: Object types to keep (case-insensitive), or None for all
+            az_range: (az_min, az_max) in degrees within [0, 360], az_min <= az < az_max;
+                az_min > az_max wraps through north. None for all azimuths
+            sort: One of SORT_KEYS, or None to keep table order
+            descending: Reverse the sort order (only with sort)
+            offset: Matching rows to skip
+            limit: Largest page size, or None for the rest
+
+        Returns:
+            Tuple of (row numbers for the page, total number of matching rows)
+        """
+        if sort is not None and sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort} (expected one of {SORT_KEYS})")
+        if az_range is not None and not all(0.0 <= az <= 360.0 for az in az_range):
+            raise ValueError("Azimuth range must be within 0-360 degrees")
+        descending = descending and sort is not None
+        end = None if limit is None else offset + limit
+
+        filters = []
+        if otypes:
+            types = {t.strip().lower() for t in otypes}
+            filters.append((self._type_candidates(types), lambda rows: self._type_mask(rows, types)))
+        if az_range is not None:
+            filters.append((self._az_candidates(*az_range), lambda rows: self._az_mask(rows, *az_range)))
+
+        if not filters:
+            # No filters: the page is a slice of the precomputed order
+            if sort is None:
+                return np.arange(self.size)[offset:end], self.size
+            return self._orders[(sort, descending)][offset:end], self.size
+
+        filters.sort(key=lambda f: len(f[0]))
+        rows = filters[0][0]
+        for _, test in filters[1:]:
+            rows = rows[test(rows)]
+        total = len(rows)
+        if sort is None:
+            rows = np.sort(rows)
+        else:
+            rows = rows[np.argsort(self._ranks[(sort, descending)][rows], kind="stable")]
+        return rows[offset:end], total
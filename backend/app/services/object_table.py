@@ -0,0 +1,98 @@
+"""
+Columnar (struct-of-arrays) result type for object lists.
+Visible-object and search results are kept as NumPy columns from the
+moment they are computed, and are only turned into JSON at the edge:
+as row records, as NDJSON chunks or as one array per column.
+"""
+
+import json
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.object_index import ObjectIndex
+
+# Field names used by /api/search (and batch search) for the same columns
+SEARCH_FIELDS = {"otype": "object_type", "alt": "altitude", "az": "azimuth"}
+
+NDJSON_CHUNK_ROWS = 1000
+
+
+class ObjectTable:
+    """Name, type, ICRS position, Alt/Az and V magnitude of a set of objects, one array per column."""
+
+    COLUMNS = ("name", "otype", "ra", "dec", "alt", "az", "magnitude")
+
+    def __init__(self, name: Sequence[str], otype: Sequence[str], ra: np.ndarray, dec: np.ndarray,
+                 alt: np.ndarray, az: np.ndarray, magnitude: np.ndarray):
+        self.name = np.asarray(name, dtype=str)
+        self.otype = np.asarray(otype, dtype=str)
+        self.ra = np.asarray(ra, dtype=float)
+        self.dec = np.asarray(dec, dtype=float)
+        self.alt = np.asarray(alt, dtype=float)
+        self.az = np.asarray(az, dtype=float)
+        self.magnitude = np.asarray(magnitude, dtype=float)
+        self._index: Optional[ObjectIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.ra)
+
+    @property
+    def index(self) -> ObjectIndex:
+        """Sorted secondary indexes, built on first use (tables are never modified after construction)."""
+        return self.build_index()._index
+
+    def build_index(self) -> "ObjectTable":
+        """Build the sorted secondary indexes now rather than on first query; returns the table."""
+        if self._index is None:
+            self._index = ObjectIndex(self)
+        return self
+
+    @classmethod
+    def empty(cls) -> "ObjectTable":
+        return cls([], [], [], [], [], [], [])
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict], alt: np.ndarray, az: np.ndarray) -> "ObjectTable":
+        """Build a table from normalized SIMBAD rows (magnitude None becomes NaN) and their Alt/Az."""
+        return cls([r["name"] for r in rows], [r["otype"] for r in rows],
+                   [r["ra"] for r in rows], [r["dec"] for r in rows], alt, az,
+                   [np.nan if r["magnitude"] is None else r["magnitude"] for r in rows])
+
+    @classmethod
+    def concat(cls, tables: Sequence["ObjectTable"]) -> "ObjectTable":
+        if not tables:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(t, column) for t in tables]) for column in cls.COLUMNS))
+
+    def take(self, indices) -> "ObjectTable":
+        """Rows selected by an index array or boolean mask."""
+        return ObjectTable(*(getattr(self, column)[indices] for column in self.COLUMNS))
+
+    def _column_lists(self, rename: Optional[Dict[str, str]] = None) -> Dict[str, list]:
+        rename = rename or {}
+        columns = {}
+        for column in self.COLUMNS:
+            values = getattr(self, column)
+            if column == "magnitude":
+                # NaN is not valid JSON; unknown magnitudes are null
+                values = np.where(np.isfinite(values), values, None)
+            columns[rename.get(column, column)] = values.tolist()
+        return columns
+
+    def to_columns(self, rename: Optional[Dict[str, str]] = None) -> Dict[str, list]:
+        """One list per column, converted straight from the arrays."""
+        return self._column_lists(rename)
+
+    def to_records(self, rename: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """One dict per object, for the default JSON layout."""
+        columns = self._column_lists(rename)
+        fields = list(columns)
+        return [dict(zip(fields, values)) for values in zip(*columns.values())]
+
+    def ndjson_chunks(self, rename: Optional[Dict[str, str]] = None,
+                      chunk_rows: int = NDJSON_CHUNK_ROWS) -> Iterator[str]:
+        """NDJSON text in chunks of chunk_rows objects, so large tables stream without one big buffer."""
+        for start in range(0, len(self), chunk_rows):
+            records = self.take(slice(start, start + chunk_rows)).to_records(rename)
+            yield "".join(json.dumps(record) + "\n" for record in records)
@@ -0,0 +1,184 @@
+"""
+Nightly observing windows per site.
+Sunset/sunrise, civil/nautical/astronomical twilight, moonrise/moonset and
+moon illumination are computed once per site and night (local noon to
+local noon) from the solar-system Chebyshev tables and cached, so callers
+such as /api/visible can tell daytime from night without any work.
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from astropy.time import Time
+
+from app.services.ephemeris import NIGHT_SECONDS, night_start
+from app.services.solar_system import BODIES, body_positions
+
+logger = logging.getLogger(__name__)
+
+# Sun altitudes (degrees) for each event pair; sunrise/sunset include refraction and the solar radius
+SUN_THRESHOLDS = (
+    ("sunset", "sunrise", -0.833),
+    ("civil_dusk", "civil_dawn", -6.0),
+    ("nautical_dusk", "nautical_dawn", -12.0),
+    ("astronomical_dusk", "astronomical_dawn", -18.0),
+)
+# Topocentric moon altitude at rise/set (refraction minus the lunar radius)
+MOON_HORIZON_DEG = 0.125
+GRID_SECONDS = 300.0
+MAX_CACHED_WINDOWS = 16
+
+_SUN = BODIES.index("sun")
+_MOON = BODIES.index("moon")
+
+
+def _iso(unix_time: Optional[float]) -> Optional[str]:
+    return None if unix_time is None else Time(unix_time, format="unix").isot
+
+
+class ObservingWindow:
+    """Sun and moon events for one site and night; times are unix seconds, None if the event doesn't happen."""
+
+    def __init__(self, site_id: str, start: float, end: float, events: Dict[str, Optional[float]],
+                 sun_up_at_start: bool, horizon_crossings: List[float],
+                 moon_illumination: float, dark_hours: float, moonless_dark_hours: float):
+        self.site_id = site_id
+        self.start = start
+        self.end = end
+        self.events = events
+        # Every sunset/sunrise in the window, so daytime is a parity count even at high latitudes
+        self.sun_up_at_start = sun_up_at_start
+        self.horizon_crossings = horizon_crossings
+        self.moon_illumination = moon_illumination
+        self.dark_hours = dark_hours
+        self.moonless_dark_hours = moonless_dark_hours
+
+    def covers(self, unix_time: float) -> bool:
+        return self.start <= unix_time < self.end
+
+    def to_dict(self) -> Dict:
+        return {
+            "site": self.site_id,
+            "start": _iso(self.start),
+            "end": _iso(self.end),
+            "sun": {name: _iso(self.events[name]) for pair in SUN_THRESHOLDS for name in pair[:2]},
+            "moon": {
+                "rise": _iso(self.events["moonrise"]),
+                "set": _iso(self.events["moonset"]),
+                "illumination": round(self.moon_illumination, 3),
+            },
+            "dark_hours": round(self.dark_hours, 2),
+            "moonless_dark_hours": round(self.moonless_dark_hours, 2),
+        }
+
+
+def _altitudes(times: np.ndarray, lat_deg: float, lon_deg: float) -> Tuple[np.ndarray, np.ndarray]:
+    sun = np.empty(len(times))
+    moon = np.empty(len(times))
+    for i, t in enumerate(times):
+        alt = body_positions(Time(t, format="unix"), lat_deg, lon_deg)["alt"]
+        sun[i], moon[i] = alt[_SUN], alt[_MOON]
+    return sun, moon
+
+
+def _crossings(times: np.ndarray, altitude: np.ndarray, threshold: float) -> List[Tuple[float, bool]]:
+    """(time, rising) for each grid interval where altitude crosses threshold, linearly interpolated."""
+    above = altitude >= threshold
+    events = []
+    for i in np.nonzero(above[1:] != above[:-1])[0]:
+        fraction = (threshold - altitude[i]) / (altitude[i + 1] - altitude[i])
+        events.append((float(times[i] + fraction * (times[i + 1] - times[i])), bool(above[i + 1])))
+    return events
+
+
+def _refine(t: float, body: int, threshold: float, lat_deg: float, lon_deg: float) -> float:
+    """Two secant steps on the exact altitude from an interpolated crossing time."""
+    t0, t1 = t - 60.0, t + 60.0
+    f0 = body_positions(Time(t0, format="unix"), lat_deg, lon_deg)["alt"][body] - threshold
+    for _ in range(2):
+        f1 = body_positions(Time(t1, format="unix"), lat_deg, lon_deg)["alt"][body] - threshold
+        if f1 == f0:
+            break
+        t0, t1, f0 = t1, t1 - f1 * (t1 - t0) / (f1 - f0), f1
+    return float(t1)
+
+
+def _first(events: List[Tuple[float, bool]], rising: bool) -> Optional[float]:
+    return next((t for t, up in events if up == rising), None)
+
+
+def compute_observing_window(site, start: float) -> ObservingWindow:
+    """Evaluate sun and moon altitude on a grid over the night and locate their crossings."""
+    times = np.arange(start, start + NIGHT_SECONDS + 1.0, GRID_SECONDS)
+    sun, moon = _altitudes(times, site.lat, site.lon)
+
+    events: Dict[str, Optional[float]] = {}
+    horizon_crossings = []
+    for dusk, dawn, threshold in SUN_THRESHOLDS:
+        crossings = [(_refine(t, _SUN, threshold, site.lat, site.lon), rising)
+                     for t, rising in _crossings(times, sun, threshold)]
+        if dusk == "sunset":
+            horizon_crossings = [t for t, _ in crossings]
+        for name, rising in ((dusk, False), (dawn, True)):
+            events[name] = _first(crossings, rising)
+    moon_crossings = _crossings(times, moon, MOON_HORIZON_DEG)
+    for name, rising in (("moonset", False), ("moonrise", True)):
+        t = _first(moon_crossings, rising)
+        events[name] = None if t is None else _refine(t, _MOON, MOON_HORIZON_DEG, site.lat, site.lon)
+
+    dark = sun < -18.0
+    hours_per_sample = GRID_SECONDS / 3600.0
+    middle = Time(start + NIGHT_SECONDS / 2, format="unix")
+    illumination = float(body_positions(middle, site.lat, site.lon)["illumination"][_MOON])
+    return ObservingWindow(site.site_id, start, start + NIGHT_SECONDS, events,
+                           bool(sun[0] >= SUN_THRESHOLDS[0][2]), horizon_crossings, illumination,
+                           float(dark[:-1].sum() * hours_per_sample),
+                           float((dark & (moon < MOON_HORIZON_DEG))[:-1].sum() * hours_per_sample))
+
+
+_windows: "OrderedDict[Tuple[str, float], ObservingWindow]" = OrderedDict()
+_windows_lock = threading.Lock()
+
+
+def get_observing_window(site, now: Optional[float] = None) -> ObservingWindow:
+    """Cached observing window for the night containing now (computed once per site and night)."""
+    now = time.time() if now is None else now
+    key = (site.site_id, night_start(now, site.lon))
+    with _windows_lock:
+        window = _windows.get(key)
+        if window is not None:
+            _windows.move_to_end(key)
+            return window
+    window = compute_observing_window(site, key[1])
+    logger.info(f"Computed observing window for {site.site_id} starting {_iso(key[1])}")
+    with _windows_lock:
+        _windows[key] = window
+        while len(_windows) > MAX_CACHED_WINDOWS:
+            _windows.popitem(last=False)
+    return window
+
+
+def is_daytime(site, now: Optional[float] = None) -> bool:
+    """True between sunrise and sunset, from the cached window (no position computations)."""
+    now = time.time() if now is None else now
+    window = get_observing_window(site, now)
+    crossed = sum(1 for t in window.horizon_crossings if t <= now)
+    return window.sun_up_at_start != (crossed % 2 == 1)
+
+
+def current_conditions(site, now: Optional[float] = None) -> Dict:
+    """Live sun/moon altitude and moon illumination, plus whether it is daytime or astronomically dark."""
+    now = time.time() if now is None else now
+    positions = body_positions(Time(now, format="unix"), site.lat, site.lon)
+    return {
+        "time": _iso(now),
+        "sun_alt": float(positions["alt"][_SUN]),
+        "moon_alt": float(positions["alt"][_MOON]),
+        "moon_illumination": round(float(positions["illumination"][_MOON]), 3),
+        "daytime": is_daytime(site, now),
+        "dark": bool(positions["alt"][_SUN] < -18.0),
+    }
@@ -0,0 +1,225 @@
+"""
+Autonomous weather safety watchdog.
+Every fresh weather sample from the poller is evaluated with the rules in
+weather_data. On RED the watchdog aborts any slew and parks the connected
+mount through the ASCOM Alpaca client, bounded by
+WATCHDOG_ACTION_TIMEOUT_SECONDS. With hysteresis it only stands down once
+WATCHDOG_CLEAR_SAMPLES consecutive samples would be non-RED even with the
+readings pushed WATCHDOG_*_MARGIN closer to the thresholds, so a reading
+hovering at a threshold doesn't toggle it. Decisions and reaction
+latencies are kept for the safety endpoints.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.ascom_alpaca import ascom_client
+from app.services.weather_data import get_dew_point_status, get_humidity_status, get_overall_status
+from app.services.weather_poller import reading_time, weather_poller
+
+logger = logging.getLogger(__name__)
+
+WATCHDOG_ENABLED = os.getenv("WATCHDOG_ENABLED", "true").lower() in ("1", "true", "yes")
+# Consecutive RED samples before acting, and consecutive clear samples before standing down
+WATCHDOG_TRIP_SAMPLES = int(os.getenv("WATCHDOG_TRIP_SAMPLES", "1"))
+WATCHDOG_CLEAR_SAMPLES = int(os.getenv("WATCHDOG_CLEAR_SAMPLES", "3"))
+# How far inside the RED thresholds readings must be to count as clear (%RH and degrees C)
+WATCHDOG_HUMIDITY_MARGIN = float(os.getenv("WATCHDOG_HUMIDITY_MARGIN", "3"))
+WATCHDOG_DEW_MARGIN = float(os.getenv("WATCHDOG_DEW_MARGIN", "1"))
+WATCHDOG_ACTION_TIMEOUT_SECONDS = float(os.getenv("WATCHDOG_ACTION_TIMEOUT_SECONDS", "5"))
+# Also park when the weather snapshot goes stale (no trustworthy data)
+WATCHDOG_PARK_ON_STALE = os.getenv("WATCHDOG_PARK_ON_STALE", "false").lower() in ("1", "true", "yes")
+WATCHDOG_LOG_SIZE = 500
+
+SAFE = "SAFE"
+UNSAFE = "UNSAFE"
+
+
+def _is_red(status: Dict[str, Any], humidity_margin: float = 0.0, dew_margin: float = 0.0) -> Optional[bool]:
+    """Whether the readings are RED under the weather rules, shifted toward RED by the margins; None without data."""
+    temp, humidity, dew = status.get("temperature"), status.get("humidity"), status.get("dew_point")
+    if temp is None or humidity is None or dew is None:
+        return None
+    overall = get_overall_status(get_humidity_status(humidity + humidity_margin),
+                                 get_dew_point_status(temp - dew_margin, dew))
+    return overall == "RED"
+
+
+class SafetyWatchdog:
+    """Hysteresis state machine over weather samples that parks the mount when conditions turn RED."""
+
+    def __init__(self, client=ascom_client, enabled: bool = WATCHDOG_ENABLED):
+        self.client = client
+        self.enabled = enabled
+        self.state = SAFE
+        self.red_streak = 0
+        self.clear_streak = 0
+        self.parked_for_trip = False
+        self.trips = 0
+        self.last_observed: Optional[str] = None
+        self.superseded = 0
+        self.decisions = deque(maxlen=WATCHDOG_LOG_SIZE)
+        self.reaction_seconds = deque(maxlen=WATCHDOG_LOG_SIZE)
+        # Holds only the newest unprocessed sample; created on first use so it belongs to the serving loop
+        self._queue: Optional[asyncio.Queue] = None
+
+    def _pending(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=1)
+        return self._queue
+
+    def observe(self, status: Dict[str, Any], fetched_at: float) -> None:
+        """
+        Poller listener: hand the sample to the watchdog task without waiting.
+
+        Only the latest reading matters for a safety decision, so a sample
+        still waiting (e.g. while a park call runs to its timeout) is replaced.
+        """
+        queue = self._pending()
+        if queue.full():
+            queue.get_nowait()
+            self.superseded += 1
+        queue.put_nowait((status, fetched_at, time.perf_counter()))
+
+    def _log(self, decision: str, status: Optional[Dict[str, Any]], **details) -> Dict[str, Any]:
+        entry = {
+            "time": time.time(),
+            "decision": decision,
+            "state": self.state,
+            "weather_status": None if status is None else status.get("status"),
+            "observed_at": None if status is None else status.get("observed_at"),
+            **details,
+        }
+        self.decisions.append(entry)
+        logger.info(f"Safety watchdog: {decision} ({details})" if details else f"Safety watchdog: {decision}")
+        return entry
+
+    async def evaluate(self, status: Dict[str, Any], fetched_at: float, received: float) -> Optional[Dict[str, Any]]:
+        """Advance the state machine for one sample and act if it trips; returns the decision logged, if any."""
+        # Repeated polls of the same station reading are not new evidence either way
+        observed = status.get("observed_at")
+        if observed is not None and observed == self.last_observed:
+            return None
+        self.last_observed = observed
+        red = _is_red(status)
+        if red is None:
+            return None
+        if red:
+            self.red_streak += 1
+            self.clear_streak = 0
+        elif not _is_red(status, WATCHDOG_HUMIDITY_MARGIN, WATCHDOG_DEW_MARGIN):
+            self.clear_streak += 1
+            self.red_streak = 0
+        else:
+            # Between RED and the clear margin: neither trips nor counts toward clearing
+            self.red_streak = 0
+            self.clear_streak = 0
+
+        if self.state == SAFE and self.red_streak >= WATCHDOG_TRIP_SAMPLES:
+            self.state = UNSAFE
+            self.trips += 1
+            self.parked_for_trip = False
+            return await self._secure(status, fetched_at, received, reason="weather RED")
+        if self.state == UNSAFE and not self.parked_for_trip and red:
+            # A previous attempt failed or no mount was connected: try again on every RED sample
+            return await self._secure(status, fetched_at, received, reason="weather still RED")
+        if self.state == UNSAFE and self.clear_streak >= WATCHDOG_CLEAR_SAMPLES:
+            self.state = SAFE
+            return self._log("clear", status, clear_samples=self.clear_streak)
+        return None
+
+    async def _secure(self, status: Optional[Dict[str, Any]], fetched_at: float, received: float,
+                      reason: str) -> Dict[str, Any]:
+        """Abort any slew and park, within WATCHDOG_ACTION_TIMEOUT_SECONDS."""
+        if not self.enabled:
+            return self._log("trip (disabled, no action)", status, reason=reason)
+        if not self.client.session or not self.client.base_url:
+            return self._log("trip (no telescope connected)", status, reason=reason)
+
+        started = time.perf_counter()
+        result = {"abort": None, "park": None}
+        try:
+            await asyncio.wait_for(self._park(result), WATCHDOG_ACTION_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            result["timeout"] = True
+        except Exception as e:
+            result["error"] = str(e)
+        finished = time.perf_counter()
+        self.parked_for_trip = bool(result["park"])
+
+        reaction = finished - received
+        self.reaction_seconds.append(reaction)
+        sample_time = reading_time(status.get("observed_at")) if status else None
+        return self._log("park" if self.parked_for_trip else "park failed", status, reason=reason, **result,
+                         queue_seconds=started - received, action_seconds=finished - started,
+                         reaction_seconds=reaction,
+                         since_fetch_seconds=time.time() - fetched_at,
+                         since_reading_seconds=None if sample_time is None else time.time() - sample_time)
+
+    async def _park(self, result: Dict[str, Any]) -> None:
+        """Abort, park, and stop tracking if the park is refused; results go into result as they complete."""
+        result["abort"] = await self.client.abort_slew()
+        result["park"] = await self.client.park()
+        if not result["park"]:
+            # Couldn't park: at least stop tracking so the mount stays where it is
+            result["tracking_off"] = await self.client.set_tracking(False)
+
+    async def check_stale(self) -> Optional[Dict[str, Any]]:
+        """Treat a stale weather snapshot as RED when WATCHDOG_PARK_ON_STALE is set."""
+        if not WATCHDOG_PARK_ON_STALE or self.state == UNSAFE:
+            return None
+        snapshot = weather_poller.snapshot()
+        if not snapshot["stale"]:
+            return None
+        self.state = UNSAFE
+        self.trips += 1
+        self.clear_streak = 0
+        now = time.perf_counter()
+        return await self._secure(snapshot, time.time(), now, reason="weather data stale")
+
+    async def run(self) -> None:
+        """Evaluate samples as they arrive (the lifespan task)."""
+        queue = self._pending()
+        while True:
+            try:
+                status, fetched_at, received = await asyncio.wait_for(
+                    queue.get(), timeout=weather_poller.stale_seconds)
+            except asyncio.TimeoutError:
+                await self.check_stale()
+                continue
+            try:
+                await self.evaluate(status, fetched_at, received)
+                await self.check_stale()
+            except Exception as e:
+                logger.error(f"Safety watchdog evaluation failed: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        latencies = np.array(self.reaction_seconds, dtype=float)
+        return {
+            "enabled": self.enabled,
+            "state": self.state,
+            "trips": self.trips,
+            "parked_for_trip": self.parked_for_trip,
+            "last_observed_at": self.last_observed,
+            "red_streak": self.red_streak,
+            "clear_streak": self.clear_streak,
+            "superseded_samples": self.superseded,
+            "reactions": len(latencies),
+            "reaction_p50_seconds": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "reaction_p95_seconds": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            "reaction_max_seconds": float(latencies.max()) if len(latencies) else None,
+            "action_timeout_seconds": WATCHDOG_ACTION_TIMEOUT_SECONDS,
+        }
+
+    def recent_decisions(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent decisions first."""
+        return list(self.decisions)[::-1][:limit]
+
+
+safety_watchdog = SafetyWatchdog()
@@ -1,188 +1,760 @@
 from astroquery.simbad import Simbad
-from astropy.coordinates import SkyCoord, EarthLocation, AltAz
+from astropy.coordinates import SkyCoord
 from astropy.time import Time
 import astropy.units as u
 import numpy as np
-
-lat, lon = -37.7, 145.05
+import asyncio
+import os
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.singleflight import SingleFlight
+from app.services.catalog import NO_MAGNITUDE_FILTER, get_catalog, radec_to_unit_vectors
+from app.services.name_index import get_name_index
+from app.services.altaz import radec_to_altaz, unit_vectors_to_altaz, zenith_unit_vector
+from app.services.visibility_cache import VisibleObjectsCache
+from app.services.visible_changes import VisibleSetTracker
+from app.services.ephemeris import (NightEphemeris, get_ephemeris, night_start, EPHEMERIS_STEP_MINUTES,
+                                    EPHEMERIS_HORIZON_DEG)
+from app.services.sites import get_site, list_sites
+from app.services.solar_system import (OBSERVABLE_BODIES, bodies_table, body_night_curves, match_bodies,
+                                        visible_bodies)
+from app.services.sky_tiles import tiles_in_cap
+from app.services.object_table import ObjectTable, SEARCH_FIELDS
+from app.services.simbad_cache import (simbad_cache, SIMBAD_CACHE_SEARCH_TTL, SIMBAD_CACHE_REGION_TTL,
+                                       SIMBAD_CACHE_NEGATIVE_TTL)
+
+# Default observer site (see app.services.sites for the registry)
+default_site = get_site()
 min_alt_deg = 30.0
 magnitude = 6.5
 row_limit = 100
 current_time = True 
+# Region query centres are snapped to this grid (degrees) so nearby queries share cache entries
+REGION_GRID_DEG = 0.5
+HEMISPHERE_TILE_ROW_LIMIT = int(os.getenv("HEMISPHERE_TILE_ROW_LIMIT", "5000"))
+
+# Cone query for one hemisphere tile with the magnitude cutoff applied by SIMBAD, brightest
+# first so that a tile hitting the row limit loses its faintest objects
+TILE_QUERY = """
+SELECT TOP {limit} basic.main_id, basic.ra, basic.dec, basic.otype, allfluxes.V
+FROM basic JOIN allfluxes ON allfluxes.oidref = basic.oid
+WHERE CONTAINS(POINT('ICRS', basic.ra, basic.dec), CIRCLE('ICRS', {ra}, {dec}, {radius})) = 1
+AND allfluxes.V <= {magnitude}
+ORDER BY allfluxes.V
+"""
+
+# Objects without a V magnitude in the same cone, limited to Messier/NGC/IC objects as in the
+# offline catalog; they pass the magnitude filter, as in zenith mode
+TILE_NO_MAGNITUDE_QUERY = """
+SELECT TOP {limit} basic.main_id, basic.ra, basic.dec, basic.otype, allfluxes.V
+FROM basic LEFT JOIN allfluxes ON allfluxes.oidref = basic.oid
+JOIN ids ON ids.oidref = basic.oid
+WHERE CONTAINS(POINT('ICRS', basic.ra, basic.dec), CIRCLE('ICRS', {ra}, {dec}, {radius})) = 1
+AND allfluxes.V IS NULL AND {no_magnitude_filter}
+"""
+
+# All blocking SIMBAD work runs on this pool; its size bounds concurrency toward SIMBAD
+SIMBAD_MAX_CONCURRENCY = int(os.getenv("SIMBAD_MAX_CONCURRENCY", "4"))
+simbad_executor = ThreadPoolExecutor(max_workers = SIMBAD_MAX_CONCURRENCY, thread_name_prefix = "simbad")
+simbad_flight = SingleFlight(simbad_executor)
+
+def visible_objects_bundoora(min_alt_deg, magnitude, observation = None):
+  """
+  Visible objects from the default site as a list of dicts.
+
+  Args:
+    min_alt_deg: Minimum altitude in degrees
+    magnitude: Maximum visual magnitude (objects without one are kept)
+    observation: Observation time (now if None)
+
+  Returns:
+    List of objects with name, otype, ra/dec, alt/az and magnitude
+  """
+  return visible_objects_table(min_alt_deg, magnitude, observation).to_records()
+
+
+def visible_objects_table(min_alt_deg, magnitude, observation = None, site = None):
+  """Visible objects from a site (default site if None) as an ObjectTable (one NumPy array per column)."""
+  site = site or default_site
+  if observation is None:
+    observation = Time.now() if current_time else Time("2025-09-21T12:00:00")
+  zenith_xyz = zenith_unit_vector(observation, site.lat, site.lon)
+
+  catalog = get_catalog()
+  if catalog is not None:
+    objects = _visible_from_catalog(catalog, zenith_xyz, observation, min_alt_deg, magnitude, site)
+  else:
+    columns = _region_columns(zenith_xyz, 1.0, row_limit)
+    if not columns["name"]:
+      print(f"No astronomical objects found. Check if it is night time at {site.name} or adjust filters.")
+    objects = _visible_from_columns(columns, observation, min_alt_deg, magnitude, site)
+  return ObjectTable.concat([_visible_bodies(observation, min_alt_deg, magnitude, site), objects])
+
+
+def _visible_bodies(observation, min_alt_deg, magnitude, site):
+  """Moon and planets passing the filters; an ephemeris failure only drops them from the result."""
+  try:
+    return visible_bodies(observation, site.lat, site.lon, min_alt_deg, magnitude)
+  except Exception as e:
+    print(f"Solar-system positions unavailable: {e}")
+    return ObjectTable.empty()
+
+
+def _table_from_columns(columns, observation, site):
+  """Normalized SIMBAD columns plus alt/az from one batched transform, as an ObjectTable."""
+  ra = np.asarray(columns["ra"], dtype = float)
+  dec = np.asarray(columns["dec"], dtype = float)
+  alt_deg, az_deg = radec_to_altaz(ra, dec, observation, site.lat, site.lon)
+  return ObjectTable(columns["name"], columns["otype"], ra, dec, alt_deg, az_deg,
+                     np.asarray(columns["magnitude"], dtype = float))
 
-def visible_objects_bundoora(min_alt_deg, magnitude):
-  observation = Time.now() if current_time else Time("2025-09-21T12:00:00")
-  location = EarthLocation(lat = lat*u.deg, lon = lon*u.deg)
-  altaz = AltAz(obstime = observation, location = location)
 
+def _visible_from_columns(columns, observation, min_alt_deg, magnitude, site):
+  """Filter normalized SIMBAD columns on altitude and magnitude, with alt/az from one batched transform."""
+  if not columns["name"]:
+    return ObjectTable.empty()
+  table = _table_from_columns(columns, observation, site)
+  has_mag = np.isfinite(table.magnitude)
+  return table.take((table.alt >= min_alt_deg) & ((~has_mag) | (table.magnitude <= magnitude)))
 
-  zenith = SkyCoord(alt = 90*u.deg, az = 0*u.deg, frame = altaz)
-  center_icrs = zenith.icrs
 
+def _new_simbad(limit):
   sim = Simbad()
-  sim.row_limit = row_limit
+  sim.row_limit = limit
   sim.add_votable_fields("ra", "dec", "V", "flux(V)", "otype", "main_id", "ids")
+  return sim
 
-  print(f"Querying SIMBAD hemisphere @ {observation}...")
-  result = sim.query_region(center_icrs, radius = "1d")
+
+def _columns_from_result(result):
+  """
+  Normalize a SIMBAD result table into columns, without a per-row loop.
+
+  Returns:
+    dict of lists (so it can be cached as JSON): name, otype, ra and dec in
+    degrees, and magnitude (NaN when unknown)
+  """
   if result is None or len(result) == 0:
-    print("No astronomical objects found. Check if it is night time in Bundoora or adjust filters.")
-    return []
+    return {"name": [], "otype": [], "ra": [], "dec": [], "magnitude": []}
 
   colnames = result.colnames
-  
   ra_col = "ra" if "ra" in colnames else ("RA_d" if "RA_d" in colnames else "RA")
   dec_col = "dec" if "dec" in colnames else ("DEC_d" if "DEC_d" in colnames else "DEC")
-  if "RA_d" in colnames and "DEC_d" in colnames:
-    coords = SkyCoord(ra = result [ra_col]*u.deg, dec = result[dec_col]*u.deg, frame = "icrs")
+  # Current astroquery returns "ra"/"dec" in degrees; legacy "RA"/"DEC" are sexagesimal strings
+  if ra_col in ("ra", "RA_d"):
+    coords = SkyCoord(ra = np.asarray(result[ra_col], dtype = float)*u.deg,
+                      dec = np.asarray(result[dec_col], dtype = float)*u.deg, frame = "icrs")
   else:
     coords = SkyCoord(ra = result[ra_col], dec = result[dec_col], unit = (u.hourangle, u.deg), frame = "icrs")
-    
-  aa = coords.transform_to(altaz)
-  mag = result["V"] if "V" in result.colnames else np.array([np.nan]*len(result))
-  otype = result["OTYPE"] if "OTYPE" in result.colnames else np.array(["?"]*len(result))
+
+  mag_arr = np.ma.filled(np.ma.asarray(result["V"], dtype = float), np.nan) if "V" in colnames else np.full(len(result), np.nan)
+  otype_col = "OTYPE" if "OTYPE" in colnames else ("otype" if "otype" in colnames else None)
+  otype = _str_column(result[otype_col]) if otype_col else ["?"]*len(result)
+
   name_col = None
   for cand in ("MAIN_ID", "main_id", "IDS", "ids"):
-    if cand in result.colnames:
-        name_col = cand
-        break
-
+    if cand in colnames:
+      name_col = cand
+      break
   if name_col:
-    names = np.array([str(x).strip() for x in result[name_col]])
+    names = _str_column(result[name_col])
   else:
-    names = np.array([f"Obj_{i+1}" for i in range(len(result))])
+    names = [f"Obj_{i+1}" for i in range(len(result))]
+
+  return {"name": names, "otype": otype, "ra": coords.ra.deg.tolist(), "dec": coords.dec.deg.tolist(),
+          "magnitude": mag_arr.tolist()}
+
+
+def _str_column(column):
+  """A text column (str or bytes) as a list of stripped strings."""
+  values = np.asarray(column)
+  if values.dtype.kind == "S":
+    values = np.char.decode(values, "utf-8")
+  return np.char.strip(values.astype(str)).tolist()
+
+
+def _rows_from_result(result):
+  """Normalize a SIMBAD result table into plain rows (for per-name batch resolution): magnitude None if unknown."""
+  columns = _columns_from_result(result)
+  return [{"name": name, "otype": otype, "ra": ra, "dec": dec, "magnitude": m if np.isfinite(m) else None}
+          for name, otype, ra, dec, m in zip(columns["name"], columns["otype"], columns["ra"], columns["dec"],
+                                             columns["magnitude"])]
+
+
+def _region_columns(center_xyz, radius_deg, limit):
+  """
+  SIMBAD region query around a direction, through the persistent cache.
 
-  alt_deg = aa.alt.deg
-  mag_arr = np.array(mag, dtype = float)
+  The centre is snapped to a REGION_GRID_DEG grid so that queries made a
+  few minutes apart share a cache entry.
+  """
+  ra = np.degrees(np.arctan2(center_xyz[1], center_xyz[0])) % 360.0
+  dec = np.degrees(np.arcsin(np.clip(center_xyz[2], -1.0, 1.0)))
+  ra = round(ra / REGION_GRID_DEG) * REGION_GRID_DEG % 360.0
+  dec = round(dec / REGION_GRID_DEG) * REGION_GRID_DEG
+  key = f"region:{ra:.2f}:{dec:+.2f}:{radius_deg:g}:{limit}"
+
+  columns = simbad_cache.get(key)
+  if columns is not None:
+    return columns
+
+  print(f"Querying SIMBAD region RA={ra:.2f} Dec={dec:+.2f} r={radius_deg:g}d...")
+  result = _new_simbad(limit).query_region(SkyCoord(ra = ra*u.deg, dec = dec*u.deg, frame = "icrs"),
+                                           radius = radius_deg*u.deg)
+  columns = _columns_from_result(result)
+  simbad_cache.put(key, columns, SIMBAD_CACHE_REGION_TTL)
+  return columns
+
+
+def _visible_from_catalog(catalog, zenith_xyz, observation, min_alt_deg, magnitude, site):
+  """
+  Answer a visibility query from the offline catalog instead of SIMBAD.
+
+  The zenith cone (plus a small margin) is pulled from the catalog's
+  declination index, filtered on magnitude, and only the survivors are
+  transformed to Alt/Az.
+  """
+  radius = min(max(90.0 - min_alt_deg + 0.5, 0.0), 180.0)
+  idx = catalog.cone(zenith_xyz, radius)
+
+  mag_arr = catalog.magnitude[idx]
   has_mag = np.isfinite(mag_arr)
-  keep = (alt_deg >= min_alt_deg) & ((~has_mag) | (mag_arr <= magnitude))
-
-  visible = []
-  for i in np.where(keep)[0]:
-    name = names[i].decode("utf-8") if hasattr(names[i], "decode") else str(names[i])
-    m = float (mag_arr[i]) if np.isfinite(mag_arr[i]) else None
-    visible.append({
-      "name": name,
-      "otype": str(otype[i]),
-      "ra": float(coords.ra.deg[i]),
-      "dec": float(coords.dec.deg[i]),
-      "alt": float(alt_deg[i]),
-      "az": float(aa.az.deg[i]),
-      "magnitude": m
-    })
-  return visible
+  idx = idx[(~has_mag) | (mag_arr <= magnitude)]
+  if len(idx) == 0:
+    return ObjectTable.empty()
+
+  alt_deg, az_deg = _catalog_altaz(catalog, idx, observation, site)
+  keep = alt_deg >= min_alt_deg
+  return _catalog_table(catalog, idx[keep], alt_deg[keep], az_deg[keep])
+
+
+def _catalog_altaz(catalog, rows, observation, site):
+  """Alt/az for catalog rows, from the site's nightly ephemeris coefficients when they cover the observation time."""
+  ephemeris = get_ephemeris(site.lat, site.lon)
+  if ephemeris is not None and ephemeris.catalog is catalog and ephemeris.covers(observation.unix):
+    return ephemeris.altaz(rows, observation)
+  return unit_vectors_to_altaz(catalog.xyz[rows], observation, site.lat, site.lon)
+
+
+def _catalog_table(catalog, rows, alt_deg, az_deg):
+  """Catalog rows plus their alt/az as an ObjectTable, by fancy-indexing the catalog columns."""
+  return ObjectTable(catalog.name[rows], catalog.otype[rows], catalog.ra[rows], catalog.dec[rows],
+                     alt_deg, az_deg, catalog.magnitude[rows])
+
+
+def _tile_columns(tile, mag_level):
+  """
+  SIMBAD columns for one sky tile brighter than mag_level, through the persistent cache.
 
+  Each of the two tile queries returns at most HEMISPHERE_TILE_ROW_LIMIT
+  rows; a query that reaches the limit is reported, since the tile is then
+  missing its faintest (or some unmeasured) objects.
+  """
+  # "v3": tiles cached before they were ordered by magnitude are not reused
+  key = f"tile:v3:{tile.tile_id}:{mag_level:g}:{HEMISPHERE_TILE_ROW_LIMIT}"
+  columns = simbad_cache.get(key)
+  if columns is not None:
+    return columns
+
+  print(f"Querying SIMBAD tile {tile.tile_id} (V <= {mag_level:g})...")
+  columns = _columns_from_result(None)
+  for template in (TILE_QUERY, TILE_NO_MAGNITUDE_QUERY):
+    query = template.format(limit = HEMISPHERE_TILE_ROW_LIMIT, ra = tile.ra, dec = tile.dec, radius = tile.radius,
+                            magnitude = mag_level, no_magnitude_filter = NO_MAGNITUDE_FILTER)
+    part = _columns_from_result(Simbad.query_tap(query, maxrec = HEMISPHERE_TILE_ROW_LIMIT))
+    if len(part["name"]) >= HEMISPHERE_TILE_ROW_LIMIT:
+      kind = "objects with V" if template is TILE_QUERY else "objects without V"
+      print(f"Warning: SIMBAD tile {tile.tile_id} reached HEMISPHERE_TILE_ROW_LIMIT={HEMISPHERE_TILE_ROW_LIMIT} "
+            f"({kind}); results for this tile are truncated")
+    for field, values in part.items():
+      columns[field].extend(values)
+  simbad_cache.put(key, columns, SIMBAD_CACHE_REGION_TTL)
+  return columns
+
+
+async def visible_hemisphere_stream(min_alt_deg, magnitude, site_id = None):
+  """
+  Everything above min_alt_deg, yielded as ObjectTable batches as sky tiles complete.
+
+  The cap above min_alt_deg is covered with fixed ICRS tiles which are
+  queried concurrently on the SIMBAD executor, with the magnitude cutoff
+  applied server-side (rounded up to a whole magnitude so tiles cached for
+  one filter serve nearby ones). Objects are deduplicated across the
+  overlapping tiles. With an offline catalog the whole cap is answered
+  locally in one batch.
+  """
+  site = get_site(site_id)
+  observation = Time.now()
+  zenith_xyz = zenith_unit_vector(observation, site.lat, site.lon)
+  loop = asyncio.get_running_loop()
+
+  # The first call of a UTC day fits the Chebyshev table, so bodies are computed off the loop too
+  bodies = await loop.run_in_executor(None, _visible_bodies, observation, min_alt_deg, magnitude, site)
+  if len(bodies):
+    yield bodies
+
+  catalog = get_catalog()
+  if catalog is not None:
+    yield await loop.run_in_executor(None, _visible_from_catalog, catalog, zenith_xyz, observation,
+                                     min_alt_deg, magnitude, site)
+    return
+
+  radius = min(max(90.0 - min_alt_deg, 0.0), 180.0)
+  mag_level = float(np.ceil(magnitude))
+  pending = [asyncio.wrap_future(simbad_flight.submit(("tile", tile.tile_id, mag_level), _tile_columns, tile, mag_level))
+             for tile in tiles_in_cap(zenith_xyz, radius)]
+  seen = set()
+  for next_done in asyncio.as_completed(pending):
+    try:
+      columns = await next_done
+    except Exception as e:
+      print(f"SIMBAD tile query failed: {e}")
+      continue
+    batch = _visible_from_columns(columns, observation, min_alt_deg, magnitude, site)
+    fresh = np.array([name not in seen for name in batch.name], dtype = bool)
+    batch = batch.take(fresh)
+    seen.update(batch.name.tolist())
+    if len(batch):
+      yield batch
+
+
+def _indexed_visible_table(min_alt_deg, magnitude, observation = None, site = None):
+  """visible_objects_table with its sort/filter indexes built on the cache's refresh thread."""
+  return visible_objects_table(min_alt_deg, magnitude, observation, site).build_index()
+
+
+def _narrow_visible(table, min_alt_deg, magnitude):
+  """Rows of a cached visible table (computed for wider, quantized filters) that pass the requested ones."""
+  has_mag = np.isfinite(table.magnitude)
+  return table.take((table.alt >= min_alt_deg) & ((~has_mag) | (table.magnitude <= magnitude)))
+
+
+# One cache per site in front of visible_objects_table, refreshed by the app lifespan
+visible_caches = {site.site_id: VisibleObjectsCache(partial(_indexed_visible_table, site = site),
+                                                    flight = simbad_flight, name = site.site_id,
+                                                    narrow = _narrow_visible)
+                  for site in list_sites()}
+
+
+async def visible_objects_async(min_alt_deg, magnitude, site_id = None):
+  """
+  Visible objects from a site as an ObjectTable, without blocking the event loop.
 
-def search_objects(query: str, max_results: int = 10):
+  Served from the site's time-bucketed cache; on a miss, concurrent callers
+  with the same filters wait on a single computation on the SIMBAD executor.
   """
-  Search for astronomical objects by name or coordinates using SIMBAD.
+  return await visible_caches[get_site(site_id).site_id].aget(min_alt_deg, magnitude)
+
+
+async def visible_objects_page_async(min_alt_deg, magnitude, site_id = None, otypes = None, az_range = None,
+                                     sort = None, descending = False, offset = 0, limit = None):
+  """
+  One filtered, sorted page of the cached visible objects.
+
+  Returns:
+    Tuple of (ObjectTable page, total number of matching objects)
+  """
+  table = await visible_objects_async(min_alt_deg, magnitude, site_id)
+  rows, total = table.index.query(otypes, az_range, sort, descending, offset, limit)
+  return table.take(rows), total
+
+
+# Versioned visible sets for /api/visible/changes (offline catalog only), one per site
+visible_trackers = {site.site_id: VisibleSetTracker(site.lat, site.lon) for site in list_sites()}
+
+
+async def visible_changes_async(min_alt_deg, magnitude, since = None, site_id = None):
+  """
+  Objects that rose or set since a version, from precomputed crossing times.
+
+  Without an offline catalog there are no crossing times, so every call
+  is a full reset built from the regular visible-object query.
+  """
+  tracker = visible_trackers[get_site(site_id).site_id]
+  loop = asyncio.get_running_loop()
+  changes = await loop.run_in_executor(None, tracker.changes, min_alt_deg, magnitude, since)
+  if changes is None:
+    changes = {"version": 0, "reset": True, "visible": await visible_objects_async(min_alt_deg, magnitude, site_id),
+               "rose": ObjectTable.empty(), "set": ObjectTable.empty()}
+  return changes
+
+
+async def search_objects_async(query: str, max_results: int = 10, site_id = None):
+  """
+  Search for astronomical objects by name or coordinates, without blocking the event loop.
+
+  The offline catalog is tried first on the default thread pool (exact and
+  prefix matches only). SIMBAD fallbacks are coalesced per (query,
+  max_results, site) and run on the bounded SIMBAD executor, so a burst of
+  identical searches makes one upstream call. Fuzzy catalog matches are
+  only returned when SIMBAD finds nothing either.
 
   Args:
     query: The search term (object name, identifier, or coordinates like "10.68 +41.27")
     max_results: Maximum number of results to return
+    site_id: Observer site for alt/az (default site if None)
 
   Returns:
-    List of matching objects with their details
+    (ObjectTable, approximate): approximate is True when the results are
+    fuzzy catalog matches rather than the object searched for
   """
+  site = get_site(site_id)
   if not query or len(query.strip()) == 0:
-    return []
+    return ObjectTable.empty(), False
+  loop = asyncio.get_running_loop()
+  bodies, exact = await loop.run_in_executor(None, _search_bodies, query, site)
+  if exact:
+    return bodies, False
+  approximate = False
+  local = await loop.run_in_executor(None, _search_catalog, query, max_results, site)
+  if not len(local):
+    key = ("search", " ".join(query.split()).casefold(), max_results, site.site_id)
+    local = await simbad_flight.run(key, _search_simbad, query, max_results, site)
+  if not len(local) and not len(bodies):
+    local = await loop.run_in_executor(None, _search_catalog, query, max_results, site, True)
+    approximate = len(local) > 0
+  return ObjectTable.concat([bodies, local]).take(slice(0, max_results)), approximate
+
+
+def _search_bodies(query: str, site):
+  """
+  Moon and planets matching a search (by name prefix, at least two characters).
 
+  Returns:
+    (table, exact): exact is True when the query names a body outright, in
+    which case there is no need to search the catalog or SIMBAD
+  """
+  key = query.strip().casefold()
+  matched = match_bodies(key) if len(key) >= 2 else []
+  if not matched:
+    return ObjectTable.empty(), False
   try:
-    sim = Simbad()
-    sim.row_limit = max_results
-    sim.add_votable_fields("ra", "dec", "V", "flux(V)", "otype", "main_id", "ids")
-
-    print(f"Searching SIMBAD for: '{query}'")
-
-    # Check if query looks like coordinates (contains numbers and spaces/commas)
-    # Format: "RA DEC" like "10.68 +41.27" or "10.68,+41.27"
-    if any(char.isdigit() for char in query) and (' ' in query or ',' in query):
-      try:
-        # Try to parse as coordinates
-        coords_str = query.replace(',', ' ')
-        parts = coords_str.split()
-        if len(parts) >= 2:
-          print(f"Attempting coordinate search: {coords_str}")
-          coord = SkyCoord(coords_str, unit=(u.deg, u.deg), frame='icrs')
-          # Search within 5 arcminutes of the coordinates
-          result = sim.query_region(coord, radius=5*u.arcmin)
-          print(f"Coordinate search returned: {len(result) if result else 0} results")
-        else:
-          result = None
-      except Exception as e:
-        print(f"Coordinate parsing failed: {e}, trying name search")
-        result = None
-    else:
-      result = None
+    if key in matched:
+      return bodies_table(Time.now(), site.lat, site.lon, [key]), True
+    return bodies_table(Time.now(), site.lat, site.lon, matched), False
+  except Exception as e:
+    print(f"Solar-system positions unavailable: {e}")
+    return ObjectTable.empty(), False
+
+
+def _search_simbad(query: str, max_results: int, site):
+  """Resolve a search through the persistent cache, running the SIMBAD search chain on a miss (blocking)."""
+  key = f"search:{' '.join(query.split()).casefold()}:{max_results}"
+  columns = simbad_cache.get(key)
+  if columns is None:
+    try:
+      columns = _columns_from_result(_query_simbad_search(query, max_results))
+    except Exception as e:
+      print(f"Error searching SIMBAD: {e}")
+      return ObjectTable.empty()
+    simbad_cache.put(key, columns, SIMBAD_CACHE_SEARCH_TTL if columns["name"] else SIMBAD_CACHE_NEGATIVE_TTL)
+
+  if not columns["name"]:
+    print(f"No results found for query: '{query}'")
+    return ObjectTable.empty()
+  return _table_from_columns({field: values[:max_results] for field, values in columns.items()}, Time.now(), site)
+
+
+def _query_simbad_search(query: str, max_results: int):
+  """Try a coordinate search, then an exact name search, then a wildcard search; return the SIMBAD table."""
+  sim = _new_simbad(max_results)
+  print(f"Searching SIMBAD for: '{query}'")
+
+  # Coordinates like "10.68 +41.27" or "10.68,+41.27": search within 5 arcminutes
+  result = None
+  position = _parse_coordinates(query)
+  if position is not None:
+    print(f"Attempting coordinate search: {position[0]:.5f} {position[1]:+.5f}")
+    try:
+      result = sim.query_region(SkyCoord(ra = position[0]*u.deg, dec = position[1]*u.deg, frame = "icrs"),
+                                radius = 5*u.arcmin)
+      print(f"Coordinate search returned: {len(result) if result else 0} results")
+    except Exception as e:
+      print(f"Coordinate search failed: {e}, trying name search")
+
+  # If coordinate search didn't work or wasn't attempted, try name searches
+  if result is None or len(result) == 0:
+    # Try direct object name search (searches common names like "Andromeda Galaxy")
+    print(f"Trying direct name search for: '{query}'")
+    result = sim.query_object(query)
 
-    # If coordinate search didn't work or wasn't attempted, try name searches
     if result is None or len(result) == 0:
-      # Try direct object name search (searches common names like "Andromeda Galaxy")
-      print(f"Trying direct name search for: '{query}'")
-      result = sim.query_object(query)
+      # Try wildcard search for partial matches
+      print(f"Trying wildcard search for: '{query}*'")
+      result = sim.query_object(query + "*", wildcard=True)
 
-      if result is None or len(result) == 0:
-        # Try wildcard search for partial matches
-        print(f"Trying wildcard search for: '{query}*'")
-        result = sim.query_object(query + "*", wildcard=True)
+  if result is not None and len(result) > 0:
+    print(f"Found {len(result)} result(s)")
+  return result
 
-    if result is None or len(result) == 0:
-      print(f"No results found for query: '{query}'")
-      return []
 
-    print(f"Found {len(result)} result(s)")
+def _search_results(rows, observation, site):
+  """Add alt/az to normalized rows in one batched transform, as an ObjectTable."""
+  ra = np.array([r["ra"] for r in rows], dtype=float)
+  dec = np.array([r["dec"] for r in rows], dtype=float)
+  alt_deg, az_deg = radec_to_altaz(ra, dec, observation, site.lat, site.lon)
+  return ObjectTable.from_rows(rows, alt_deg, az_deg)
 
-    # Get location for calculating altitude/azimuth
-    observation = Time.now()
-    location = EarthLocation(lat=lat*u.deg, lon=lon*u.deg)
-    altaz = AltAz(obstime=observation, location=location)
 
-    colnames = result.colnames
-    ra_col = "ra" if "ra" in colnames else ("RA_d" if "RA_d" in colnames else "RA")
-    dec_col = "dec" if "dec" in colnames else ("DEC_d" if "DEC_d" in colnames else "DEC")
+def _parse_coordinates(query: str):
+  """Return (ra_deg, dec_deg) if the query looks like "10.68 +41.27" or "10.68,+41.27", else None."""
+  if not (any(char.isdigit() for char in query) and (' ' in query or ',' in query)):
+    return None
+  coords_str = query.replace(',', ' ')
+  if len(coords_str.split()) < 2:
+    return None
+  try:
+    coord = SkyCoord(coords_str, unit=(u.deg, u.deg), frame='icrs')
+  except Exception:
+    return None
+  return coord.ra.deg, coord.dec.deg
 
-    if "RA_d" in colnames and "DEC_d" in colnames:
-      coords = SkyCoord(ra=result[ra_col]*u.deg, dec=result[dec_col]*u.deg, frame="icrs")
-    else:
-      coords = SkyCoord(ra=result[ra_col], dec=result[dec_col], unit=(u.hourangle, u.deg), frame="icrs")
 
-    aa = coords.transform_to(altaz)
-    mag = result["V"] if "V" in result.colnames else np.array([np.nan]*len(result))
-    otype = result["OTYPE"] if "OTYPE" in result.colnames else np.array(["?"]*len(result))
+def _objects_from_catalog(catalog, rows, observation, site):
+  """Search results for catalog rows, with alt/az from one batched transform."""
+  rows = np.asarray(rows, dtype=int)
+  alt_deg, az_deg = _catalog_altaz(catalog, rows, observation, site)
+  return _catalog_table(catalog, rows, alt_deg, az_deg)
 
-    name_col = None
-    for cand in ("MAIN_ID", "main_id", "IDS", "ids"):
-      if cand in result.colnames:
-        name_col = cand
-        break
 
-    if name_col:
-      names = np.array([str(x).strip() for x in result[name_col]])
+def _search_catalog(query: str, max_results: int, site, fuzzy = False):
+  """
+  Answer a search from the offline catalog and name index.
+
+  Coordinate queries become a 5 arcminute cone search; names go through
+  the identifier index (exact, then prefix). A fuzzy hit is often a
+  different object (a designation the catalog lacks matches a shorter one),
+  so fuzzy matching only runs when asked for, after SIMBAD found nothing.
+  Returns an empty table when there is no catalog or nothing matches, so
+  the caller can try SIMBAD.
+  """
+  catalog = get_catalog()
+  if catalog is None:
+    return ObjectTable.empty()
+
+  position = _parse_coordinates(query)
+  if position is not None:
+    center = radec_to_unit_vectors([position[0]], [position[1]])[0]
+    rows = catalog.cone(center, 5.0 / 60.0)
+    rows = rows[np.argsort(-(catalog.xyz[rows] @ center))][:max_results]
+  else:
+    index = get_name_index()
+    hits = index.fuzzy(query, max_results) if fuzzy else index.lookup(query, max_results)
+    rows = [hit["row"] for hit in hits]
+
+  if len(rows) == 0:
+    return ObjectTable.empty()
+  return _objects_from_catalog(catalog, rows, Time.now(), site)
+
+
+def _catalog_row(catalog, i):
+  m = catalog.magnitude[i]
+  return {
+    "name": str(catalog.name[i]),
+    "otype": str(catalog.otype[i]),
+    "ra": float(catalog.ra[i]),
+    "dec": float(catalog.dec[i]),
+    "magnitude": float(m) if np.isfinite(m) else None
+  }
+
+
+def _batch_key(name: str) -> str:
+  return f"resolve:{' '.join(name.split()).casefold()}"
+
+
+def _resolve_local(names):
+  """
+  Resolve names as solar-system bodies, then from the offline index and the persistent cache.
+
+  Returns:
+    (resolved, remaining): resolved maps name -> (source, row or None),
+    remaining lists names that need SIMBAD. Bodies resolve to
+    ("solar_system", {"body": name}); their positions are computed per request.
+  """
+  resolved = {}
+  remaining = []
+  index = get_name_index()
+  for name in dict.fromkeys(names):
+    body = name.strip().casefold()
+    if body in OBSERVABLE_BODIES:
+      resolved[name] = ("solar_system", {"body": body})
+      continue
+    hit = index.exact(name) if index is not None else None
+    if hit is not None:
+      resolved[name] = ("catalog", _catalog_row(index.catalog, hit["row"]))
+      continue
+    rows = simbad_cache.get(_batch_key(name))
+    if rows is not None:
+      resolved[name] = ("cache", rows[0] if rows else None)
     else:
-      names = np.array([f"Obj_{i+1}" for i in range(len(result))])
-
-    alt_deg = aa.alt.deg
-    mag_arr = np.array(mag, dtype=float)
-
-    objects = []
-    for i in range(min(len(result), max_results)):
-      name = names[i].decode("utf-8") if hasattr(names[i], "decode") else str(names[i])
-      m = float(mag_arr[i]) if np.isfinite(mag_arr[i]) else None
-      objects.append({
-        "name": name,
-        "object_type": str(otype[i]),
-        "ra": float(coords.ra.deg[i]),
-        "dec": float(coords.dec.deg[i]),
-        "altitude": float(alt_deg[i]),
-        "azimuth": float(aa.az.deg[i]),
-        "magnitude": m
-      })
+      remaining.append(name)
+  return resolved, remaining
 
-    return objects
 
+def _resolve_simbad(names):
+  """
+  Resolve many names with a single SIMBAD query (one TAP job with the names uploaded as a table).
+
+  Returns:
+    dict mapping each name to its row, or None if SIMBAD doesn't know it
+    or can't be reached (those misses are not cached)
+  """
+  print(f"Resolving {len(names)} name(s) with one SIMBAD query...")
+  try:
+    result = _new_simbad(len(names)).query_objects(names)
   except Exception as e:
-    print(f"Error searching SIMBAD: {e}")
+    print(f"Error resolving names with SIMBAD: {e}")
+    return {name: ("simbad", None) for name in names}
+  rows = _rows_from_result(result)
+  found = {}
+  if rows:
+    for requested, row in zip(result["user_specified_id"], rows):
+      requested = requested.decode("utf-8") if hasattr(requested, "decode") else str(requested)
+      found.setdefault(requested.strip(), row)
+
+  resolved = {}
+  for name in names:
+    row = found.get(name.strip())
+    simbad_cache.put(_batch_key(name), [row] if row else [],
+                     SIMBAD_CACHE_SEARCH_TTL if row else SIMBAD_CACHE_NEGATIVE_TTL)
+    resolved[name] = ("simbad", row)
+  return resolved
+
+
+def _batch_results(names, resolved, site):
+  """
+  Shape per-name results, computing alt/az for every found object in one transform.
+
+  Solar-system bodies take their position from the Chebyshev table instead.
+  """
+  observation = Time.now()
+  records = {}
+  distinct = list(dict.fromkeys(names))
+  fixed = [name for name in distinct if name in resolved and resolved[name][1] and resolved[name][0] != "solar_system"]
+  if fixed:
+    table = _search_results([resolved[name][1] for name in fixed], observation, site)
+    records.update(zip(fixed, table.to_records(SEARCH_FIELDS)))
+  bodies = [name for name in distinct if name in resolved and resolved[name][0] == "solar_system"]
+  if bodies:
+    try:
+      table = bodies_table(observation, site.lat, site.lon, [resolved[name][1]["body"] for name in bodies])
+      records.update(zip(bodies, table.to_records(SEARCH_FIELDS)))
+    except Exception as e:
+      print(f"Solar-system positions unavailable: {e}")
+  results = []
+  for name in names:
+    record = records.get(name)
+    results.append({
+      "query": name,
+      "found": record is not None,
+      "source": resolved.get(name, ("simbad", None))[0],
+      "object": dict(record) if record is not None else None
+    })
+  return results
+
+
+async def resolve_objects_batch_async(names, site_id = None):
+  """
+  Resolve a list of object names in one go.
+
+  Offline index and persistent cache hits are answered locally; everything
+  else is resolved with a single SIMBAD query instead of one per name,
+  coalesced and run on the SIMBAD executor.
+
+  Args:
+    names: Object names or identifiers
+    site_id: Observer site for alt/az (default site if None)
+
+  Returns:
+    One entry per input name with query, found, source and the object
+    (name, type, ra/dec, alt/az, magnitude) or None
+  """
+  site = get_site(site_id)
+  names = [name for name in names if name and name.strip()]
+  loop = asyncio.get_running_loop()
+  resolved, remaining = await loop.run_in_executor(None, _resolve_local, names)
+  if remaining:
+    key = ("batch",) + tuple(sorted(remaining))
+    resolved.update(await simbad_flight.run(key, _resolve_simbad, remaining))
+  return await loop.run_in_executor(None, _batch_results, names, resolved, site)
+
+
+def _iso_times(unix_times):
+  """ISO UTC strings for unix times, None where the time is NaN."""
+  unix_times = np.asarray(unix_times, dtype=float)
+  known = np.isfinite(unix_times)
+  iso = np.full(len(unix_times), None, dtype=object)
+  if known.any():
+    iso[known] = Time(unix_times[known], format="unix").isot
+  return iso.tolist()
+
+
+def _altitude_curves(results, step_minutes, site):
+  """
+  Attach tonight's rise/transit/set and altitude curve to resolved batch results (blocking).
+
+  Fixed objects are evaluated from their harmonic coefficients; solar-system
+  bodies from the Chebyshev table at every grid time.
+  """
+  tonight = get_ephemeris(site.lat, site.lon)
+  start = tonight.start if tonight is not None else night_start(Time.now().unix, site.lon)
+  found = [result for result in results if result["found"]]
+  fixed = [result for result in found if result["source"] != "solar_system"]
+  bodies = [result for result in found if result["source"] == "solar_system"]
+  ra = [result["object"]["ra"] for result in fixed]
+  dec = [result["object"]["dec"] for result in fixed]
+  ephemeris = NightEphemeris(radec_to_unit_vectors(ra, dec), site.lat, site.lon, start)
+  times = ephemeris.grid(step_minutes)
+  curves = {"altitude": ephemeris.altitude_curves(np.arange(len(fixed)), times), "rise": ephemeris.rise,
+            "transit": ephemeris.transit, "set": ephemeris.set, "max_alt": ephemeris.max_alt}
+  groups = [(fixed, curves)]
+  if bodies:
+    names = [result["object"]["name"].casefold() for result in bodies]
+    groups.append((bodies, body_night_curves(names, times, site.lat, site.lon, EPHEMERIS_HORIZON_DEG)))
+
+  for group, curves in groups:
+    rise, transit, setting = _iso_times(curves["rise"]), _iso_times(curves["transit"]), _iso_times(curves["set"])
+    for i, result in enumerate(group):
+      result.update({
+        "rise": rise[i],
+        "transit": transit[i],
+        "set": setting[i],
+        "max_alt": float(curves["max_alt"][i]),
+        "altitude": np.round(curves["altitude"][i], 3).tolist()
+      })
+  return {"start": _iso_times([ephemeris.start])[0], "end": _iso_times([ephemeris.end])[0],
+          "times": _iso_times(times), "data": results}
+
+
+async def altitude_curves_async(names, step_minutes = EPHEMERIS_STEP_MINUTES, site_id = None):
+  """
+  Tonight's altitude curves for a list of objects.
+
+  Names are resolved like a batch search, then the objects' harmonic
+  coefficients are evaluated on a time grid over the whole night in one
+  matrix product.
+
+  Returns:
+    dict with the night's start/end, the time grid, and per-name results
+    with rise/transit/set times, maximum altitude and the altitude curve
+  """
+  site = get_site(site_id)
+  results = await resolve_objects_batch_async(names, site_id)
+  loop = asyncio.get_running_loop()
+  return await loop.run_in_executor(None, _altitude_curves, results, step_minutes, site)
+
+
+def autocomplete_objects(query: str, limit: int = 10):
+  """
+  Ranked name completions from the offline identifier index.
+
+  Returns:
+    List of candidates with the matched alias, object type, magnitude,
+    match kind (exact/prefix/fuzzy) and score
+  """
+  index = get_name_index()
+  if index is None or not query.strip():
     return []
+  return [{k: v for k, v in hit.items() if k != "row"} for hit in index.autocomplete(query, limit)]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+"""
+Persistent on-disk cache of SIMBAD query results.
+Normalized results (columns for region and search queries, rows for
+batch-resolved names) are stored in SQLite with a TTL, a content version
+and a total size cap enforced by least-recently-used eviction, so cached
+searches and region queries survive backend restarts.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Union
+
+from app.services.catalog import BACKEND_DIR
+
+logger = logging.getLogger(__name__)
+
+SIMBAD_CACHE_PATH = os.getenv("SIMBAD_CACHE_PATH", os.path.join(BACKEND_DIR, "data", "simbad_cache.sqlite3"))
+SIMBAD_CACHE_MAX_BYTES = int(os.getenv("SIMBAD_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SIMBAD_CACHE_SEARCH_TTL = float(os.getenv("SIMBAD_CACHE_SEARCH_TTL", str(30 * 24 * 3600)))
+SIMBAD_CACHE_REGION_TTL = float(os.getenv("SIMBAD_CACHE_REGION_TTL", str(7 * 24 * 3600)))
+# Empty results are cached too, briefly, so repeated typos don't hammer SIMBAD
+SIMBAD_CACHE_NEGATIVE_TTL = float(os.getenv("SIMBAD_CACHE_NEGATIVE_TTL", "3600"))
+
+# Cache hits only record their access time in memory; they are written out with the next put
+# (before eviction), or once this many have accumulated
+SIMBAD_CACHE_ACCESS_FLUSH = 256
+
+# Bump when the stored row format changes; rows written under another version are ignored
+# (2: region, tile and search results are stored as columns)
+CACHE_VERSION = 2
+
+
+class SimbadResultCache:
+    """SQLite-backed key -> rows/columns cache with TTLs, versioning and an LRU size cap."""
+
+    def __init__(self, path: str = SIMBAD_CACHE_PATH, max_bytes: int = SIMBAD_CACHE_MAX_BYTES,
+                 version: int = CACHE_VERSION):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # key -> last access time not yet written to the database
+        self._accessed: Dict[str, float] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    rows TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    expires REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> Optional[Union[List[Dict], Dict[str, list]]]:
+        """Return the cached rows for key, or None if missing, expired or from another version."""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute("SELECT version, rows, expires FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None or row[0] != self.version or row[2] < now:
+                    self.misses += 1
+                    return None
+                self._accessed[key] = now
+                if len(self._accessed) >= SIMBAD_CACHE_ACCESS_FLUSH:
+                    self._flush_access(conn)
+                    conn.commit()
+                self.hits += 1
+            return json.loads(row[1])
+        except sqlite3.Error as e:
+            logger.error(f"SIMBAD cache read failed for {key}: {e}")
+            return None
+
+    def put(self, key: str, rows: Union[List[Dict], Dict[str, list]], ttl: float) -> None:
+        """Store rows under key for ttl seconds, evicting least recently used entries over the size cap."""
+        payload = json.dumps(rows, separators=(",", ":"))
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, version, rows, size, created, expires, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, self.version, payload, len(payload), now, now + ttl, now))
+                self._accessed.pop(key, None)
+                self._flush_access(conn)
+                self._evict(conn, now)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"SIMBAD cache write failed for {key}: {e}")
+
+    def _flush_access(self, conn: sqlite3.Connection) -> None:
+        """Write the batched hit times so eviction sees them (caller holds the lock and commits)."""
+        if self._accessed:
+            conn.executemany("UPDATE results SET last_access = ? WHERE key = ?",
+                             [(t, key) for key, t in self._accessed.items()])
+            self._accessed.clear()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM results WHERE expires < ? OR version != ?", (now, self.version))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Walk entries oldest-access first until enough bytes are freed
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY last_access ASC"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM results WHERE key = ?", victims)
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM results")
+            conn.commit()
+            self._accessed.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            conn = self._connect()
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {"entries": count, "bytes": size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "version": self.version}
+
+
+simbad_cache = SimbadResultCache()
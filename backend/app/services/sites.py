@@ -0,0 +1,71 @@
+"""
+Observer site registry.
+The default site comes from LATITUDE/LONGITUDE; further observatories are
+listed in OBSERVER_SITES as JSON, e.g.
+[{"id": "siding-spring", "name": "Siding Spring", "lat": -31.27, "lon": 149.06, "elevation": 1165}]
+Sites are fixed at startup so per-site caches can be created up front.
+"""
+
+import os
+import json
+import logging
+from typing import Dict, List
+
+import astropy.units as u
+from astropy.coordinates import EarthLocation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SITE_ID = os.getenv("DEFAULT_SITE", "bundoora")
+
+
+class Site:
+    """A named observing location with its EarthLocation built once."""
+
+    def __init__(self, site_id: str, name: str, lat: float, lon: float, elevation: float = 0.0):
+        self.site_id = site_id
+        self.name = name
+        self.lat = float(lat)
+        self.lon = float(lon)
+        self.elevation = float(elevation)
+        self.location = EarthLocation.from_geodetic(lon=self.lon * u.deg, lat=self.lat * u.deg,
+                                                    height=self.elevation * u.m)
+
+    def to_dict(self):
+        return {"id": self.site_id, "name": self.name, "lat": self.lat, "lon": self.lon,
+                "elevation": self.elevation}
+
+
+def _load_sites() -> Dict[str, Site]:
+    sites = {DEFAULT_SITE_ID: Site(DEFAULT_SITE_ID, os.getenv("SITE_NAME", "Bundoora, Melbourne"),
+                                   float(os.getenv("LATITUDE", "-37.7")), float(os.getenv("LONGITUDE", "145.05")),
+                                   float(os.getenv("ELEVATION", "0")))}
+    try:
+        extra = json.loads(os.getenv("OBSERVER_SITES", "[]"))
+    except json.JSONDecodeError as e:
+        logger.error(f"Ignoring OBSERVER_SITES, not valid JSON: {e}")
+        extra = []
+    for entry in extra:
+        try:
+            site = Site(entry["id"], entry.get("name", entry["id"]), entry["lat"], entry["lon"],
+                        entry.get("elevation", 0.0))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Ignoring invalid site entry {entry}: {e}")
+            continue
+        sites[site.site_id] = site
+    return sites
+
+
+SITES = _load_sites()
+
+
+def get_site(site_id: str = None) -> Site:
+    """Look up a site by id (default site for None); raises ValueError for unknown ids."""
+    site = SITES.get(site_id or DEFAULT_SITE_ID)
+    if site is None:
+        raise ValueError(f"Unknown site: {site_id}")
+    return site
+
+
+def list_sites() -> List[Site]:
+    return list(SITES.values())
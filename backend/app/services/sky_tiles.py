@@ -0,0 +1,72 @@
+"""
+Fixed ICRS sky tiling for hemisphere queries.
+The sky is split into declination bands and each band into roughly
+equal-area RA cells. Tiles are fixed on the celestial sphere, not the
+local sky, so a tile's query result can be cached and reused across
+requests while the sky rotates overhead.
+"""
+
+import os
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+
+from app.services.catalog import radec_to_unit_vectors
+
+TILE_SIZE_DEG = float(os.getenv("HEMISPHERE_TILE_SIZE_DEG", "15"))
+
+
+class SkyTile:
+    """A cell of the fixed grid, queried as its circumscribed cone."""
+
+    def __init__(self, tile_id: str, ra: float, dec: float, radius: float):
+        self.tile_id = tile_id
+        self.ra = ra
+        self.dec = dec
+        self.radius = radius
+        self.xyz = radec_to_unit_vectors([ra], [dec])[0]
+
+    def to_dict(self):
+        return {"id": self.tile_id, "ra": self.ra, "dec": self.dec, "radius": self.radius}
+
+
+def _separation_deg(ra1, dec1, ra2, dec2) -> float:
+    a = radec_to_unit_vectors([ra1], [dec1])[0]
+    b = radec_to_unit_vectors([ra2], [dec2])[0]
+    return float(np.degrees(np.arccos(np.clip(a @ b, -1.0, 1.0))))
+
+
+@lru_cache(maxsize=4)
+def sky_grid(tile_size_deg: float = TILE_SIZE_DEG) -> List[SkyTile]:
+    """Build the full-sky grid for a tile size."""
+    tiles = []
+    bands = int(np.ceil(180.0 / tile_size_deg))
+    band_height = 180.0 / bands
+    for b in range(bands):
+        dec_lo = -90.0 + b * band_height
+        dec_hi = dec_lo + band_height
+        dec_c = (dec_lo + dec_hi) / 2
+        widest = np.cos(np.radians(min(abs(dec_lo), abs(dec_hi)) if dec_lo * dec_hi > 0 else 0.0))
+        cells = max(1, int(np.ceil(360.0 * widest / tile_size_deg)))
+        cell_width = 360.0 / cells
+        for c in range(cells):
+            ra_c = (c + 0.5) * cell_width
+            corners = [(c * cell_width, dec_lo), (c * cell_width, dec_hi),
+                       ((c + 1) * cell_width, dec_lo), ((c + 1) * cell_width, dec_hi)]
+            radius = max(_separation_deg(ra_c, dec_c, ra, dec) for ra, dec in corners)
+            # Edges of a cell bulge beyond its corners near the poles; pad slightly
+            tiles.append(SkyTile(f"{tile_size_deg:g}:{b}:{c}", ra_c, dec_c, radius * 1.02))
+    return tiles
+
+
+def tiles_in_cap(center_xyz: np.ndarray, radius_deg: float,
+                 tile_size_deg: float = TILE_SIZE_DEG) -> List[SkyTile]:
+    """Tiles whose cone intersects the spherical cap of radius_deg around center_xyz."""
+    center = np.asarray(center_xyz, dtype=float)
+    selected = []
+    for tile in sky_grid(tile_size_deg):
+        separation = np.degrees(np.arccos(np.clip(tile.xyz @ center, -1.0, 1.0)))
+        if separation <= radius_deg + tile.radius:
+            selected.append(tile)
+    return selected
@@ -0,0 +1,238 @@
+"""
+Sun, Moon and planets from cached Chebyshev tables.
+Once per UTC day, geocentric astrometric positions of every body are
+sampled from a local ephemeris (astropy's built-in one by default) at
+Chebyshev nodes and fitted with one Chebyshev series per coordinate.
+Positions at any time that day are then a single small polynomial
+evaluation for all bodies, and go through the regular alt/az engine.
+"""
+
+import os
+import logging
+from functools import lru_cache
+from typing import Dict, List, Sequence
+
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import get_body_barycentric, solar_system_ephemeris
+from astropy.time import Time, TimeDelta
+from numpy.polynomial import chebyshev
+
+from app.services.altaz import (unit_vectors_to_altaz, unit_vectors_to_altaz_series, zenith_unit_vector,
+                                zenith_unit_vectors)
+from app.services.object_table import ObjectTable
+
+logger = logging.getLogger(__name__)
+
+# "builtin" needs no files; a path to a JPL .bsp kernel (with jplephem installed) is more precise
+SOLAR_SYSTEM_EPHEMERIS = os.getenv("SOLAR_SYSTEM_EPHEMERIS", "builtin")
+
+BODIES = ("sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn", "uranus", "neptune")
+# The Sun is tracked for twilight and phase calculations but never offered as a target
+OBSERVABLE_BODIES = BODIES[1:]
+BODY_TYPES = {"sun": "Star", "moon": "Moon"}
+
+CHEBYSHEV_NODES = 24
+CHEBYSHEV_DEGREE = 16
+DAY_SECONDS = 86400.0
+LIGHT_SECONDS_PER_AU = 499.004783836
+EARTH_RADIUS_AU = 6378.137 / 149597870.7
+WGS84_E2 = 6.69437999014e-3
+
+# Absolute magnitude and phase polynomial (degrees) per body: V = H + 5 log10(r * delta) + phase terms
+_MAGNITUDE_TERMS = {
+    "mercury": (-0.42, (0.0380, -0.000273, 0.000002)),
+    "venus": (-4.40, (0.0009, 0.000239, -0.00000065)),
+    "mars": (-1.52, (0.016, 0.0, 0.0)),
+    "jupiter": (-9.40, (0.005, 0.0, 0.0)),
+    "saturn": (-8.88, (0.0, 0.0, 0.0)),
+    "uranus": (-7.19, (0.0, 0.0, 0.0)),
+    "neptune": (-6.87, (0.0, 0.0, 0.0)),
+}
+
+
+class BodyTable:
+    """Chebyshev coefficients of geocentric positions (AU, ICRS axes) for BODIES over one span."""
+
+    def __init__(self, start: float, duration: float, coeff: np.ndarray):
+        self.start = start
+        self.duration = duration
+        self.coeff = coeff  # (degree + 1, len(BODIES), 3)
+
+    def covers(self, unix_time: float) -> bool:
+        return self.start <= unix_time <= self.start + self.duration
+
+    def geocentric(self, unix_time) -> np.ndarray:
+        """(len(BODIES), 3) geocentric astrometric positions in AU, or (len(BODIES), 3, T) for an array of times."""
+        x = 2.0 * (np.asarray(unix_time, dtype=float) - self.start) / self.duration - 1.0
+        return chebyshev.chebval(x, self.coeff)
+
+
+def _astrometric(body: str, times: Time, earth: np.ndarray) -> np.ndarray:
+    """Geocentric position of body (N, 3) in AU, corrected for light time."""
+    position = get_body_barycentric(body, times).xyz.to_value(u.au).T
+    delay = np.linalg.norm(position - earth, axis=1) * LIGHT_SECONDS_PER_AU
+    position = get_body_barycentric(body, times - TimeDelta(delay, format="sec")).xyz.to_value(u.au).T
+    return position - earth
+
+
+@lru_cache(maxsize=4)
+def day_table(day: int) -> BodyTable:
+    """Fit the BodyTable for a UTC day (days since the unix epoch)."""
+    start = day * DAY_SECONDS
+    nodes = np.cos(np.pi * (np.arange(CHEBYSHEV_NODES) + 0.5) / CHEBYSHEV_NODES)
+    times = Time(start + (nodes + 1.0) / 2.0 * DAY_SECONDS, format="unix")
+    with solar_system_ephemeris.set(SOLAR_SYSTEM_EPHEMERIS):
+        earth = get_body_barycentric("earth", times).xyz.to_value(u.au).T
+        samples = np.stack([_astrometric(body, times, earth) for body in BODIES], axis=1)
+    coeff = chebyshev.chebfit(nodes, samples.reshape(CHEBYSHEV_NODES, -1), CHEBYSHEV_DEGREE)
+    logger.info(f"Fitted solar-system Chebyshev table for {Time(start, format='unix').iso[:10]}")
+    return BodyTable(start, DAY_SECONDS, coeff.reshape(CHEBYSHEV_DEGREE + 1, len(BODIES), 3))
+
+
+def geocentric_positions(obstime: Time) -> np.ndarray:
+    """(len(BODIES), 3) geocentric astrometric positions in AU at obstime."""
+    unix_time = float(obstime.unix)
+    return day_table(int(np.floor(unix_time / DAY_SECONDS))).geocentric(unix_time)
+
+
+def geocentric_series(unix_times: np.ndarray) -> np.ndarray:
+    """(T, len(BODIES), 3) geocentric positions at many times: one Chebyshev evaluation per UTC day spanned."""
+    unix_times = np.asarray(unix_times, dtype=float)
+    days = np.floor(unix_times / DAY_SECONDS).astype(int)
+    positions = np.empty((len(unix_times), len(BODIES), 3))
+    for day in np.unique(days):
+        on_day = days == day
+        positions[on_day] = np.moveaxis(day_table(int(day)).geocentric(unix_times[on_day]), -1, 0)
+    return positions
+
+
+def _observer_offset(lat_deg: float):
+    """Geocentric latitude (degrees) and distance from the Earth's centre (AU) of a site on the WGS84 ellipsoid."""
+    phi = np.radians(lat_deg)
+    prime_vertical = 1.0 / np.sqrt(1.0 - WGS84_E2 * np.sin(phi) ** 2)
+    x, z = prime_vertical * np.cos(phi), prime_vertical * (1.0 - WGS84_E2) * np.sin(phi)
+    return np.degrees(np.arctan2(z, x)), EARTH_RADIUS_AU * np.hypot(x, z)
+
+
+def _phase_angles(geocentric: np.ndarray) -> np.ndarray:
+    """Sun-body-Earth angle in degrees for every body (0 for the Sun itself)."""
+    heliocentric = geocentric - geocentric[0]
+    r = np.linalg.norm(heliocentric, axis=1)
+    delta = np.linalg.norm(geocentric, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cos_phase = np.sum(heliocentric * geocentric, axis=1) / (r * delta)
+    return np.degrees(np.arccos(np.clip(np.nan_to_num(cos_phase, nan=1.0), -1.0, 1.0)))
+
+
+def _magnitudes(geocentric: np.ndarray, phase: np.ndarray) -> np.ndarray:
+    r = np.linalg.norm(geocentric - geocentric[0], axis=1)
+    delta = np.linalg.norm(geocentric, axis=1)
+    magnitude = np.empty(len(BODIES))
+    for i, body in enumerate(BODIES):
+        if body == "sun":
+            magnitude[i] = -26.74
+        elif body == "moon":
+            magnitude[i] = -12.73 + 0.026 * phase[i] + 4e-9 * phase[i] ** 4
+        else:
+            h, (a, b, c) = _MAGNITUDE_TERMS[body]
+            magnitude[i] = h + 5.0 * np.log10(r[i] * delta[i]) + a * phase[i] + b * phase[i] ** 2 + c * phase[i] ** 3
+    return magnitude
+
+
+def body_positions(obstime: Time, lat_deg: float, lon_deg: float) -> Dict[str, np.ndarray]:
+    """
+    Topocentric positions of all BODIES for a site.
+
+    Returns:
+        dict of arrays indexed like BODIES: ra, dec (degrees), alt, az
+        (degrees), distance (AU), magnitude and illumination (0-1)
+    """
+    geocentric = geocentric_positions(obstime)
+    # Topocentric shift (only the Moon's ~1 degree parallax really matters), on the WGS84 ellipsoid
+    geocentric_lat, radius = _observer_offset(lat_deg)
+    observer = radius * zenith_unit_vector(obstime, geocentric_lat, lon_deg)
+    topocentric = geocentric - observer
+    distance = np.linalg.norm(topocentric, axis=1)
+    xyz = topocentric / distance[:, None]
+    alt, az = unit_vectors_to_altaz(xyz, obstime, lat_deg, lon_deg)
+    phase = _phase_angles(geocentric)
+    return {
+        "ra": np.degrees(np.arctan2(xyz[:, 1], xyz[:, 0])) % 360.0,
+        "dec": np.degrees(np.arcsin(np.clip(xyz[:, 2], -1.0, 1.0))),
+        "alt": alt,
+        "az": az,
+        "distance": distance,
+        "magnitude": _magnitudes(geocentric, phase),
+        "illumination": (1.0 + np.cos(np.radians(phase))) / 2.0,
+    }
+
+
+def bodies_table(obstime: Time, lat_deg: float, lon_deg: float,
+                 bodies: Sequence[str] = OBSERVABLE_BODIES) -> ObjectTable:
+    """Selected bodies as an ObjectTable, for merging into visible-object and search results."""
+    positions = body_positions(obstime, lat_deg, lon_deg)
+    rows = [BODIES.index(body) for body in bodies]
+    return ObjectTable([body.capitalize() for body in bodies],
+                       [BODY_TYPES.get(body, "Planet") for body in bodies],
+                       positions["ra"][rows], positions["dec"][rows],
+                       positions["alt"][rows], positions["az"][rows], positions["magnitude"][rows])
+
+
+def body_night_curves(bodies: Sequence[str], times: np.ndarray, lat_deg: float, lon_deg: float,
+                      horizon_deg: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Altitude curves and rise/transit/set of bodies on a time grid, from the daily Chebyshev tables.
+
+    Bodies move against the stars during a night, so their events are read
+    off the sampled curves: transit at the highest sample, rise and set at the
+    first upward and downward horizon crossings, linearly interpolated (NaN
+    when there is none).
+
+    Returns:
+        dict of arrays indexed like bodies: altitude (len(bodies), T),
+        rise, transit, set (unix times) and max_alt
+    """
+    rows = [BODIES.index(body) for body in bodies]
+    times = np.asarray(times, dtype=float)
+    if len(times):
+        obstimes = Time(times, format="unix")
+        geocentric_lat, radius = _observer_offset(lat_deg)
+        observer = radius * zenith_unit_vectors(obstimes, geocentric_lat, lon_deg)
+        topocentric = geocentric_series(times)[:, rows] - observer[:, None, :]
+        xyz = topocentric / np.linalg.norm(topocentric, axis=2)[..., None]
+        altitude = unit_vectors_to_altaz_series(xyz, obstimes, lat_deg, lon_deg)[0].T
+    else:
+        altitude = np.empty((len(rows), 0))
+    rise, setting = np.full(len(rows), np.nan), np.full(len(rows), np.nan)
+    above = altitude >= horizon_deg
+    for i in range(len(rows)):
+        for events, steps in ((rise, ~above[i, :-1] & above[i, 1:]), (setting, above[i, :-1] & ~above[i, 1:])):
+            crossings = np.nonzero(steps)[0]
+            if len(crossings):
+                j = crossings[0]
+                fraction = (horizon_deg - altitude[i, j]) / (altitude[i, j + 1] - altitude[i, j])
+                events[i] = times[j] + fraction * (times[j + 1] - times[j])
+    highest = np.argmax(altitude, axis=1) if len(times) else np.zeros(len(rows), dtype=int)
+    return {
+        "altitude": altitude,
+        "rise": rise,
+        "transit": times[highest] if len(times) else np.full(len(rows), np.nan),
+        "set": setting,
+        "max_alt": altitude.max(axis=1) if len(times) else np.full(len(rows), np.nan),
+    }
+
+
+def visible_bodies(obstime: Time, lat_deg: float, lon_deg: float,
+                   min_alt_deg: float, magnitude: float) -> ObjectTable:
+    """Observable bodies above min_alt_deg and at least as bright as magnitude."""
+    table = bodies_table(obstime, lat_deg, lon_deg)
+    return table.take((table.alt >= min_alt_deg) & (table.magnitude <= magnitude))
+
+
+def match_bodies(query: str) -> List[str]:
+    """Observable bodies whose name starts with the query ("mar" -> ["mars"])."""
+    key = query.strip().casefold()
+    if not key:
+        return []
+    return [body for body in OBSERVABLE_BODIES if body.startswith(key)]
@@ -0,0 +1,209 @@
+"""
+Time-bucketed cache for visible-object queries.
+Results are keyed on (time bucket, min_alt_deg, magnitude), evicted LRU,
+and served stale-while-revalidate. Filters are snapped outwards to a
+coarse grid so nearby values share entries. A background task computes
+the next bucket for the most recently requested filters before the
+current one expires.
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from astropy.time import Time
+
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+VISIBLE_CACHE_BUCKET_SECONDS = float(os.getenv("VISIBLE_CACHE_BUCKET_SECONDS", "60"))
+VISIBLE_CACHE_MAX_ENTRIES = int(os.getenv("VISIBLE_CACHE_MAX_ENTRIES", "128"))
+VISIBLE_CACHE_PREFETCH_SECONDS = float(os.getenv("VISIBLE_CACHE_PREFETCH_SECONDS", "15"))
+# Filters not requested for this many buckets stop being prefetched
+VISIBLE_CACHE_IDLE_BUCKETS = int(os.getenv("VISIBLE_CACHE_IDLE_BUCKETS", "10"))
+# Older results than this are recomputed instead of being served stale
+VISIBLE_CACHE_MAX_STALE_BUCKETS = int(os.getenv("VISIBLE_CACHE_MAX_STALE_BUCKETS", "5"))
+# At most this many filter sets are prefetched (the most recently requested ones)
+VISIBLE_CACHE_MAX_PREFETCH = int(os.getenv("VISIBLE_CACHE_MAX_PREFETCH", "8"))
+# Grid (degrees, magnitudes) that requested filters are widened to before caching
+VISIBLE_CACHE_ALT_STEP = 0.5
+VISIBLE_CACHE_MAG_STEP = 0.1
+
+Filters = Tuple[float, float]
+
+
+def quantize_filters(min_alt_deg: float, magnitude: float) -> Filters:
+    """Widen filters to the cache grid: altitude down and magnitude up, so the cached set contains the request."""
+    alt = math.floor(min_alt_deg / VISIBLE_CACHE_ALT_STEP + 1e-9) * VISIBLE_CACHE_ALT_STEP
+    mag = math.ceil(magnitude / VISIBLE_CACHE_MAG_STEP - 1e-9) * VISIBLE_CACHE_MAG_STEP
+    return round(alt, 6), round(mag, 6)
+
+
+class VisibleObjectsCache:
+    """
+    LRU, stale-while-revalidate cache of visible-object results per time bucket.
+
+    Results are computed for the quantized filters; narrow(result, min_alt_deg,
+    magnitude) cuts a cached result down to the filters actually requested.
+    """
+
+    def __init__(self, compute: Callable[[float, float, Time], Any],
+                 bucket_seconds: float = VISIBLE_CACHE_BUCKET_SECONDS,
+                 max_entries: int = VISIBLE_CACHE_MAX_ENTRIES,
+                 flight: Optional[SingleFlight] = None, name: str = "",
+                 narrow: Optional[Callable[[Any, float, float], Any]] = None,
+                 max_prefetch: int = VISIBLE_CACHE_MAX_PREFETCH):
+        self._compute = compute
+        self._narrow = narrow
+        self.max_prefetch = max_prefetch
+        # Distinguishes this cache's computations from other caches sharing the same flight
+        self.name = name
+        self.bucket_seconds = bucket_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, float, float], Any]" = OrderedDict()
+        self._latest_bucket: Dict[Filters, int] = {}
+        # Most recently requested filters last, capped at max_prefetch
+        self._last_used: "OrderedDict[Filters, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Cold misses and refreshes for the same bucket share one computation
+        self._flight = flight or SingleFlight(ThreadPoolExecutor(max_workers=2, thread_name_prefix="visible-cache"))
+
+    def current_bucket(self, now: Optional[float] = None) -> int:
+        return int((time.time() if now is None else now) // self.bucket_seconds)
+
+    def bucket_time(self, bucket: int) -> Time:
+        """Observation time used for a bucket: its midpoint."""
+        return Time((bucket + 0.5) * self.bucket_seconds, format="unix")
+
+    async def aget(self, min_alt_deg: float, magnitude: float) -> Any:
+        """
+        Return visible objects for the current bucket without blocking the event loop.
+
+        Fresh hits are returned directly. If only an older bucket is cached,
+        it is returned immediately and a refresh is scheduled. Only a cold
+        miss waits, and concurrent cold misses share one computation.
+        """
+        bucket, filters, result = self._lookup(min_alt_deg, magnitude)
+        if result is None:
+            result = await asyncio.shield(asyncio.wrap_future(self._schedule(bucket, filters)))
+        if self._narrow is not None and filters != (min_alt_deg, magnitude):
+            result = self._narrow(result, min_alt_deg, magnitude)
+        return result
+
+    def _use(self, filters: Filters, bucket: int) -> None:
+        """Record a request for filters (call with the lock held), forgetting the least recent beyond max_prefetch."""
+        self._last_used[filters] = bucket
+        self._last_used.move_to_end(filters)
+        while len(self._last_used) > self.max_prefetch:
+            self._last_used.popitem(last=False)
+
+    def _lookup(self, min_alt_deg: float, magnitude: float):
+        """Return (bucket, quantized filters, fresh-or-stale result or None), scheduling a refresh for stale hits."""
+        filters = quantize_filters(min_alt_deg, magnitude)
+        bucket = self.current_bucket()
+        with self._lock:
+            self._use(filters, bucket)
+            key = (bucket,) + filters
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return bucket, filters, self._entries[key]
+            stale_bucket = self._latest_bucket.get(filters)
+            stale = None
+            if stale_bucket is not None and abs(bucket - stale_bucket) <= VISIBLE_CACHE_MAX_STALE_BUCKETS:
+                stale = self._entries.get((stale_bucket,) + filters)
+
+        if stale is not None:
+            self._schedule(bucket, filters).add_done_callback(self._log_failure)
+        return bucket, filters, stale
+
+    def _schedule(self, bucket: int, filters: Filters):
+        return self._flight.submit(("visible", self.name, bucket) + filters, self._refresh, bucket, filters)
+
+    @staticmethod
+    def _log_failure(future) -> None:
+        if future.exception() is not None:
+            logger.error(f"Visible cache refresh failed: {future.exception()}")
+
+    def _refresh_logged(self, bucket: int, filters: Filters) -> None:
+        try:
+            self._schedule(bucket, filters).result()
+        except Exception as e:
+            logger.error(f"Visible cache refresh failed for {filters} @ bucket {bucket}: {e}")
+
+    def _refresh(self, bucket: int, filters: Filters) -> Any:
+        result = self._compute(filters[0], filters[1], self.bucket_time(bucket))
+        self.put(bucket, filters, result)
+        return result
+
+    def put(self, bucket: int, filters: Filters, result: Any) -> None:
+        with self._lock:
+            key = (bucket,) + filters
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            if bucket >= self._latest_bucket.get(filters, bucket):
+                self._latest_bucket[filters] = bucket
+            while len(self._entries) > self.max_entries:
+                old_bucket, *old_filters = self._entries.popitem(last=False)[0]
+                old_filters = tuple(old_filters)
+                if self._latest_bucket.get(old_filters) == old_bucket:
+                    del self._latest_bucket[old_filters]
+
+    def touch(self, filters: Filters) -> None:
+        """Mark a filter set as in use so the background task prefetches it."""
+        with self._lock:
+            self._use(quantize_filters(*filters), self.current_bucket())
+
+    def active_filters(self, bucket: int) -> List[Filters]:
+        """Filters requested within the last VISIBLE_CACHE_IDLE_BUCKETS buckets (at most max_prefetch)."""
+        with self._lock:
+            for filters, last in list(self._last_used.items()):
+                if bucket - last > VISIBLE_CACHE_IDLE_BUCKETS:
+                    del self._last_used[filters]
+            return list(self._last_used)
+
+    def prefetch(self, bucket: int) -> None:
+        """Compute a bucket for every active filter set that isn't cached yet."""
+        for filters in self.active_filters(bucket - 1):
+            with self._lock:
+                cached = (bucket,) + filters in self._entries
+            if not cached:
+                self._refresh_logged(bucket, filters)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._latest_bucket.clear()
+
+
+async def visible_cache_refresh_loop(cache: VisibleObjectsCache,
+                                     warm_filters: Optional[List[Filters]] = None) -> None:
+    """
+    Keep the cache one bucket ahead of the clock.
+
+    Shortly before each bucket boundary, the next bucket is computed for
+    every recently requested filter set so requests never see a cold miss.
+    """
+    loop = asyncio.get_running_loop()
+    for filters in warm_filters or []:
+        cache.touch(filters)
+    if warm_filters:
+        await loop.run_in_executor(None, cache.prefetch, cache.current_bucket())
+
+    while True:
+        now = time.time()
+        next_bucket = cache.current_bucket(now) + 1
+        wake_at = next_bucket * cache.bucket_seconds - VISIBLE_CACHE_PREFETCH_SECONDS
+        await asyncio.sleep(max(wake_at - now, 0))
+        try:
+            await loop.run_in_executor(None, cache.prefetch, next_bucket)
+        except Exception as e:
+            logger.error(f"Visible cache prefetch failed: {e}")
+        # Don't prefetch the same bucket twice if the work finished early
+        await asyncio.sleep(max(next_bucket * cache.bucket_seconds - time.time(), 0))
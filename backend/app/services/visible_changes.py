@@ -0,0 +1,232 @@
+"""
+Versioned visible set with incremental change feeds.
+For a fixed site and filter, every catalog object above the horizon limit
+rises and sets at fixed local sidereal times. Those crossing times are
+precomputed once and sorted, so "what changed since version N" is a
+binary search over the crossings between then and now rather than a
+full recompute of the visible list. The Moon and planets move against
+the stars, so their visibility is re-evaluated on every call from the
+Chebyshev tables and recorded with each version.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import numpy as np
+from astropy.time import Time
+
+from app.services.altaz import apparent_unit_vectors, local_sidereal_angle, unit_vectors_to_altaz
+from app.services.catalog import SkyCatalog, get_catalog
+from app.services.object_table import ObjectTable
+from app.services.solar_system import bodies_table
+
+logger = logging.getLogger(__name__)
+
+# Crossing times drift slowly (precession, aberration); rebuild them this often
+VISIBLE_CHANGES_REBUILD_HOURS = float(os.getenv("VISIBLE_CHANGES_REBUILD_HOURS", "12"))
+# Versions older than this many steps can't be diffed and get a full reset
+VISIBLE_CHANGES_HISTORY = int(os.getenv("VISIBLE_CHANGES_HISTORY", "1024"))
+VISIBLE_CHANGES_MAX_FILTERS = 16
+
+TWO_PI = 2.0 * np.pi
+# Sidereal rotation rate in radians per SI second
+SIDEREAL_RATE = TWO_PI * 1.00273781191135448 / 86400.0
+
+Filters = Tuple[float, float]
+
+
+def _wrap_pi(angle):
+    """Wrap angles to (-pi, pi]."""
+    return np.pi - (np.pi - angle) % TWO_PI
+
+
+class _Crossings:
+    """Rise/set sidereal angles for every object that can be visible under one filter."""
+
+    def __init__(self, catalog: SkyCatalog, min_alt_deg: float, magnitude: float,
+                 lat_deg: float, observation: Time):
+        has_mag = np.isfinite(catalog.magnitude)
+        rows = np.nonzero((~has_mag) | (catalog.magnitude <= magnitude))[0]
+
+        apparent = apparent_unit_vectors(catalog.xyz[rows], observation)
+        alpha = np.arctan2(apparent[:, 1], apparent[:, 0])
+        delta = np.arcsin(np.clip(apparent[:, 2], -1.0, 1.0))
+        phi = np.radians(lat_deg)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cos_h0 = ((np.sin(np.radians(min_alt_deg)) - np.sin(phi) * np.sin(delta))
+                      / (np.cos(phi) * np.cos(delta)))
+        cos_h0 = np.nan_to_num(cos_h0, nan=-1.0)
+        # Objects that never reach min_alt_deg can't change; cos_h0 <= -1 is circumpolar (half arc pi)
+        reachable = cos_h0 < 1.0
+        self.rows = rows[reachable]
+        self.alpha = alpha[reachable]
+        self.half_arc = np.arccos(np.clip(cos_h0[reachable], -1.0, 1.0))
+
+        # Circumpolar objects never cross, so only the others contribute rise/set events
+        crossing = np.nonzero(self.half_arc < np.pi)[0]
+        angles = np.concatenate([self.alpha[crossing] - self.half_arc[crossing],
+                                 self.alpha[crossing] + self.half_arc[crossing]]) % TWO_PI
+        members = np.concatenate([crossing, crossing])
+        order = np.argsort(angles, kind="stable")
+        self.event_angle = angles[order]
+        self.event_member = members[order]
+
+    def visible(self, angle: float, members: Optional[np.ndarray] = None) -> np.ndarray:
+        """Boolean mask (over members, default all) of objects above the limit at sidereal angle."""
+        if members is None:
+            return np.abs(_wrap_pi(angle - self.alpha)) <= self.half_arc
+        return np.abs(_wrap_pi(angle - self.alpha[members])) <= self.half_arc[members]
+
+    def crossed_between(self, start: float, stop: float) -> np.ndarray:
+        """Members with a rise or set in the sidereal interval (start, stop], stop - start < 2pi."""
+        lo = start % TWO_PI
+        hi = lo + (stop - start)
+        if hi < TWO_PI:
+            picked = self.event_member[np.searchsorted(self.event_angle, lo, side="right"):
+                                       np.searchsorted(self.event_angle, hi, side="right")]
+        else:
+            picked = np.concatenate([
+                self.event_member[np.searchsorted(self.event_angle, lo, side="right"):],
+                self.event_member[:np.searchsorted(self.event_angle, hi - TWO_PI, side="right")]])
+        return np.unique(picked)
+
+
+class _FilterState:
+    def __init__(self, crossings: _Crossings, catalog: SkyCatalog, built_at: float, version: int, angle: float,
+                 bodies: FrozenSet[str]):
+        self.crossings = crossings
+        self.catalog = catalog
+        self.built_at = built_at
+        # Versions before this one belong to an older build and can only be answered with a reset
+        self.base_version = version
+        self.version = version
+        self.angle = angle
+        self.bodies = bodies
+        # (version, sidereal angle, names of the visible bodies)
+        self.history = deque([(version, angle, bodies)], maxlen=VISIBLE_CHANGES_HISTORY)
+
+
+class VisibleSetTracker:
+    """
+    Per-filter versioned visible sets for one site.
+
+    The version advances whenever an object rises or sets between two
+    calls. changes() answers from the sorted crossing list: only objects
+    with a crossing between the requested version and now are examined.
+    Versions that are unknown, too old, or predate a rebuild (catalog
+    refresh, periodic re-derivation of crossing times) get a full reset.
+    """
+
+    def __init__(self, lat_deg: float, lon_deg: float):
+        self.lat_deg = lat_deg
+        self.lon_deg = lon_deg
+        self._states: "OrderedDict[Filters, _FilterState]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Versions are global across filters so a stale version from another filter can't alias
+        self._next_version = 1
+        self._ref_time: Optional[float] = None
+        self._ref_angle = 0.0
+
+    def _unwrapped_angle(self, now: float, observation: Time) -> float:
+        """Local sidereal angle that keeps increasing past 2pi, so intervals between versions are unambiguous."""
+        angle = local_sidereal_angle(observation, self.lon_deg)
+        if self._ref_time is None:
+            self._ref_time, self._ref_angle = now, angle
+            return angle
+        expected = self._ref_angle + SIDEREAL_RATE * (now - self._ref_time)
+        return expected + _wrap_pi(angle - expected)
+
+    def _state(self, filters: Filters, catalog: SkyCatalog, now: float, observation: Time, angle: float,
+               bodies: FrozenSet[str]) -> _FilterState:
+        state = self._states.get(filters)
+        stale = (state is None or state.catalog is not catalog
+                 or now - state.built_at > VISIBLE_CHANGES_REBUILD_HOURS * 3600)
+        if stale:
+            crossings = _Crossings(catalog, filters[0], filters[1], self.lat_deg, observation)
+            state = _FilterState(crossings, catalog, now, self._next_version, angle, bodies)
+            self._next_version += 1
+            self._states[filters] = state
+            logger.info(f"Built crossing times for {filters}: {len(crossings.rows)} objects, "
+                        f"{len(crossings.event_angle)} events")
+        self._states.move_to_end(filters)
+        while len(self._states) > VISIBLE_CHANGES_MAX_FILTERS:
+            self._states.popitem(last=False)
+        return state
+
+    def _advance(self, state: _FilterState, angle: float, bodies: FrozenSet[str]) -> None:
+        """Mint a new version if anything (catalog object or body) rose or set since the last one."""
+        moved = angle > state.angle and (angle - state.angle >= TWO_PI
+                                         or len(state.crossings.crossed_between(state.angle, angle)))
+        state.angle = max(state.angle, angle)
+        if moved or bodies != state.bodies:
+            state.bodies = bodies
+            state.version = self._next_version
+            self._next_version += 1
+            state.history.append((state.version, state.angle, bodies))
+
+    def _bodies(self, observation: Time, min_alt_deg: float, magnitude: float) -> Tuple[ObjectTable, np.ndarray]:
+        """All observable bodies and a mask of those passing the filters; empty if the ephemeris fails."""
+        try:
+            table = bodies_table(observation, self.lat_deg, self.lon_deg)
+        except Exception as e:
+            logger.error(f"Solar-system positions unavailable: {e}")
+            return ObjectTable.empty(), np.zeros(0, dtype=bool)
+        return table, (table.alt >= min_alt_deg) & (table.magnitude <= magnitude)
+
+    def _table(self, state: _FilterState, members: np.ndarray, observation: Time) -> ObjectTable:
+        catalog = state.catalog
+        rows = state.crossings.rows[members]
+        alt_deg, az_deg = unit_vectors_to_altaz(catalog.xyz[rows], observation, self.lat_deg, self.lon_deg)
+        return ObjectTable(catalog.name[rows], catalog.otype[rows], catalog.ra[rows], catalog.dec[rows],
+                           alt_deg, az_deg, catalog.magnitude[rows])
+
+    def changes(self, min_alt_deg: float, magnitude: float, since: Optional[int] = None) -> Optional[Dict]:
+        """
+        Objects that rose or set since a version.
+
+        Args:
+            min_alt_deg: Minimum altitude in degrees
+            magnitude: Maximum visual magnitude
+            since: Version from an earlier response (None or 0 for a full snapshot)
+
+        Returns:
+            dict with version, reset, and ObjectTables "visible" (on reset),
+            "rose" and "set"; None without an offline catalog
+        """
+        catalog = get_catalog()
+        if catalog is None:
+            return None
+
+        now = time.time()
+        observation = Time(now, format="unix")
+        bodies, bodies_up = self._bodies(observation, min_alt_deg, magnitude)
+        visible_bodies = frozenset(bodies.name[bodies_up].tolist())
+        with self._lock:
+            angle = self._unwrapped_angle(now, observation)
+            state = self._state((min_alt_deg, magnitude), catalog, now, observation, angle, visible_bodies)
+            self._advance(state, angle, visible_bodies)
+            since_angle = since_bodies = None
+            if since is not None and since >= state.base_version:
+                since_angle, since_bodies = next(((a, b) for v, a, b in state.history if v == since), (None, None))
+            version = state.version
+
+        crossings = state.crossings
+        if since_angle is None or angle - since_angle >= TWO_PI:
+            members = np.nonzero(crossings.visible(angle))[0]
+            return {"version": version, "reset": True,
+                    "visible": ObjectTable.concat([bodies.take(bodies_up), self._table(state, members, observation)]),
+                    "rose": ObjectTable.empty(), "set": ObjectTable.empty()}
+
+        members = crossings.crossed_between(since_angle, angle)
+        before = crossings.visible(since_angle, members)
+        after = crossings.visible(angle, members)
+        was_up = np.isin(bodies.name, list(since_bodies))
+        return {"version": version, "reset": False, "visible": None,
+                "rose": ObjectTable.concat([bodies.take(bodies_up & ~was_up),
+                                            self._table(state, members[after & ~before], observation)]),
+                "set": ObjectTable.concat([bodies.take(was_up & ~bodies_up),
+                                           self._table(state, members[before & ~after], observation)])}
@@ -0,0 +1,130 @@
+"""
+Push stream of weather changes for dashboards.
+The poller hands every new status to the broadcaster, which diffs it
+against the previous one once and fans the resulting server-sent events
+out to all subscribers: a full snapshot on connect, then only changed
+fields ("delta") and GREEN/YELLOW/RED level changes ("transition"). When
+the data goes stale or the station stops answering (and again when it
+recovers) a "stale" event is sent. Idle connections only see a keep-alive
+comment.
+"""
+
+import os
+import json
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from app.services.weather_poller import weather_poller
+
+logger = logging.getLogger(__name__)
+
+WEATHER_STREAM_KEEPALIVE_SECONDS = float(os.getenv("WEATHER_STREAM_KEEPALIVE_SECONDS", "15"))
+# Events buffered per subscriber; a subscriber that falls further behind is resynced with a snapshot
+WEATHER_STREAM_QUEUE_SIZE = 32
+# Reconnect delay suggested to EventSource clients
+WEATHER_STREAM_RETRY_MS = 3000
+
+# Fields compared between statuses for deltas, and the level fields that also produce transitions
+DELTA_FIELDS = ("temperature", "humidity", "pressure", "dew_point", "dew_difference", "observed_at",
+                "status", "humidity_status", "dew_status", "safe_to_observe", "alerts", "source", "dew_trend")
+LEVEL_FIELDS = ("status", "humidity_status", "dew_status")
+
+_RESYNC = object()
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """One server-sent event."""
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines += [f"event: {event}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    return "\n".join(lines) + "\n\n"
+
+
+class WeatherAlertBroadcaster:
+    """Diffs successive weather statuses and fans the events out to subscriber queues."""
+
+    def __init__(self, snapshot: Callable[[], Dict[str, Any]],
+                 keepalive_seconds: float = WEATHER_STREAM_KEEPALIVE_SECONDS):
+        self._snapshot = snapshot
+        self.keepalive_seconds = keepalive_seconds
+        self.version = 0
+        self._last: Optional[Dict[str, Any]] = None
+        # (stale, poll_error) as of the last poll attempt
+        self._health: Optional[tuple] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def diff(self, status: Dict[str, Any]) -> List[tuple]:
+        """(event, data) pairs for the change from the previous status to this one."""
+        previous = self._last or {}
+        changes = {field: status.get(field) for field in DELTA_FIELDS if status.get(field) != previous.get(field)}
+        if not changes:
+            return []
+        events = []
+        for field in LEVEL_FIELDS:
+            if field in changes and previous:
+                events.append(("transition", {"field": field, "from": previous.get(field), "to": status.get(field)}))
+        events.append(("delta", {"changes": changes}))
+        return events
+
+    def publish(self, status: Dict[str, Any], fetched_at: float) -> None:
+        """Poller listener: compute the events once and queue the same text for every subscriber."""
+        events = self.diff(status)
+        self._last = status
+        self._broadcast([(event, {"fetched_at": fetched_at, **data}) for event, data in events])
+
+    def observe_health(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Poller attempt listener: send a "stale" event when the snapshot's stale
+        flag or poll error changes, including when polls fail and publish() never runs.
+        """
+        health = (snapshot["stale"], snapshot.get("poll_error"))
+        previous, self._health = self._health, health
+        if health == previous or (previous is None and health == (False, None)):
+            return
+        self._broadcast([("stale", {
+            "stale": snapshot["stale"],
+            "poll_error": snapshot.get("poll_error"),
+            "snapshot_age_seconds": snapshot.get("snapshot_age_seconds"),
+            "reading_age_seconds": snapshot.get("reading_age_seconds"),
+            "status": snapshot.get("status"),
+        })])
+
+    def _broadcast(self, events: List[tuple]) -> None:
+        for event, data in events:
+            self.version += 1
+            text = format_event(event, {"version": self.version, **data}, self.version)
+            for queue in list(self._subscribers):
+                try:
+                    queue.put_nowait(text)
+                except asyncio.QueueFull:
+                    # Too far behind: drop its backlog and send a fresh snapshot instead
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(_RESYNC)
+
+    def _snapshot_event(self) -> str:
+        return format_event("snapshot", {"version": self.version, **self._snapshot()}, self.version)
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """Server-sent events for one client: a snapshot, then deltas, transitions and keep-alives."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=WEATHER_STREAM_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        try:
+            yield f"retry: {WEATHER_STREAM_RETRY_MS}\n\n"
+            yield self._snapshot_event()
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield self._snapshot_event() if item is _RESYNC else item
+        finally:
+            self._subscribers.discard(queue)
+
+
+weather_alerts = WeatherAlertBroadcaster(weather_poller.snapshot)
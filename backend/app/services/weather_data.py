@@ -1,13 +1,19 @@
-import requests
+"""
+Weather station readings and telescope safety status.
+Readings come from the configured providers (see weather_providers): the
+ThingSpeak channel feed in one pooled request, and/or a local sensor file,
+hedged so a slow upstream doesn't stall the weather path.
+"""
+
 import json
-from typing import Dict, List, Any
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 
-# ThingSpeak Channel Info
-TEMP_URL = "https://api.thingspeak.com/channels/270748/fields/1.json?results=1"
-HUMID_URL = "https://api.thingspeak.com/channels/270748/fields/2.json?results=1"
-PRESSURE_URL = "https://api.thingspeak.com/channels/270748/fields/3.json?results=1"
-DEW_URL  = "https://api.thingspeak.com/channels/270748/fields/4.json?results=1"
+from app.services.weather_providers import weather_source
+
+logger = logging.getLogger(__name__)
 
 # Warning thresholds
 HUMIDITY_RED_THRESHOLD = 85  # High risk to equipment
@@ -15,20 +21,22 @@ HUMIDITY_YELLOW_THRESHOLD = 70  # Monitor closely
 DEW_POINT_SAFE_DIFF = 10  # Safe to observe
 DEW_POINT_WARNING_DIFF = 5  # Close to dew point
 
-def fetch_latest_value(url):
-    """Fetch the latest field value from ThingSpeak."""
-    try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        feeds = data.get("feeds", [])
-        if not feeds:
-            return None
-        value = feeds[-1].get(list(feeds[-1].keys())[-1])  # get last field value
-        return float(value) if value is not None else None
-    except Exception as e:
-        print(f"Error fetching data from {url}: {e}")
-        return None
+async def fetch_latest_readings() -> Optional[Dict[str, Any]]:
+    """
+    Fetch the latest reading from the first provider to answer.
+
+    Returns:
+        dict with temperature, humidity, pressure, dew_point (None when a
+        field is empty), observed_at (the reading's ISO time) and source
+        (the provider's name), or None if every provider failed
+    """
+    return await weather_source.fetch()
+
+
+async def close_session() -> None:
+    """Close the providers' HTTP sessions (called on application shutdown)."""
+    await weather_source.close()
+
 
 def get_humidity_status(humidity: float) -> Dict[str, Any]:
     """
@@ -108,20 +116,15 @@ def get_overall_status(humidity_status: Dict, dew_status: Dict) -> str:
     else:
         return "GREEN"
 
-def get_weather_status() -> Dict[str, Any]:
+def evaluate_weather(temp: Optional[float], humidity: Optional[float], pressure: Optional[float],
+                     dew: Optional[float], observed_at: Optional[str] = None) -> Dict[str, Any]:
     """
-    Fetch weather data and return comprehensive telescope safety status.
+    Build the telescope safety status for one set of readings.
 
     Returns:
         dict: Contains all weather readings, individual check results,
               overall status, and any active alerts
     """
-    # Fetch all weather data
-    temp = fetch_latest_value(TEMP_URL)
-    humidity = fetch_latest_value(HUMID_URL)
-    pressure = fetch_latest_value(PRESSURE_URL)
-    dew = fetch_latest_value(DEW_URL)
-
     # Check for missing critical data
     if temp is None or dew is None or humidity is None:
         return {
@@ -130,6 +133,7 @@ def get_weather_status() -> Dict[str, Any]:
             "humidity": humidity,
             "pressure": pressure,
             "dew_point": dew,
+            "observed_at": observed_at,
             "status": "UNKNOWN",
             "alerts": [{
                 "severity": "error",
@@ -172,6 +176,7 @@ def get_weather_status() -> Dict[str, Any]:
         "humidity": humidity,
         "pressure": pressure,
         "dew_point": dew,
+        "observed_at": observed_at,
         "dew_difference": temp - dew,
         "status": overall_status,
         "humidity_status": humidity_check["level"],
@@ -180,6 +185,28 @@ def get_weather_status() -> Dict[str, Any]:
         "safe_to_observe": overall_status == "GREEN"
     }
 
+async def get_weather_status() -> Dict[str, Any]:
+    """
+    Fetch weather data and return comprehensive telescope safety status.
+
+    Returns:
+        dict: Contains all weather readings, individual check results,
+              overall status, and any active alerts
+    """
+    readings = await fetch_latest_readings() or {}
+    status = evaluate_weather(readings.get("temperature"), readings.get("humidity"), readings.get("pressure"),
+                              readings.get("dew_point"), readings.get("observed_at"))
+    status["source"] = readings.get("source")
+    return status
+
+
+async def _main() -> Dict[str, Any]:
+    try:
+        return await get_weather_status()
+    finally:
+        await close_session()
+
+
 if __name__ == "__main__":
-    result = get_weather_status()
+    result = asyncio.run(_main())
     print(json.dumps(result, indent=2))
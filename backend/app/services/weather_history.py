@@ -0,0 +1,279 @@
+"""
+Weather time-series store.
+Every new station reading from the poller is appended, on a dedicated writer
+thread so a slow disk never stalls the event loop, to an in-memory ring
+buffer and to SQLite, and folded into min/max/mean rollups at 1 minute,
+10 minute and 1 hour resolution as it arrives. History queries use the
+finest rollup whose bucket count fits WEATHER_HISTORY_MAX_POINTS, so a
+query returns a bounded number of points per metric however long the
+window is.
+"""
+
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.catalog import BACKEND_DIR
+from app.services.weather_poller import reading_time
+
+logger = logging.getLogger(__name__)
+
+WEATHER_HISTORY_PATH = os.getenv("WEATHER_HISTORY_PATH", os.path.join(BACKEND_DIR, "data", "weather_history.sqlite3"))
+# Raw samples kept in memory (a week at one reading per minute)
+WEATHER_RAW_CAPACITY = int(os.getenv("WEATHER_RAW_CAPACITY", "10080"))
+WEATHER_RAW_RETENTION_DAYS = float(os.getenv("WEATHER_RAW_RETENTION_DAYS", "30"))
+WEATHER_HISTORY_MAX_POINTS = int(os.getenv("WEATHER_HISTORY_MAX_POINTS", "720"))
+
+METRICS = ("temperature", "humidity", "pressure", "dew_point", "dew_difference")
+# Rollup name -> (bucket seconds, retention days)
+RESOLUTIONS = {
+    "1m": (60, 14.0),
+    "10m": (600, 180.0),
+    "1h": (3600, 3650.0),
+}
+PRUNE_INTERVAL_SECONDS = 3600.0
+
+
+def _iso_list(times: np.ndarray) -> List[str]:
+    """ISO UTC strings (millisecond precision) for unix times."""
+    milliseconds = np.round(np.asarray(times, dtype=float) * 1000.0).astype(np.int64).astype("datetime64[ms]")
+    return np.datetime_as_string(milliseconds, timezone="UTC").tolist()
+
+
+def _nullable(values: np.ndarray) -> list:
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+def _log_write_error(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Weather history write failed: {future.exception()}")
+
+
+class RingBuffer:
+    """Fixed-capacity, append-only buffer of (time, metric values) in NumPy arrays."""
+
+    def __init__(self, capacity: int, width: int):
+        self.times = np.full(capacity, np.nan)
+        self.values = np.full((capacity, width), np.nan)
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+
+    def append(self, t: float, values: Sequence[float]) -> None:
+        self.times[self.head] = t
+        self.values[self.head] = values
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def ordered(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All samples, oldest first."""
+        start = (self.head - self.count) % self.capacity
+        rows = (start + np.arange(self.count)) % self.capacity
+        return self.times[rows], self.values[rows]
+
+    def oldest(self) -> Optional[float]:
+        return None if not self.count else float(self.times[(self.head - self.count) % self.capacity])
+
+    def range(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        times, values = self.ordered()
+        lo, hi = np.searchsorted(times, start, side="left"), np.searchsorted(times, end, side="right")
+        return times[lo:hi], values[lo:hi]
+
+
+class WeatherHistory:
+    """Ring buffer of raw samples plus SQLite-backed raw samples and rollups."""
+
+    def __init__(self, path: str = WEATHER_HISTORY_PATH, capacity: int = WEATHER_RAW_CAPACITY):
+        self.path = path
+        self.buffer = RingBuffer(capacity, len(METRICS))
+        self.last_sample: Optional[float] = None
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # One thread, so samples are written in the order the poller produced them
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="weather-history")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            columns = ", ".join(f"{metric} REAL" for metric in METRICS)
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS samples (time REAL PRIMARY KEY, {columns})")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rollups (
+                    resolution INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    metric TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    min REAL NOT NULL,
+                    max REAL NOT NULL,
+                    sum REAL NOT NULL,
+                    PRIMARY KEY (resolution, metric, bucket)
+                )
+            """)
+            self._conn.commit()
+            self._load_buffer(self._conn)
+        return self._conn
+
+    def _load_buffer(self, conn: sqlite3.Connection) -> None:
+        """Refill the ring buffer with the most recent stored samples after a restart."""
+        rows = conn.execute(f"SELECT time, {', '.join(METRICS)} FROM samples ORDER BY time DESC LIMIT ?",
+                            (self.buffer.capacity,)).fetchall()
+        for row in reversed(rows):
+            self.buffer.append(row[0], [np.nan if v is None else v for v in row[1:]])
+        if rows:
+            self.last_sample = rows[0][0]
+
+    def observe(self, status: Dict, fetched_at: float) -> Future:
+        """Poller listener: queue the status for the writer thread and return immediately."""
+        future = self._writer.submit(self.record, status, fetched_at)
+        future.add_done_callback(_log_write_error)
+        return future
+
+    def close(self) -> None:
+        """Finish queued writes (called on application shutdown)."""
+        self._writer.shutdown(wait=True)
+
+    def record(self, status: Dict, fetched_at: float) -> bool:
+        """
+        Store one weather status (blocking; the poller goes through observe).
+
+        Repeated polls of the same station reading are skipped. Returns True
+        if a new sample was stored.
+        """
+        # The station's reading time when it has one, else when it was fetched
+        t = reading_time(status.get("observed_at")) or fetched_at
+        values = [status.get(metric) for metric in METRICS]
+        if all(v is None for v in values):
+            return False
+        try:
+            with self._lock:
+                conn = self._connect()
+                if self.last_sample is not None and t <= self.last_sample:
+                    return False
+                self.last_sample = t
+                self.buffer.append(t, [np.nan if v is None else v for v in values])
+                conn.execute(f"INSERT OR REPLACE INTO samples (time, {', '.join(METRICS)}) "
+                             f"VALUES (?{', ?' * len(METRICS)})", [t] + values)
+                updates = [(seconds, int(t // seconds), metric, value, value, value)
+                           for seconds, _ in RESOLUTIONS.values()
+                           for metric, value in zip(METRICS, values) if value is not None]
+                conn.executemany("""
+                    INSERT INTO rollups (resolution, bucket, metric, count, min, max, sum)
+                    VALUES (?, ?, ?, 1, ?, ?, ?)
+                    ON CONFLICT (resolution, metric, bucket) DO UPDATE SET
+                        count = count + 1, min = MIN(min, excluded.min),
+                        max = MAX(max, excluded.max), sum = sum + excluded.sum
+                """, updates)
+                if t - self._last_prune > PRUNE_INTERVAL_SECONDS:
+                    self._prune(conn, t)
+                conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Weather history write failed: {e}")
+            return False
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM samples WHERE time < ?", (now - WEATHER_RAW_RETENTION_DAYS * 86400,))
+        for seconds, retention_days in RESOLUTIONS.values():
+            conn.execute("DELETE FROM rollups WHERE resolution = ? AND bucket < ?",
+                         (seconds, int((now - retention_days * 86400) // seconds)))
+        self._last_prune = now
+
+    @staticmethod
+    def pick_resolution(start: float, end: float, max_points: int = WEATHER_HISTORY_MAX_POINTS) -> str:
+        """Finest rollup with at most max_points buckets in the window (the coarsest if none fits)."""
+        for name, (seconds, _) in RESOLUTIONS.items():
+            if (end - start) / seconds <= max_points:
+                return name
+        return list(RESOLUTIONS)[-1]
+
+    def raw(self, start: float, end: float, metrics: Sequence[str] = METRICS) -> Dict:
+        """Raw samples in [start, end], from the ring buffer when it reaches back far enough."""
+        columns = [METRICS.index(metric) for metric in metrics]
+        with self._lock:
+            self._connect()
+            oldest = self.buffer.oldest()
+            if oldest is not None and oldest <= start:
+                times, values = self.buffer.range(start, end)
+                values = values[:, columns]
+            else:
+                rows = self._conn.execute(
+                    f"SELECT time, {', '.join(metrics)} FROM samples WHERE time BETWEEN ? AND ? ORDER BY time",
+                    (start, end)).fetchall()
+                data = np.array(rows, dtype=float).reshape(len(rows), len(metrics) + 1)
+                times, values = data[:, 0], data[:, 1:]
+        return {"time": _iso_list(times),
+                **{metric: _nullable(values[:, i]) for i, metric in enumerate(metrics)}}
+
+    def rollup(self, resolution: str, start: float, end: float, metrics: Sequence[str] = METRICS,
+               max_points: int = WEATHER_HISTORY_MAX_POINTS) -> Dict:
+        """
+        min/max/mean per bucket in [start, end] at a rollup resolution.
+
+        Windows with more than max_points buckets even at the coarsest
+        resolution are merged into max_points groups of whole buckets.
+        """
+        seconds = RESOLUTIONS[resolution][0]
+        first, last = int(start // seconds), int(end // seconds)
+        group = max(1, math.ceil((last - first + 1) / max_points))
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute("""
+                SELECT metric, (bucket - ?) / ? AS slot, SUM(count), MIN(min), MAX(max), SUM(sum)
+                FROM rollups
+                WHERE resolution = ? AND bucket BETWEEN ? AND ? AND metric IN (%s)
+                GROUP BY metric, slot ORDER BY slot
+            """ % ", ".join("?" * len(metrics)), [first, group, seconds, first, last, *metrics]).fetchall()
+        slots = sorted({row[1] for row in rows})
+        position = {slot: i for i, slot in enumerate(slots)}
+        series = {metric: {key: np.full(len(slots), np.nan) for key in ("min", "max", "mean")} for metric in metrics}
+        for metric, slot, count, low, high, total in rows:
+            i = position[slot]
+            series[metric]["min"][i], series[metric]["max"][i] = low, high
+            series[metric]["mean"][i] = total / count
+        times = (first + np.array(slots, dtype=float) * group) * seconds
+        return {"time": _iso_list(times),
+                **{metric: {key: _nullable(values) for key, values in stats.items()}
+                   for metric, stats in series.items()}}
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              resolution: str = "auto", metrics: Optional[Sequence[str]] = None) -> Dict:
+        """
+        History for a window (default: the last 24 hours).
+
+        Args:
+            resolution: "auto", "raw" or one of RESOLUTIONS
+            metrics: Subset of METRICS (default all)
+        """
+        end = time.time() if end is None else end
+        start = end - 86400.0 if start is None else start
+        if start >= end:
+            raise ValueError("start must be before end")
+        metrics = list(metrics or METRICS)
+        unknown = [metric for metric in metrics if metric not in METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {unknown} (expected some of {METRICS})")
+        if resolution == "auto":
+            resolution = self.pick_resolution(start, end)
+        if resolution == "raw":
+            data = self.raw(start, end, metrics)
+        elif resolution in RESOLUTIONS:
+            data = self.rollup(resolution, start, end, metrics)
+        else:
+            raise ValueError(f"Unknown resolution: {resolution} (expected auto, raw or one of {tuple(RESOLUTIONS)})")
+        return {"resolution": resolution, "start": _iso_list([start])[0],
+                "end": _iso_list([end])[0], "count": len(data["time"]), "data": data}
+
+
+weather_history = WeatherHistory()
@@ -0,0 +1,128 @@
+"""
+Background weather poller.
+A lifespan task fetches the weather station every WEATHER_POLL_SECONDS and
+keeps the latest evaluated status in memory, so /api/weather and every
+dashboard share one upstream request per interval. When a poll fails the
+previous snapshot keeps being served, flagged stale once it is older than
+WEATHER_STALE_SECONDS.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.dew_trend import dew_trend, forecast_alert
+from app.services.weather_data import evaluate_weather, fetch_latest_readings
+from app.services.weather_providers import WEATHER_POLL_SECONDS, WEATHER_STALE_SECONDS, reading_time
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherPoller:
+    """Latest weather status from periodic polls, plus listeners notified of every new snapshot."""
+
+    def __init__(self, poll_seconds: float = WEATHER_POLL_SECONDS, stale_seconds: float = WEATHER_STALE_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.latest: Optional[Dict[str, Any]] = None
+        self.fetched_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_attempt: Optional[float] = None
+        self._listeners: List[Callable[[Dict[str, Any], float], None]] = []
+        self._attempt_listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def add_listener(self, listener: Callable[[Dict[str, Any], float], None]) -> None:
+        """Call listener(status, fetched_at) after every successful poll."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def add_attempt_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call listener(snapshot) after every poll, failed or not, so staleness and outages are seen too."""
+        if listener not in self._attempt_listeners:
+            self._attempt_listeners.append(listener)
+
+    def _notify_attempt(self) -> None:
+        if not self._attempt_listeners:
+            return
+        snapshot = self.snapshot()
+        for listener in self._attempt_listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Weather listener failed: {e}")
+
+    async def poll_once(self) -> bool:
+        """Fetch and evaluate one reading; returns False (keeping the old snapshot) if the fetch failed."""
+        self.last_attempt = time.time()
+        readings = await fetch_latest_readings()
+        if readings is None:
+            self.last_error = "Weather station unreachable"
+            return False
+        status = evaluate_weather(readings["temperature"], readings["humidity"], readings["pressure"],
+                                  readings["dew_point"], readings["observed_at"])
+        status["source"] = readings.get("source")
+        self.fetched_at = time.time()
+        if status.get("dew_difference") is not None:
+            # Repeated polls of the same reading are ignored by the trend
+            dew_trend.add(reading_time(readings["observed_at"]) or self.fetched_at, status["dew_difference"])
+        status["dew_trend"] = dew_trend.forecast()
+        alert = forecast_alert(status["dew_trend"], status.get("dew_status"))
+        if alert:
+            status["alerts"].append(alert)
+        self.latest = status
+        self.last_error = None
+        for listener in self._listeners:
+            try:
+                listener(status, self.fetched_at)
+            except Exception as e:
+                logger.error(f"Weather listener failed: {e}")
+        return True
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        The latest status with its age and staleness, without any upstream call.
+
+        Adds snapshot_age_seconds (since the last successful poll),
+        reading_age_seconds (since the station took the reading), stale and
+        poll_error. Before the first successful poll the status is UNKNOWN.
+        """
+        now = time.time() if now is None else now
+        if self.latest is None:
+            status = evaluate_weather(None, None, None, None)
+            snapshot_age = reading_age = None
+        else:
+            status = dict(self.latest)
+            snapshot_age = now - self.fetched_at
+            observed = reading_time(status.get("observed_at"))
+            reading_age = None if observed is None else max(now - observed, 0.0)
+        ages = [age for age in (snapshot_age, reading_age) if age is not None]
+        stale = not ages or max(ages) > self.stale_seconds
+        if stale and self.latest is not None:
+            status["alerts"] = status["alerts"] + [{
+                "type": "stale",
+                "severity": "warning",
+                "message": f"Weather data is {max(ages) / 60:.0f} min old.",
+                "recommendation": "Check the weather station before relying on this status."
+            }]
+        status.update({
+            "snapshot_age_seconds": snapshot_age,
+            "reading_age_seconds": reading_age,
+            "stale": stale,
+            "poll_error": self.last_error,
+        })
+        return status
+
+    async def run(self) -> None:
+        """Poll forever on the configured interval (the lifespan task)."""
+        while True:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Weather poll failed: {e}")
+            self._notify_attempt()
+            await asyncio.sleep(self.poll_seconds)
+
+
+weather_poller = WeatherPoller()
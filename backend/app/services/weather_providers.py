@@ -0,0 +1,321 @@
+"""
+Weather reading providers with latency-driven hedging.
+Each provider returns the latest reading as a dict of temperature, humidity,
+pressure, dew_point and observed_at. Providers are tried in the configured
+order (WEATHER_PROVIDERS): if the current one hasn't answered within its own
+p95 latency, or fails, the next one is started too and the first reading
+to arrive wins. A slow ThingSpeak therefore costs at most about its p95
+before the local sensor answers.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import numpy as np
+
+from app.services.catalog import BACKEND_DIR
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated provider names in order of preference
+WEATHER_PROVIDERS = os.getenv("WEATHER_PROVIDERS", "thingspeak,file")
+
+# ThingSpeak Channel Info
+THINGSPEAK_CHANNEL_ID = os.getenv("THINGSPEAK_CHANNEL_ID", "270748")
+THINGSPEAK_READ_API_KEY = os.getenv("THINGSPEAK_READ_API_KEY", "")
+THINGSPEAK_URL = os.getenv("THINGSPEAK_URL", "https://api.thingspeak.com")
+# Channel field holding each reading
+CHANNEL_FIELDS = {
+    "temperature": "field1",
+    "humidity": "field2",
+    "pressure": "field3",
+    "dew_point": "field4",
+}
+
+# JSON file kept up to date by a local sensor daemon, e.g.
+# {"temperature": 12.3, "humidity": 71, "pressure": 1013.2, "observed_at": "2025-09-21T12:00:00Z"}
+WEATHER_FILE_PATH = os.getenv("WEATHER_FILE_PATH", os.path.join(BACKEND_DIR, "data", "weather_sensor.json"))
+
+# Bounds on a single ThingSpeak request; a hung upstream can't hold a request longer than this
+WEATHER_CONNECT_TIMEOUT_SECONDS = float(os.getenv("WEATHER_CONNECT_TIMEOUT_SECONDS", "2"))
+WEATHER_TIMEOUT_SECONDS = float(os.getenv("WEATHER_TIMEOUT_SECONDS", "4"))
+# Hedge delay used until a provider has WEATHER_HEDGE_MIN_SAMPLES latency samples
+WEATHER_HEDGE_DEFAULT_SECONDS = float(os.getenv("WEATHER_HEDGE_DEFAULT_SECONDS", "1.0"))
+WEATHER_HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+READING_FIELDS = ("temperature", "humidity", "pressure", "dew_point")
+
+WEATHER_POLL_SECONDS = float(os.getenv("WEATHER_POLL_SECONDS", "60"))
+# Snapshots (or station readings) older than this are flagged stale
+WEATHER_STALE_SECONDS = float(os.getenv("WEATHER_STALE_SECONDS", str(3 * WEATHER_POLL_SECONDS)))
+
+
+def reading_time(observed_at: Optional[str]) -> Optional[float]:
+    """Unix time of a ThingSpeak created_at string, or None."""
+    if not observed_at:
+        return None
+    try:
+        return datetime.fromisoformat(observed_at.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _parse_value(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def dew_point_from(temperature: float, humidity: float) -> float:
+    """Dew point (Magnus formula) for sensors that only report temperature and relative humidity."""
+    b, c = 17.62, 243.12
+    gamma = np.log(humidity / 100.0) + b * temperature / (c + temperature)
+    return float(c * gamma / (b - gamma))
+
+
+class LatencyTracker:
+    """Recent request latencies of one provider, and how its requests ended."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.wins = 0
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        return float(np.percentile(self._samples, q)) if self._samples else None
+
+    def hedge_delay(self) -> float:
+        """How long to wait for this provider before starting the next one: its p95 latency."""
+        if len(self._samples) < WEATHER_HEDGE_MIN_SAMPLES:
+            return WEATHER_HEDGE_DEFAULT_SECONDS
+        return self.percentile(95)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"samples": len(self._samples), "p50_seconds": self.percentile(50),
+                "p95_seconds": self.percentile(95), "hedge_delay_seconds": self.hedge_delay(),
+                "successes": self.successes, "failures": self.failures, "wins": self.wins}
+
+
+class WeatherProvider(ABC):
+    """A source of the latest weather reading."""
+
+    name = "provider"
+
+    def __init__(self):
+        self.latency = LatencyTracker()
+
+    @abstractmethod
+    async def fetch(self) -> Optional[Dict[str, Any]]:
+        """The latest reading, or None if it is unavailable."""
+
+    async def close(self) -> None:
+        pass
+
+
+class ThingSpeakProvider(WeatherProvider):
+    """Latest entry of a ThingSpeak channel, all fields in one request over a pooled session."""
+
+    name = "thingspeak"
+
+    def __init__(self, channel_id: str = THINGSPEAK_CHANNEL_ID, api_key: str = THINGSPEAK_READ_API_KEY,
+                 base_url: str = THINGSPEAK_URL):
+        super().__init__()
+        self.feed_url = f"{base_url}/channels/{channel_id}/feeds.json"
+        self.api_key = api_key
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Shared session (keep-alive connection pool) for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            if self._session is not None and not self._session.closed:
+                # Left over from another event loop: release its connector before replacing it
+                try:
+                    await self._session.close()
+                except Exception as e:
+                    logger.warning(f"Error closing previous weather session: {e!r}")
+            timeout = aiohttp.ClientTimeout(total=WEATHER_TIMEOUT_SECONDS, connect=WEATHER_CONNECT_TIMEOUT_SECONDS)
+            connector = aiohttp.TCPConnector(limit=4, ttl_dns_cache=300, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(timeout=timeout, connector=connector)
+            self._session_loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch(self) -> Optional[Dict[str, Any]]:
+        params = {"results": "1"}
+        if self.api_key:
+            params["api_key"] = self.api_key
+        try:
+            session = await self._get_session()
+            async with session.get(self.feed_url, params=params) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error(f"Error fetching weather feed from {self.feed_url}: {e!r}")
+            return None
+        feeds = data.get("feeds") or []
+        if not feeds:
+            return None
+        entry = feeds[-1]
+        readings = {name: _parse_value(entry.get(field)) for name, field in CHANNEL_FIELDS.items()}
+        readings["observed_at"] = entry.get("created_at")
+        return readings
+
+
+class FileProvider(WeatherProvider):
+    """Latest reading from a JSON file written by a local sensor; its mtime is the reading time if none is given."""
+
+    name = "file"
+
+    def __init__(self, path: str = WEATHER_FILE_PATH):
+        super().__init__()
+        self.path = path
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            modified = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading weather file {self.path}: {e}")
+            return None
+        readings = {name: _parse_value(data.get(name)) for name in READING_FIELDS}
+        if readings["dew_point"] is None and readings["temperature"] is not None and readings["humidity"]:
+            readings["dew_point"] = dew_point_from(readings["temperature"], readings["humidity"])
+        readings["observed_at"] = data.get("observed_at") or \
+            datetime.fromtimestamp(modified, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return readings
+
+    async def fetch(self) -> Optional[Dict[str, Any]]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._read)
+
+
+PROVIDER_TYPES = {provider.name: provider for provider in (ThingSpeakProvider, FileProvider)}
+
+
+class HedgedWeatherSource:
+    """
+    Runs providers in order, starting the next one when the current one is slower than its p95 or fails.
+
+    A reading older than stale_seconds (e.g. from a sensor file nobody is
+    updating) counts as a failure for the hedge and is only returned when no
+    provider has a fresher one.
+    """
+
+    def __init__(self, providers: List[WeatherProvider], stale_seconds: float = WEATHER_STALE_SECONDS):
+        self.providers = providers
+        self.stale_seconds = stale_seconds
+
+    def _is_stale(self, readings: Dict[str, Any]) -> bool:
+        observed = reading_time(readings.get("observed_at"))
+        return observed is not None and time.time() - observed > self.stale_seconds
+
+    async def _timed(self, provider: WeatherProvider) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            readings = await provider.fetch()
+        except asyncio.CancelledError:
+            # Lost the race: the elapsed time is a lower bound on this request's latency
+            provider.latency.record(time.perf_counter() - started)
+            raise
+        except Exception as e:
+            logger.error(f"Weather provider {provider.name} failed: {e}")
+            readings = None
+        provider.latency.record(time.perf_counter() - started)
+        if readings is None:
+            provider.latency.failures += 1
+        else:
+            provider.latency.successes += 1
+        return readings
+
+    async def fetch(self) -> Optional[Dict[str, Any]]:
+        """
+        The first fresh reading any provider returns, tagged with its "source".
+
+        Falls back to the first stale reading if no provider has a fresh one;
+        returns None only if every provider failed.
+        """
+        pending: Dict[asyncio.Task, WeatherProvider] = {}
+        remaining = list(self.providers)
+        fallback = None
+        try:
+            while remaining or pending:
+                if remaining:
+                    provider = remaining.pop(0)
+                    pending[asyncio.create_task(self._timed(provider))] = provider
+                    # Wait up to this provider's p95 before hedging with the next one
+                    deadline = time.perf_counter() + provider.latency.hedge_delay() if remaining else None
+                else:
+                    deadline = None
+                while pending:
+                    timeout = None if deadline is None else max(deadline - time.perf_counter(), 0.0)
+                    done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        break  # hedge delay passed: start the next provider alongside
+                    for task in done:
+                        winner = pending.pop(task)
+                        readings = task.result()
+                        if readings is None:
+                            continue
+                        if self._is_stale(readings):
+                            logger.warning(f"Weather provider {winner.name} returned a stale reading "
+                                           f"({readings.get('observed_at')}); trying the others first")
+                            fallback = fallback or (winner, readings)
+                            continue
+                        winner.latency.wins += 1
+                        return {**readings, "source": winner.name}
+                    if remaining:
+                        break  # a provider failed or is stale: fail over to the next one now
+            if fallback is None:
+                return None
+            winner, readings = fallback
+            winner.latency.wins += 1
+            return {**readings, "source": winner.name}
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {provider.name: provider.latency.to_dict() for provider in self.providers}
+
+    async def close(self) -> None:
+        for provider in self.providers:
+            await provider.close()
+
+
+def build_source(names: str = WEATHER_PROVIDERS) -> HedgedWeatherSource:
+    providers = []
+    for name in (n.strip() for n in names.split(",")):
+        if not name:
+            continue
+        if name not in PROVIDER_TYPES:
+            logger.error(f"Ignoring unknown weather provider {name!r} (expected one of {tuple(PROVIDER_TYPES)})")
+            continue
+        providers.append(PROVIDER_TYPES[name]())
+    if not providers:
+        providers.append(ThingSpeakProvider())
+    return HedgedWeatherSource(providers)
+
+
+weather_source = build_source()
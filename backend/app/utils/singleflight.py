@@ -0,0 +1,57 @@
+"""
+Request coalescing ("singleflight") on top of a thread pool.
+Concurrent calls with the same key share one execution and its result.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Collapse identical in-flight calls into one.
+
+    The first caller for a key submits the work to the executor; callers
+    arriving while it runs get the same Future. Once it finishes the key is
+    forgotten, so later calls run again. Safe to use from both threads and
+    the event loop, and the executor's worker count bounds concurrency.
+    """
+
+    def __init__(self, executor: Executor):
+        self.executor = executor
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args) -> Future:
+        """Start fn(*args) unless a call with the same key is already running; return its Future."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            self.calls += 1
+            future = self.executor.submit(fn, *args)
+            self._inflight[key] = future
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._inflight
+
+    async def run(self, key: Hashable, fn: Callable[..., Any], *args) -> Any:
+        """Awaitable version of submit(); cancelling the waiter doesn't cancel the shared call."""
+        return await asyncio.shield(asyncio.wrap_future(self.submit(key, fn, *args)))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
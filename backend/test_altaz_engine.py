@@ -0,0 +1,79 @@
+"""
+Check the vectorized alt/az engine against astropy's AltAz frame.
+Run with `python test_altaz_engine.py` or `python -m pytest test_altaz_engine.py`.
+"""
+import sys
+sys.path.insert(0, '.')
+
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import SkyCoord, EarthLocation, AltAz
+from astropy.time import Time
+
+from app.services.altaz import (MODES, TOLERANCE_ARCSEC, radec_to_altaz, altaz_to_radec, unit_vectors_to_altaz,
+                                unit_vectors_to_altaz_series)
+
+LAT, LON = -37.7, 145.05
+TIMES = ["2020-01-01T00:00:00", "2025-09-21T12:00:00", "2026-06-21T09:30:00"]
+
+
+def _random_sky(n=2000, seed=42):
+    rng = np.random.default_rng(seed)
+    ra = rng.uniform(0, 360, n)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    return ra, dec
+
+
+def _separation_arcsec(alt1, az1, alt2, az2):
+    a1, z1, a2, z2 = map(np.radians, (alt1, az1, alt2, az2))
+    cos_sep = np.sin(a1) * np.sin(a2) + np.cos(a1) * np.cos(a2) * np.cos(z1 - z2)
+    return np.degrees(np.arccos(np.clip(cos_sep, -1.0, 1.0))) * 3600
+
+
+def max_error_arcsec(mode, when):
+    """Largest separation between the engine and astropy for a random sky at a given time."""
+    ra, dec = _random_sky()
+    obstime = Time(when)
+    location = EarthLocation(lat=LAT * u.deg, lon=LON * u.deg)
+    expected = SkyCoord(ra=ra * u.deg, dec=dec * u.deg).transform_to(AltAz(obstime=obstime, location=location))
+    alt, az = radec_to_altaz(ra, dec, obstime, LAT, LON, mode)
+    return _separation_arcsec(alt, az, expected.alt.deg, expected.az.deg).max()
+
+
+def test_matches_astropy_within_tolerance():
+    for mode in MODES:
+        for when in TIMES:
+            error = max_error_arcsec(mode, when)
+            assert error < TOLERANCE_ARCSEC[mode], f"{mode} @ {when}: {error:.2f}\" exceeds {TOLERANCE_ARCSEC[mode]}\""
+
+
+def test_round_trip():
+    ra, dec = _random_sky(500)
+    obstime = Time(TIMES[1])
+    for mode in MODES:
+        alt, az = radec_to_altaz(ra, dec, obstime, LAT, LON, mode)
+        ra2, dec2 = altaz_to_radec(alt, az, obstime, LAT, LON, mode)
+        dra = ((ra2 - ra + 180) % 360 - 180) * np.cos(np.radians(dec))
+        assert np.max(np.hypot(dra, dec2 - dec)) * 3600 < 0.1
+
+
+def test_series_matches_per_time():
+    ra, dec = _random_sky(200)
+    ra, dec = np.radians(ra), np.radians(dec)
+    xyz = np.column_stack((np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)))
+    times = Time(TIMES[1]) + np.arange(0, 12 * 3600, 1800) * u.s
+    for mode in MODES:
+        alt, az = unit_vectors_to_altaz_series(np.broadcast_to(xyz, (len(times),) + xyz.shape), times, LAT, LON, mode)
+        for i, obstime in enumerate(times):
+            alt_i, az_i = unit_vectors_to_altaz(xyz, obstime, LAT, LON, mode)
+            assert _separation_arcsec(alt[i], az[i], alt_i, az_i).max() < TOLERANCE_ARCSEC[mode] / 2
+
+
+if __name__ == "__main__":
+    print("Comparing alt/az engine with astropy AltAz...")
+    print("=" * 50)
+    for mode in MODES:
+        for when in TIMES:
+            error = max_error_arcsec(mode, when)
+            status = "OK" if error < TOLERANCE_ARCSEC[mode] else "FAIL"
+            print(f"{mode:8s} {when}  max error {error:7.2f}\"  (tolerance {TOLERANCE_ARCSEC[mode]}\")  {status}")
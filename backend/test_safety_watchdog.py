@@ -0,0 +1,149 @@
+"""
+Check the safety watchdog's trip/clear hysteresis and its park timeout against a fake mount.
+Run with `python test_safety_watchdog.py` or `python -m pytest test_safety_watchdog.py`.
+"""
+import sys
+sys.path.insert(0, '.')
+
+import asyncio
+import itertools
+import time
+
+import app.services.safety_watchdog as watchdog_module
+from app.services.safety_watchdog import SAFE, UNSAFE, SafetyWatchdog
+from app.services.weather_data import evaluate_weather
+
+
+class FakeMount:
+    """Stands in for AscomAlpacaClient: records commands, optionally with a slow park."""
+
+    def __init__(self, park_delay=0.0, park_result=True):
+        self.session = object()
+        self.base_url = "http://mount"
+        self.park_delay = park_delay
+        self.park_result = park_result
+        self.calls = []
+
+    async def abort_slew(self):
+        self.calls.append("abort")
+        return True
+
+    async def park(self):
+        self.calls.append("park")
+        await asyncio.sleep(self.park_delay)
+        return self.park_result
+
+    async def set_tracking(self, enabled):
+        self.calls.append(f"tracking={enabled}")
+        return True
+
+
+_readings = itertools.count()
+
+
+def _sample(i, humidity, temp=15.0, dew=2.0):
+    observed_at = f"2026-01-01T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z"
+    return evaluate_weather(temp, humidity, 1013.0, dew, observed_at)
+
+
+def _feed(watchdog, humidities):
+    """Evaluate one sample per humidity value; returns the decisions logged."""
+    async def run():
+        decisions = []
+        for humidity in humidities:
+            decision = await watchdog.evaluate(_sample(next(_readings), humidity), time.time(), time.perf_counter())
+            if decision is not None:
+                decisions.append(decision)
+        return decisions
+    return asyncio.run(run())
+
+
+def test_trip_clear_and_retrip():
+    mount = FakeMount()
+    watchdog = SafetyWatchdog(client=mount, enabled=True)
+
+    decisions = _feed(watchdog, [60, 90])
+    assert watchdog.state == UNSAFE and watchdog.trips == 1
+    assert [d["decision"] for d in decisions] == ["park"]
+    assert mount.calls == ["abort", "park"]
+
+    # Still RED, or just below RED but inside the clear margin: stays parked, no new commands
+    _feed(watchdog, [90, 84, 83, 60, 60, 83])
+    assert watchdog.state == UNSAFE and mount.calls == ["abort", "park"]
+
+    # Only consecutive clear readings stand it down
+    decisions = _feed(watchdog, [60, 60, 60])
+    assert watchdog.state == SAFE
+    assert [d["decision"] for d in decisions] == ["clear"]
+
+    decisions = _feed(watchdog, [95])
+    assert watchdog.state == UNSAFE and watchdog.trips == 2
+    assert [d["decision"] for d in decisions] == ["park"]
+    assert mount.calls == ["abort", "park"] * 2
+
+
+def test_repeated_reading_is_not_new_evidence():
+    watchdog = SafetyWatchdog(client=FakeMount(), enabled=True)
+    _feed(watchdog, [90])
+
+    sample = _sample(next(_readings), 60)
+
+    async def repeat():
+        for _ in range(5):
+            await watchdog.evaluate(sample, time.time(), time.perf_counter())
+    asyncio.run(repeat())
+    assert watchdog.state == UNSAFE and watchdog.clear_streak == 1
+
+
+def test_park_timeout_is_bounded_and_retried():
+    original = watchdog_module.WATCHDOG_ACTION_TIMEOUT_SECONDS
+    watchdog_module.WATCHDOG_ACTION_TIMEOUT_SECONDS = 0.1
+    try:
+        mount = FakeMount(park_delay=5.0)
+        watchdog = SafetyWatchdog(client=mount, enabled=True)
+        started = time.perf_counter()
+        decisions = _feed(watchdog, [90])
+        assert time.perf_counter() - started < 1.0
+        assert decisions[0]["decision"] == "park failed" and decisions[0]["timeout"] is True
+        assert decisions[0]["abort"] is True and not watchdog.parked_for_trip
+
+        # The next RED reading tries again, and a refused park falls back to stopping tracking
+        mount.park_delay, mount.park_result = 0.0, False
+        decisions = _feed(watchdog, [90])
+        assert decisions[0]["decision"] == "park failed" and decisions[0]["tracking_off"] is True
+        assert mount.calls[-3:] == ["abort", "park", "tracking=False"]
+
+        mount.park_result = True
+        decisions = _feed(watchdog, [90])
+        assert decisions[0]["decision"] == "park" and watchdog.parked_for_trip
+        assert watchdog.metrics()["reactions"] == 3
+    finally:
+        watchdog_module.WATCHDOG_ACTION_TIMEOUT_SECONDS = original
+
+
+def test_only_newest_pending_sample_is_kept():
+    watchdog = SafetyWatchdog(client=FakeMount(), enabled=True)
+
+    async def run():
+        for i in range(3):
+            watchdog.observe(_sample(i, 60 + i), time.time())
+        return watchdog._queue.get_nowait()[0]
+    newest = asyncio.run(run())
+    assert newest["humidity"] == 62 and watchdog.superseded == 2
+
+
+def test_no_mount_connected_logs_without_commands():
+    mount = FakeMount()
+    mount.session = None
+    watchdog = SafetyWatchdog(client=mount, enabled=True)
+    decisions = _feed(watchdog, [90, 90])
+    assert [d["decision"] for d in decisions] == ["trip (no telescope connected)"] * 2
+    assert mount.calls == []
+
+
+if __name__ == "__main__":
+    for test in (test_trip_clear_and_retrip, test_repeated_reading_is_not_new_evidence,
+                 test_park_timeout_is_bounded_and_retried, test_only_newest_pending_sample_is_kept,
+                 test_no_mount_connected_logs_without_commands):
+        test()
+        print(f"{test.__name__}: OK")